@@ -5,7 +5,7 @@ Clean, single-page design optimized for user experience
 
 import streamlit as st
 import time
-from app.chatbot import RwandaTourismChatbot
+from app.serving import get_chatbot
 
 # Page configuration - REMOVE white space at top
 st.set_page_config(
@@ -127,7 +127,8 @@ st.markdown("""
 def load_chatbot():
     """Load chatbot once and cache it"""
     try:
-        return RwandaTourismChatbot()
+        # Shared with app.serving, which may already have built and warmed it up
+        return get_chatbot()
     except Exception as e:
         st.error(f"Failed to load chatbot: {e}")
         return None
@@ -221,43 +222,53 @@ def main():
         
         # Get bot response
         with st.chat_message("assistant"):
-            with st.spinner("🤔 Thinking..."):
-                try:
-                    response = chatbot.answer_question(question)
+            placeholder = st.empty()
+            placeholder.write("🤔 Thinking...")
+            try:
+                # The generative reader arrives token by token; other answers in one piece
+                stream = chatbot.stream_answer(question)
+                text = ""
+                for chunk in stream:
+                    text += chunk
+                    placeholder.write(text + " ▌")
+                response = stream.response
+                
+                if response:
+                    placeholder.write(response["answer"])
                     
-                    if response:
-                        st.write(response["answer"])
-                        
-                        # Add to session state
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": response["answer"],
-                            "confidence": response.get("confidence", 0.0)
-                        })
-                        
-                        # Show confidence
-                        confidence = response.get("confidence", 0.0)
-                        if confidence > 0:
-                            confidence_color = "🟢" if confidence > 0.7 else "🟡" if confidence > 0.4 else "🔴"
-                            st.caption(f"{confidence_color} Confidence: {confidence:.1%}")
+                    # Add to session state
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": response["answer"],
+                        "confidence": response.get("confidence", 0.0)
+                    })
                     
-                    else:
-                        error_msg = "I apologize, but I couldn't process your question. Please try asking about Rwanda's national parks or cultural heritage."
-                        st.write(error_msg)
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": error_msg,
-                            "confidence": 0.0
-                        })
-                        
-                except Exception as e:
-                    error_msg = f"Sorry, I encountered an error: {str(e)}"
-                    st.error(error_msg)
+                    # Show confidence
+                    confidence = response.get("confidence", 0.0)
+                    if confidence > 0:
+                        confidence_color = "🟢" if confidence > 0.7 else "🟡" if confidence > 0.4 else "🔴"
+                        st.caption(f"{confidence_color} Confidence: {confidence:.1%}")
+                    if "ttft_ms" in response:
+                        st.caption(f"⚡ First words after {response['ttft_ms']:.0f} ms, "
+                                   f"{response['new_tokens']} tokens in {response['generation_ms'] / 1000:.1f} s")
+                
+                else:
+                    error_msg = "I apologize, but I couldn't process your question. Please try asking about Rwanda's national parks or cultural heritage."
+                    placeholder.write(error_msg)
                     st.session_state.messages.append({
-                        "role": "assistant", 
+                        "role": "assistant",
                         "content": error_msg,
                         "confidence": 0.0
                     })
+                    
+            except Exception as e:
+                error_msg = f"Sorry, I encountered an error: {str(e)}"
+                st.error(error_msg)
+                st.session_state.messages.append({
+                    "role": "assistant", 
+                    "content": error_msg,
+                    "confidence": 0.0
+                })
     
     # Footer information
     st.markdown("---")
@@ -3,34 +3,112 @@ Rwanda Tourism Chatbot - Optimized for fast responses
 Pre-loads models to avoid user delays
 """
 
+import csv
+import gc
+import itertools
 import os
-import pandas as pd
-from typing import Dict, Optional
-from transformers import pipeline, AutoTokenizer, AutoModelForQuestionAnswering
-from app.config.settings import MODEL_CONFIG, DATASET_CONFIG
-from app.utils.context_retrieval import ContextRetrievalSystem
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
+from app.config.settings import (
+    MODEL_CONFIG, DATASET_CONFIG, LOAD_CONFIG, SHARED_INDEX_CONFIG, RELOAD_CONFIG, HEALTH_CONFIG,
+    SHARD_CONFIG, LITE_CONFIG, GAZETTEER_CONFIG, SPELLING_CONFIG, MEMORY_CONFIG, PIPELINE_CONFIG,
+    GENERATIVE_CONFIG, QUERY_LOG_CONFIG, SEMANTIC_CACHE_CONFIG
+)
+from app.utils.lite_index import LiteAnswerIndex
 from app.utils.question_handler import NonTourismQuestionHandler
+from app.utils.async_runner import (
+    DeadlineExceeded, RequestDeadline, error_response, get_default_runner, timeout_response
+)
+from app.utils.load_controller import LoadController
+from app.utils.kb_store import CompactKnowledgeBase, convert_csv
+from app.utils.hot_reload import IndexSnapshot, KnowledgeBaseWatcher
+from app.utils.readiness import ReadinessTracker, warmup_chatbot
+from app.utils.profiling import RequestProfiler
+from app.utils.memory import component_report, format_report, process_rss_bytes, release_free_memory
+from app.utils.shared_index import CompactBM25, PackedStrings, pack_strings
+from app.utils.pipeline import ComponentRegistry, Pipeline, PipelineRun, build_pipeline, generative_response
+from app.utils.generative_reader import GenerativeReader, StreamingAnswer
+from app.utils.query_log import open_query_log, top_questions
+from app.utils.semantic_cache import SemanticCache
+from app.utils.thread_topology import configure_torch_threads
+from app.utils.offline import (
+    BundleError, activate_bundle, bundled_index_dir, bundled_knowledge_base_dir, resolve_qa_model_path
+)
+
+if TYPE_CHECKING:
+    # torch, transformers and sentence-transformers are only imported in full mode
+    from app.utils.context_retrieval import ContextRetrievalSystem
 
 class RwandaTourismChatbot:
     """Rwanda Tourism Chatbot with optimized loading"""
 
-    def __init__(self):
-        """Initialize chatbot with pre-loaded models"""
+    def __init__(self, mode: Optional[str] = None):
+        """Initialize chatbot with pre-loaded models ("lite" mode skips the transformer stack)"""
+        self.mode = mode or LITE_CONFIG["mode"]
+        if self.mode not in ("full", "lite"):
+            raise ValueError(f"unknown chatbot mode: {self.mode}")
+        self.reader = GENERATIVE_CONFIG["reader"]
+        if self.reader not in ("extractive", "generative"):
+            raise ValueError(f"unknown reader: {self.reader}")
         self.qa_pipeline = None
-        self.retrieval_system = None
+        self.generative_reader: Optional[GenerativeReader] = None
         self.non_tourism_handler = NonTourismQuestionHandler()
-        self.knowledge_base = []
+        self._index = IndexSnapshot([], None, 0, None)
+        self._index_versions = itertools.count(1)
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._reload_requested = False
+        self._watcher: Optional[KnowledgeBaseWatcher] = None
         self.is_initialized = False
+        self.load_controller = LoadController()
+        self.answer_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.semantic_cache: Optional[SemanticCache] = None
+        self.readiness = ReadinessTracker()
+        self.profiler = RequestProfiler()
+        self.query_log = open_query_log()
+        self._prewarm_thread: Optional[threading.Thread] = None
+        # Models and indexes loaded here are shared by every configured stage pipeline
+        self.components = ComponentRegistry()
+        self.pipelines: Dict[str, Pipeline] = {}
+        self.components.register("question_handler", self.non_tourism_handler)
+        self.components.register("answer_lookup", self._answer_lookup)
+        self.components.register("answer_store", self._store_pipeline_answer)
+        # Fails fast on an incomplete bundle before any model is loaded
+        self.bundle = activate_bundle()
         
         # Load everything immediately
-        self._load_models()
+        if self.mode == "full":
+            self._load_models()
         self._load_knowledge_base()
+        if self.qa_pipeline is not None:
+            self.components.register("qa_model", self.qa_pipeline)
+        if self.generative_reader is not None:
+            self.components.register("generative_reader", self.generative_reader)
+        self._register_index(self._index)
+        if SEMANTIC_CACHE_CONFIG["enabled"] and hasattr(self.retrieval_system, "embed_query"):
+            # Lite replicas have no embedding model and keep the exact-match cache only
+            self.semantic_cache = SemanticCache(
+                self._embed_question, SEMANTIC_CACHE_CONFIG["threshold"],
+                SEMANTIC_CACHE_CONFIG["max_entries"], SEMANTIC_CACHE_CONFIG["policy"]
+            )
+        self.enforce_memory_budget()
         self.is_initialized = True
 
     def _load_models(self):
         """Load QA model (should be fast since it's cached)"""
+        if self.reader == "generative":
+            # GenerativeReader sizes torch's thread pools itself
+            self.generative_reader = GenerativeReader()
+            return
+
+        configure_torch_threads()
+        from transformers import pipeline, AutoTokenizer, AutoModelForQuestionAnswering
+
         try:
-            model_path = MODEL_CONFIG["model_path"]
+            model_path = resolve_qa_model_path()
             
             # Load model and tokenizer
             tokenizer = AutoTokenizer.from_pretrained(model_path)
@@ -57,53 +135,153 @@ class RwandaTourismChatbot:
             print(f" Failed to load QA model: {e}")
             raise
 
+    @property
+    def knowledge_base(self) -> Sequence[str]:
+        """Passages of the index currently serving requests"""
+        return self._index.knowledge_base
+
+    @property
+    def retrieval_system(self) -> Optional[Union["ContextRetrievalSystem", LiteAnswerIndex]]:
+        """Retrieval system of the index currently serving requests"""
+        return self._index.retrieval_system
+
+    @property
+    def index_version(self) -> int:
+        """Increases every time a rebuilt index is swapped in"""
+        return self._index.version
+
     def _load_knowledge_base(self):
-        """Load knowledge base for context retrieval"""
+        """Load knowledge base and build the initial retrieval index"""
+        self._index = self._build_index(allow_shared=True, fallback_to_defaults=True)
+
+    def _read_knowledge_base(self) -> Tuple[Optional[Sequence[str]], Optional[str]]:
+        """Find the knowledge base on disk, returning its passages and where they came from"""
+        # Try to find the data file
+        possible_paths = [
+            "Data/visitRwanda_qa.csv",
+            "visitRwanda_qa.csv",
+            "data/visitRwanda_qa.csv",
+            "Data/QA.txt"
+        ]
+
+        bundle_kb = bundled_knowledge_base_dir()
+        if bundle_kb is not None:
+            # The bundle was verified at startup and is never rebuilt in place
+            return CompactKnowledgeBase(bundle_kb), str(bundle_kb)
+
+        compact_path = DATASET_CONFIG["compact_kb_path"]
+        manifest_path = compact_path / "manifest.json"
+        csv_path = DATASET_CONFIG["knowledge_base_path"]
+        # Build the compact KB on first start, and refresh it when the CSV was edited after it was built
+        stale = manifest_path.exists() and csv_path.exists() and csv_path.stat().st_mtime > manifest_path.stat().st_mtime
+        if csv_path.exists() and (stale or not manifest_path.exists()):
+            try:
+                convert_csv(csv_path, compact_path)
+                if self._watcher is not None:
+                    # Our own write; only the CSV edit that caused it should trigger a reload
+                    self._watcher.acknowledge([manifest_path])
+                print(f" {'Rebuilt' if stale else 'Built'} compact knowledge base from: {csv_path}")
+            except OSError as e:
+                # e.g. a read-only data directory: a stale compact KB is still served, else the CSV below
+                print(f" Could not write compact knowledge base to {compact_path}: {e}")
+        if manifest_path.exists():
+            # Memory-mapped: passages are decoded only when retrieval returns them
+            return CompactKnowledgeBase(compact_path), str(compact_path)
+
+        for path in possible_paths:
+            if os.path.exists(path):
+                if path.endswith('.csv') and self.mode == "lite":
+                    # Lite replicas skip pandas: same unique non-empty answers, in file order
+                    with open(path, 'r', encoding='utf-8', newline='') as f:
+                        answers = [(row.get('answer') or '').strip() for row in csv.DictReader(f)]
+                    return list(dict.fromkeys(a for a in answers if a)), path
+                elif path.endswith('.csv'):
+                    import pandas as pd
+                    df = pd.read_csv(path)
+                    if 'answer' in df.columns:
+                        return df['answer'].dropna().unique().tolist(), path
+                elif path.endswith('.txt'):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                        # Split by questions or double newlines
+                        contexts = [ctx.strip() for ctx in content.split('\n\n') if ctx.strip()]
+                        return contexts, path
+        return None, None
+
+    def _build_index(self, allow_shared: bool = False, fallback_to_defaults: bool = False) -> IndexSnapshot:
+        """Build a new, self-contained index snapshot without touching the one serving traffic"""
         try:
-            # Try to find the data file
-            possible_paths = [
-                "Data/visitRwanda_qa.csv",
-                "visitRwanda_qa.csv",
-                "data/visitRwanda_qa.csv",
-                "Data/QA.txt"
-            ]
-            
-            contexts_loaded = False
-            for path in possible_paths:
-                if os.path.exists(path):
-                    if path.endswith('.csv'):
-                        df = pd.read_csv(path)
-                        if 'answer' in df.columns:
-                            self.knowledge_base = df['answer'].dropna().unique().tolist()
-                            contexts_loaded = True
-                            print(f" Loaded {len(self.knowledge_base)} contexts from: {path}")
-                            break
-                    elif path.endswith('.txt'):
-                        with open(path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            # Split by questions or double newlines
-                            contexts = [ctx.strip() for ctx in content.split('\n\n') if ctx.strip()]
-                            self.knowledge_base = contexts
-                            contexts_loaded = True
-                            print(f" Loaded {len(self.knowledge_base)} contexts from: {path}")
-                            break
-            
-            if not contexts_loaded:
+            knowledge_base, source = self._read_knowledge_base()
+            if knowledge_base is not None:
+                print(f" Loaded {len(knowledge_base)} contexts from: {source}")
+            elif fallback_to_defaults:
                 print(" Using default Rwanda tourism contexts")
-                self._create_default_contexts()
-            
-            # Initialize retrieval system
-            self.retrieval_system = ContextRetrievalSystem("hybrid")
-            self.retrieval_system.build_retrieval_index(self.knowledge_base)
+                knowledge_base, source = self._default_contexts(), None
+            else:
+                raise FileNotFoundError("no knowledge base file found")
+
+            retrieval_system = self._build_retrieval_system(knowledge_base, source, allow_shared)
             print(f" Context retrieval ready")
-                
+
+        except BundleError:
+            # A broken offline bundle must stop the process, not silently serve defaults
+            raise
         except Exception as e:
+            if not fallback_to_defaults:
+                raise
             print(f" Knowledge base loading failed: {e}")
-            self._create_default_contexts()
+            knowledge_base, source = self._default_contexts(), None
+            retrieval_system = self._build_retrieval_system(knowledge_base, source)
 
-    def _create_default_contexts(self):
-        """Create default contexts if data file not available"""
-        self.knowledge_base = [
+        return IndexSnapshot(knowledge_base, retrieval_system, next(self._index_versions), source)
+
+    def _build_retrieval_system(self, knowledge_base: Sequence[str], source: Optional[str],
+                                allow_shared: bool = False):
+        """Lite answer index, or the hybrid retriever (prebuilt in the bundle, or shared across workers)"""
+        keywords = [k for words in self.non_tourism_handler.tourism_keywords.values() for k in words]
+        if self.mode == "lite":
+            csv_path = DATASET_CONFIG["knowledge_base_path"]
+            if source is not None and bundled_knowledge_base_dir() is None and csv_path.exists():
+                # Every dataset question, not just the first one per answer
+                lite_index = LiteAnswerIndex.from_csv(csv_path, LITE_CONFIG["question_weight"])
+            else:
+                lite_index = LiteAnswerIndex.from_knowledge_base(knowledge_base, LITE_CONFIG["question_weight"])
+            if SPELLING_CONFIG["enabled"]:
+                lite_index.build_spelling(keywords)
+            return lite_index
+
+        from app.utils.context_retrieval import ContextRetrievalSystem
+
+        index_dir = bundled_index_dir()
+        if index_dir is not None and source == str(bundled_knowledge_base_dir()):
+            retrieval_system = ContextRetrievalSystem.load_index(index_dir, knowledge_base)
+        elif allow_shared and SHARED_INDEX_CONFIG["segment_name"]:
+            retrieval_system = ContextRetrievalSystem.build_or_attach_shared(
+                knowledge_base, SHARED_INDEX_CONFIG["segment_name"], "hybrid"
+            )
+        else:
+            retrieval_system = ContextRetrievalSystem("hybrid")
+            retrieval_system.build_retrieval_index(knowledge_base)
+        if SHARD_CONFIG["enabled"] and hasattr(knowledge_base, "categories"):
+            retrieval_system.build_shards(
+                knowledge_base.categories(), SHARD_CONFIG["routes"],
+                SHARD_CONFIG["min_route_confidence"], SHARD_CONFIG["min_shard_size"]
+            )
+        elif SHARD_CONFIG["enabled"]:
+            # Categories and dataset questions only come with the compact knowledge base (or the bundle)
+            print(" Category shards and gazetteer questions disabled: knowledge base has no categories")
+        if SPELLING_CONFIG["enabled"]:
+            retrieval_system.build_spelling(keywords)
+        if GAZETTEER_CONFIG["enabled"]:
+            questions = knowledge_base.questions() if hasattr(knowledge_base, "questions") else None
+            retrieval_system.build_gazetteer(
+                keywords, questions, GAZETTEER_CONFIG["max_document_frequency"], GAZETTEER_CONFIG["min_candidates"]
+            )
+        return retrieval_system
+
+    def _default_contexts(self) -> List[str]:
+        """Default contexts if data file not available"""
+        return [
             "Rwanda has four national parks: Volcanoes National Park for mountain gorillas, Akagera National Park for safari wildlife, Nyungwe National Park for chimpanzees and forest biodiversity, and Gishwati-Mukura National Park for conservation.",
             "Volcanoes National Park is famous for mountain gorilla trekking experiences with permits costing $1,500 per person.",
             "Akagera National Park offers classic African safari experiences with the Big Five animals: lions, elephants, leopards, rhinoceros, and buffalo.",
@@ -115,51 +293,466 @@ class RwandaTourismChatbot:
             "Rwanda is famous for its high-quality coffee grown in volcanic soil at high altitudes.",
             "The best time to visit Rwanda is during the dry seasons: June to September and December to February."
         ]
-        
-        # Initialize retrieval system with defaults
-        self.retrieval_system = ContextRetrievalSystem("hybrid") 
-        self.retrieval_system.build_retrieval_index(self.knowledge_base)
 
-    def answer_question(self, question: str) -> Optional[Dict]:
-        """Answer user question quickly"""
-        try:
-            # Check if tourism-related
-            is_tourism, category = self.non_tourism_handler.is_tourism_related(question)
-            
-            if not is_tourism:
-                return {
-                    "answer": self.non_tourism_handler.get_fallback_response(question),
-                    "confidence": 0.0,
-                    "category": "non_tourism"
-                }
-            
-            # Get context (should be fast since models are pre-loaded)
-            if self.retrieval_system:
-                contexts = self.retrieval_system.retrieve_contexts(question, top_k=3)
-                combined_context = " ".join(contexts)
+    def reload_knowledge_base(self, wait: bool = False) -> threading.Thread:
+        """Rebuild the index from disk in the background; the old index serves until the swap"""
+        with self._reload_lock:
+            if self._reload_thread and self._reload_thread.is_alive():
+                # Coalesce: the running rebuild will go around once more when it finishes
+                self._reload_requested = True
+                thread = self._reload_thread
             else:
-                combined_context = " ".join(self.knowledge_base[:3])
-            
-            # Get answer from QA model
-            result = self.qa_pipeline(
-                question=question,
-                context=combined_context
+                thread = threading.Thread(target=self._reload_worker, daemon=True, name="kb-reload")
+                self._reload_thread = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def _reload_worker(self):
+        """Background rebuild loop; failed rebuilds keep the current index"""
+        while True:
+            try:
+                new_index = self._build_index()
+            except Exception as e:
+                print(f" Knowledge base reload failed, still serving version {self.index_version}: {e}")
+            else:
+                # Single reference assignment: a request sees the old index or the new one, never a mix
+                with self._reload_lock:
+                    self._index = new_index
+                with self._cache_lock:
+                    self.answer_cache.clear()
+                if self.semantic_cache is not None:
+                    self.semantic_cache.clear()
+                self._register_index(new_index)
+                print(f" Swapped in knowledge base version {new_index.version} ({len(new_index.knowledge_base)} contexts)")
+                self.enforce_memory_budget()
+
+            with self._reload_lock:
+                if not self._reload_requested:
+                    return
+                self._reload_requested = False
+
+    def _register_index(self, index: IndexSnapshot):
+        """Point the stage pipelines at a (new) index; their memoized outputs are dropped with the old one"""
+        self.components.register("knowledge_base", index.knowledge_base)
+        self.components.register("retrieval_system", index.retrieval_system)
+
+    def get_pipeline(self, name: Optional[str] = None) -> Pipeline:
+        """Configured stage pipeline over this chatbot's loaded components, built on first use"""
+        name = name or PIPELINE_CONFIG["default"]
+        with self._cache_lock:
+            if name not in self.pipelines:
+                self.pipelines[name] = build_pipeline(name, self.components)
+            return self.pipelines[name]
+
+    def answer_with_pipeline(self, question: str, name: Optional[str] = None,
+                             deadline: Optional[RequestDeadline] = None) -> Dict:
+        """Answer through a named pipeline, e.g. to compare "fast" and "accurate" on live traffic"""
+        try:
+            return self.get_pipeline(name).run(question, deadline)
+        except DeadlineExceeded as e:
+            return timeout_response(deadline, e.stage)
+
+    def get_pipeline_stats(self) -> Dict[str, Dict]:
+        """Per-stage latency and memo hit rate of every pipeline used so far"""
+        with self._cache_lock:
+            pipelines = list(self.pipelines.values())
+        return {pipeline.name: pipeline.get_stats() for pipeline in pipelines}
+
+    def start_auto_reload(self, interval: Optional[float] = None) -> KnowledgeBaseWatcher:
+        """Watch the knowledge base files and reload in the background when they change"""
+        if self._watcher is None:
+            paths = [
+                DATASET_CONFIG["knowledge_base_path"],
+                DATASET_CONFIG["compact_kb_path"] / "manifest.json",
+            ]
+            self._watcher = KnowledgeBaseWatcher(
+                paths, self.reload_knowledge_base,
+                interval or RELOAD_CONFIG["poll_interval_seconds"]
             )
-            
-            return {
-                "answer": result['answer'].strip(),
-                "confidence": result['score'],
-                "category": category,
-                "context_used": len(combined_context)
-            }
-            
+        self._watcher.start()
+        return self._watcher
+
+    def stop_auto_reload(self):
+        """Stop watching the knowledge base files"""
+        if self._watcher is not None:
+            self._watcher.stop()
+
+    def _cache_key(self, question: str) -> str:
+        """Normalize a question so trivially different spellings share a cache entry"""
+        return " ".join(question.lower().split())
+
+    def _get_cached_answer(self, question: str) -> Optional[Dict]:
+        """Return a previously computed QA answer, refreshing its LRU position"""
+        key = self._cache_key(question)
+        with self._cache_lock:
+            cached = self.answer_cache.get(key)
+            if cached is None or cached.get("index_version") != self.index_version:
+                return None
+            self.answer_cache.move_to_end(key)
+            return dict(cached, cached=True)
+
+    def _store_answer(self, question: str, response: Dict, semantic: bool = True):
+        """Remember a QA answer so the cache_only tier can still serve it
+
+        semantic=False skips the semantic cache, whose insert runs the sentence encoder
+        """
+        # Copy: the caller goes on to set tier, profile path etc. on its own response
+        response = dict(response)
+        with self._cache_lock:
+            self.answer_cache[self._cache_key(question)] = response
+            self.answer_cache.move_to_end(self._cache_key(question))
+            while len(self.answer_cache) > LOAD_CONFIG["answer_cache_size"]:
+                self.answer_cache.popitem(last=False)
+        if self.semantic_cache is not None and semantic:
+            index = self._index
+            self.semantic_cache.store(
+                question, response, response.get("index_version", index.version), self._semantic_category(response),
+                self._question_entities(question, index)
+            )
+
+    def _embed_question(self, question: str):
+        # Embed the spell-corrected text retrieval embeds, so both share one memoized encoding
+        retrieval = self._index.retrieval_system
+        return retrieval.embed_query(retrieval.correct_query(question))
+
+    def _question_entities(self, question: str, index: IndexSnapshot) -> Optional[Tuple[str, ...]]:
+        """Named places in `question`; cached paraphrases must name the same ones"""
+        if not SEMANTIC_CACHE_CONFIG["same_entities"]:
+            return None
+        query_entities = getattr(index.retrieval_system, "query_entities", None)
+        return query_entities(question) if query_entities is not None else None
+
+    def _semantic_category(self, response: Dict) -> Optional[str]:
+        return response.get("category") if SEMANTIC_CACHE_CONFIG["same_category"] else None
+
+    def _answer_lookup(self, question: str, category: Optional[str], index: IndexSnapshot,
+                       semantic: bool = True) -> Optional[Dict]:
+        """Exact-match cache hit, else (if `semantic`) a cached paraphrase"""
+        cached = self._get_cached_answer(question)
+        if cached is None and semantic:
+            cached = self._get_semantic_answer(question, category, index)
+        return cached
+
+    def _store_pipeline_answer(self, question: str, response: Dict, index: IndexSnapshot, semantic: bool = True):
+        # Exact-cache hits are only served for the index version they were computed on
+        self._store_answer(question, dict(response, index_version=index.version), semantic)
+
+    def _get_semantic_answer(self, question: str, category: str, index: IndexSnapshot) -> Optional[Dict]:
+        """Answer of an already answered paraphrase of `question`, if the semantic cache has one"""
+        if self.semantic_cache is None:
+            return None
+        category = category if SEMANTIC_CACHE_CONFIG["same_category"] else None
+        return self.semantic_cache.lookup(question, index.version, category, self._question_entities(question, index))
+
+    def answer_question(self, question: str, deadline: Optional[RequestDeadline] = None,
+                        profile: bool = False, log: bool = True, use_cache: bool = True) -> Optional[Dict]:
+        """Answer user question quickly, degrading to cheaper paths under load
+
+        use_cache=False skips the answer caches (benchmarks measuring retrieval and QA themselves)
+        """
+        index = self._index  # pin one snapshot for the whole request
+        started = time.perf_counter()
+        with self.profiler.profile("answer_question", force=profile) as capture:
+            with self.load_controller.track() as tier:
+                response = self._answer_at_tier(question, tier, deadline, index, use_cache)
+        response["tier"] = tier
+        response["index_version"] = index.version
+        if log:
+            self._log_query(question, response, started)
+        if capture.path is not None:
+            # Copy: the cached response must not point later hits at this profile
+            response = dict(response, profile=str(capture.path))
+        return response
+
+    def _log_query(self, question: str, response: Dict, started: float):
+        """Hand the request to the query log's writer thread"""
+        if self.query_log is None:
+            return
+        if response.get("cached"):
+            path = "semantic_cache" if response.get("cache") == "semantic" else "cache"
+        elif response.get("error"):
+            path = response["error"] if response["error"] in ("deadline_exceeded", "overloaded") else "error"
+        elif response.get("category") == "non_tourism":
+            path = "gate_fallback"
+        elif response.get("tier") == "retrieval_only":
+            path = "retrieval_only"
+        else:
+            path = "lite" if self.mode == "lite" else self.reader
+        self.query_log.record(
+            question, response.get("category"), (time.perf_counter() - started) * 1000, path,
+            tier=response.get("tier"), index_version=response.get("index_version")
+        )
+
+    def prewarm_cache(self, top_n: Optional[int] = None, batch_size: Optional[int] = None) -> Dict:
+        """Replay the most frequent logged questions so their answers are cached before users ask"""
+        if self.query_log is None:
+            return {"replayed": 0, "skipped": 0}
+        top_n = min(top_n or QUERY_LOG_CONFIG["prewarm_top_n"], LOAD_CONFIG["answer_cache_size"])
+        batch_size = batch_size or QUERY_LOG_CONFIG["prewarm_batch_size"]
+        # Only questions that reached a reader are worth precomputing
+        questions = [
+            question for question, _ in top_questions(
+                self.query_log.path, top_n, QUERY_LOG_CONFIG["prewarm_min_count"],
+                include=lambda entry: entry.get("path") in ("extractive", "generative", "lite", "cache")
+            )
+            if self._get_cached_answer(question) is None
+        ]
+        started = time.perf_counter()
+        replayed = 0
+        for start in range(0, len(questions), batch_size):
+            if self.load_controller.current_tier() > 0:
+                # Real traffic comes first; degraded-tier answers are not worth caching anyway
+                print(f" Cache prewarm paused after {replayed} questions: chatbot is under load")
+                break
+            for question in questions[start:start + batch_size]:
+                self.answer_question(question, log=False)
+                replayed += 1
+            time.sleep(QUERY_LOG_CONFIG["prewarm_batch_pause_seconds"])
+        elapsed = time.perf_counter() - started
+        print(f" Prewarmed answer cache with {replayed} frequent questions in {elapsed:.1f}s")
+        return {"replayed": replayed, "skipped": len(questions) - replayed, "seconds": elapsed}
+
+    def start_prewarm_schedule(self, interval: Optional[float] = None) -> Optional[threading.Thread]:
+        """Prewarm again every `interval` seconds (e.g. after the cache was cleared by a reload)"""
+        interval = interval or QUERY_LOG_CONFIG["prewarm_interval_seconds"]
+        if self.query_log is None or interval <= 0 or self._prewarm_thread is not None:
+            return self._prewarm_thread
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.prewarm_cache()
+                except Exception as e:
+                    print(f" Scheduled cache prewarm failed: {e}")
+
+        self._prewarm_thread = threading.Thread(target=loop, daemon=True, name="cache-prewarm")
+        self._prewarm_thread.start()
+        return self._prewarm_thread
+
+    def _serving_stages(self, tier: str) -> List[Dict]:
+        """Stage list answer_question runs at `tier`; each degraded tier drops work from the full path"""
+        stages = [
+            {"stage": "gate", "type": "keyword"},
+            # The semantic cache runs the encoder, so degraded tiers use the exact-match cache only
+            {"stage": "cache", "type": "answer", "semantic": tier == "full",
+             "store": self.mode == "lite" or tier != "retrieval_only"},
+        ]
+        if tier == "cache_only":
+            return stages + [{"stage": "reader", "type": "shed"}]
+        if self.mode == "lite":
+            return stages + [{"stage": "reader", "type": "lite", "min_confidence": LITE_CONFIG["min_confidence"]}]
+        if self.generative_reader is not None and tier != "retrieval_only":
+            # The fine-tuned flan-t5 answers from the question alone, so skip retrieval
+            return stages + [{"stage": "reader", "type": "generative"}]
+
+        # Degraded tiers skip semantic search and may pass fewer passages to the reader
+        reduced = tier in ("reduced_top_k", "retrieval_only")
+        stages.append({
+            "stage": "retriever", "type": "index", "method": None if tier == "full" else "bm25",
+            "top_k": LOAD_CONFIG["reduced_top_k"] if reduced else LOAD_CONFIG["default_top_k"], "route": True,
+        })
+        if tier == "retrieval_only":
+            return stages + [{"stage": "reader", "type": "passage"}]
+        return stages + [{"stage": "fusion", "type": "concat"}, {"stage": "reader", "type": "extractive"}]
+
+    def _serving_pipeline(self, tier: str) -> Pipeline:
+        """The stage pipeline for `tier`, built on first use; listed in get_pipeline_stats as serving-<tier>"""
+        name = f"serving-{tier}"
+        with self._cache_lock:
+            if name not in self.pipelines:
+                self.pipelines[name] = build_pipeline(name, self.components, self._serving_stages(tier))
+            return self.pipelines[name]
+
+    def _answer_at_tier(self, question: str, tier: str, deadline: Optional[RequestDeadline],
+                        index: IndexSnapshot, use_cache: bool = True) -> Dict:
+        """Run the gate -> cache -> retrieval -> reader pipeline as far as the load tier allows"""
+        try:
+            return self._serving_pipeline(tier).run(question, deadline, index=index, use_cache=use_cache)
+        except DeadlineExceeded as e:
+            return timeout_response(deadline, e.stage)
         except Exception as e:
-            return {
-                "answer": f"I apologize, but I encountered an error processing your question about Rwanda tourism. Please try rephrasing your question.",
-                "confidence": 0.0,
-                "error": str(e)
-            }
+            return error_response(e)
+
+    def batch_pipeline(self, top_k: Optional[int] = None) -> Pipeline:
+        """The full-tier serving pipeline with `top_k` passages, for offline batches (app.tools.batch_answer)"""
+        top_k = top_k or LOAD_CONFIG["default_top_k"]
+        name = f"batch-top{top_k}"
+        with self._cache_lock:
+            if name not in self.pipelines:
+                stages = [dict(spec, top_k=top_k) if spec["stage"] == "retriever" else spec
+                          for spec in self._serving_stages("full")]
+                self.pipelines[name] = build_pipeline(name, self.components, stages)
+            return self.pipelines[name]
+
+    def start_batch(self, question: str, top_k: Optional[int] = None) -> PipelineRun:
+        """Begin answering `question` against the current index; drive it with the batch pipeline's
+        advance() and advance_batch(), which calls the reader once for many questions"""
+        return self.batch_pipeline(top_k).start(question, index=self._index)
+
+    def _generative_response(self, answer: str, metrics: Dict, category: str, index: IndexSnapshot) -> Dict:
+        return dict(generative_response(dict(metrics, answer=answer), category), index_version=index.version)
+
+    def stream_answer(self, question: str, deadline: Optional[RequestDeadline] = None,
+                      max_new_tokens: Optional[int] = None) -> StreamingAnswer:
+        """Answer as text pieces for progressive rendering; `.response` holds the full response afterwards
+
+        Only the generative reader produces more than one piece. Gate fallbacks, cache hits, degraded
+        tiers and the extractive reader arrive as a single piece
+        """
+        index = self._index
+        final: Dict = {}
+        started = time.perf_counter()
+
+        def chunks():
+            # The load slot is held for as long as the caller keeps reading
+            with self.load_controller.track() as tier:
+                is_tourism, category = self.non_tourism_handler.is_tourism_related(question)
+                cached = None
+                if self.generative_reader is not None and is_tourism:
+                    cached = self._answer_lookup(question, category, index, semantic=tier == "full")
+                if cached:
+                    final.update(cached)
+                    yield final["answer"]
+                elif self.generative_reader is None or tier in ("cache_only", "retrieval_only") or not is_tourism:
+                    final.update(self._answer_at_tier(question, tier, deadline, index))
+                    yield final["answer"]
+                else:
+                    stream = self.generative_reader.stream(question, max_new_tokens, deadline)
+                    try:
+                        yield from stream
+                    except DeadlineExceeded:
+                        pass  # keep what was already shown; stop_reason says why it ended
+                    final.update(self._generative_response(stream.text, stream.metrics, category, index))
+                    if stream.metrics["stop_reason"] != "deadline":
+                        self._store_answer(question, final, semantic=tier == "full")
+                final["tier"] = tier
+                final["index_version"] = index.version
+            self._log_query(question, final, started)
+
+        return StreamingAnswer(chunks(), lambda text: final)
+
+    async def answer_question_async(self, question: str, deadline: Optional[float] = None) -> Dict:
+        """Answer without blocking the event loop, giving up after `deadline` seconds"""
+        return await get_default_runner().run(self.answer_question, question, deadline)
+
+    def warmup(self, questions: Optional[List[str]] = None) -> Dict:
+        """Run representative questions through every stage so the first real user is not cold"""
+        report = warmup_chatbot(self, self.readiness, questions or HEALTH_CONFIG["warmup_questions"])
+        state = "ready" if report["ready"] else "NOT ready"
+        print(f" Warmup finished, chatbot is {state}")
+        self.enforce_memory_budget()
+        return report
+
+    def memory_report(self, extra: Optional[Dict[str, object]] = None) -> Dict:
+        """Resident bytes per component; pass e.g. {"session_messages": st.session_state.messages}"""
+        index = self._index
+        retrieval = index.retrieval_system
+        components = {
+            "qa_model": self.qa_pipeline.model if self.qa_pipeline is not None else None,
+            "generative_model": self.generative_reader.model if self.generative_reader is not None else None,
+            "sentence_model": getattr(retrieval, "sentence_model", None),
+            "context_embeddings": getattr(retrieval, "context_embeddings", None),
+            "bm25": None if isinstance(retrieval, LiteAnswerIndex) else getattr(retrieval, "bm25", None),
+            "lite_index": retrieval if isinstance(retrieval, LiteAnswerIndex) else None,
+            "category_shards": getattr(retrieval, "shards", None) or None,
+            "gazetteer": getattr(retrieval, "gazetteer", None),
+            "spelling": [getattr(retrieval, "spelling", None), self.non_tourism_handler.spelling],
+            "knowledge_base": index.knowledge_base,
+            "answer_cache": self.answer_cache,
+            "semantic_cache": self.semantic_cache,
+        }
+        components.update(extra or {})
+        return component_report(components)
+
+    def enforce_memory_budget(self, budget_mb: Optional[float] = None) -> List[str]:
+        """Shed or compact structures, cheapest loss first, until RSS fits the budget"""
+        budget_mb = budget_mb or MEMORY_CONFIG["budget_mb"]
+        if not budget_mb:
+            return []
+        budget = budget_mb * 1024 * 1024
+        steps = [
+            ("cleared answer caches", self.clear_caches),
+            ("compacted BM25 postings", self._compact_bm25),
+            ("packed knowledge base strings", self._pack_knowledge_base),
+            ("dropped category shards", self._drop_shards),
+        ]
+        actions = []
+        for action, step in steps:
+            before = process_rss_bytes()
+            if before <= budget:
+                break
+            if not step():
+                continue
+            gc.collect()
+            release_free_memory()
+            after = process_rss_bytes()
+            actions.append(action)
+            print(f" Memory budget {budget_mb:.0f} MB: {action} (RSS {before / 1e6:.0f} -> {after / 1e6:.0f} MB)")
+        if process_rss_bytes() > budget:
+            print(f" Memory budget {budget_mb:.0f} MB still exceeded after shedding; current usage:")
+            print(format_report(self.memory_report()))
+        return actions
+
+    def clear_caches(self) -> bool:
+        """Empty the exact and semantic answer caches, the query-embedding memo and the pipeline stage
+        memo, so the next requests do the full work; False if all of them were already empty"""
+        with self._cache_lock:
+            had_entries = bool(self.answer_cache)
+            self.answer_cache.clear()
+        if self.semantic_cache is not None:
+            had_entries = self.semantic_cache.clear() or had_entries
+        query_memo = getattr(self.retrieval_system, "query_memo", None)
+        if query_memo is not None:
+            had_entries = query_memo.clear() or had_entries
+        return self.components.clear_memo() or had_entries
+
+    def _compact_bm25(self) -> bool:
+        """Swap dict-per-document BM25Okapi scorers for CSR posting arrays with identical scores"""
+        retrieval = self.retrieval_system
+        if retrieval is None:
+            return False
+        systems = [retrieval] + list(getattr(retrieval, "shards", {}).values())
+        compacted = {}
+        for system in systems:
+            for attr in ("bm25", "question_bm25", "answer_bm25"):
+                scorer = getattr(system, attr, None)
+                if scorer is None or isinstance(scorer, CompactBM25):
+                    continue
+                if id(scorer) not in compacted:
+                    compacted[id(scorer)] = CompactBM25.from_bm25(scorer)
+                setattr(system, attr, compacted[id(scorer)])
+        return bool(compacted)
+
+    def _pack_knowledge_base(self) -> bool:
+        """Replace the list of passage strings with one UTF-8 blob plus offsets"""
+        with self._reload_lock:
+            index = self._index
+            # The lite index keeps its own question and answer lists, which hold the passage text in
+            # lite mode; packing only the knowledge base would free nothing there
+            packed_lite = isinstance(index.retrieval_system, LiteAnswerIndex) and index.retrieval_system.pack()
+            if not isinstance(index.knowledge_base, list):
+                return packed_lite  # the knowledge base is already compact (memory-mapped, shared or packed)
+            packed = PackedStrings(*pack_strings(index.knowledge_base))
+            if index.retrieval_system is not None and hasattr(index.retrieval_system, "build_retrieval_index"):
+                index.retrieval_system.contexts = packed
+            self._index = index._replace(knowledge_base=packed)
+        self._register_index(self._index)
+        return True
+
+    def _drop_shards(self) -> bool:
+        """Category shards duplicate BM25 and embedding rows; the global index still answers everything"""
+        retrieval = self.retrieval_system
+        if not getattr(retrieval, "shards", None):
+            return False
+        retrieval.shards = {}
+        retrieval.shard_routes = {}
+        return True
 
     def is_model_ready(self) -> bool:
         """Check if the model is ready for inference"""
-        return self.qa_pipeline is not None and self.is_initialized
\ No newline at end of file
+        if self.mode == "lite":
+            return self.retrieval_system is not None and self.is_initialized
+        return (self.qa_pipeline is not None or self.generative_reader is not None) and self.is_initialized
\ No newline at end of file
@@ -19,11 +19,24 @@ MODEL_CONFIG = {
     "confidence_threshold": 0.2,  # Optimized for DistilBERT QA performance
     "model_type": "distilbert",  # Specific model architecture
     "tokenizer_max_length": 512,  # Matches model configuration
+    "embedding_model": "all-MiniLM-L6-v2",  # Sentence-transformer used for semantic retrieval
+}
+
+# Generative reader - the flan-t5-small fine-tuned in notebooks/visitRwandaBot_flan_t5_small.ipynb,
+# decoded token by token so the UI can show the answer while it is being generated
+GENERATIVE_CONFIG = {
+    "reader": os.getenv("VISITRWANDA_READER", "extractive"),  # or "generative"
+    "model_path": MODELS_DIR / "rwanda_tourism_flan_t5",
+    "max_input_length": 256,  # matches the notebook's tokenization
+    "max_new_tokens": 128,
+    "no_repeat_ngram_size": 3,  # the fine-tuned model tends to repeat phrases
 }
 
 # Dataset configuration
 DATASET_CONFIG = {
     "knowledge_base_path": DATA_DIR / "visitRwanda_qa.csv",
+    # Memory-mapped knowledge base, built from knowledge_base_path on first start (or `python -m app.utils.kb_store`)
+    "compact_kb_path": DATA_DIR / "visitRwanda_kb",
     "fallback_contexts": {
         "national_parks": (
             "Rwanda has four national parks: Volcanoes National Park famous for mountain gorilla trekking, "
@@ -80,4 +93,241 @@ CHAT_CONFIG = {
         "How much does gorilla trekking cost?",
         "What animals are in Akagera National Park?"
     ]
-}
\ No newline at end of file
+}
+
+# Async serving configuration
+ASYNC_CONFIG = {
+    "max_workers": 2,                 # Threads running retrieval + QA concurrently
+    "max_pending": 16,                # Requests queued or running before new ones are rejected
+    "default_deadline_seconds": 15.0  # Per-request budget when the caller gives none
+}
+
+# Overload protection - each threshold reached steps one tier down
+# (full -> lexical_only -> reduced_top_k -> retrieval_only -> cache_only)
+LOAD_CONFIG = {
+    "enabled": True,
+    "in_flight_thresholds": [3, 6, 10, 16],          # Concurrent requests in this process
+    "latency_thresholds_ms": [1500, 3000, 5000, 8000],
+    "latency_percentile": 90,                        # Percentile of recent latencies compared above
+    "latency_window": 50,                            # Most recent requests considered
+    "min_latency_samples": 10,                       # Ignore latency until this many samples exist
+    "default_top_k": 3,
+    "reduced_top_k": 1,
+    "answer_cache_size": 512                         # Answers kept for the cache_only tier
+}
+
+# Multi-worker deployments - set VISITRWANDA_SHARED_INDEX to a segment name so the first
+# worker publishes the retrieval index into shared memory and the others attach to it. The actual
+# segment is "<name>-<content hash>", so workers started after a KB edit never attach a stale index
+SHARED_INDEX_CONFIG = {
+    "segment_name": os.getenv("VISITRWANDA_SHARED_INDEX", ""),
+}
+
+# Knowledge base hot reload - the app watches the CSV / compact KB and swaps in a rebuilt index
+RELOAD_CONFIG = {
+    "watch": os.getenv("VISITRWANDA_WATCH_KB", "1") == "1",
+    "poll_interval_seconds": 5.0,
+}
+
+# Checkpoint evaluation (python -m app.tools.evaluation)
+EVALUATION_CONFIG = {
+    "checkpoints": {
+        "conservative": MODELS_DIR / "conservative_FIXED",
+        "balanced": MODELS_DIR / "balanced_FIXED",
+        "aggressive": MODELS_DIR / "aggressive_FIXED",
+    },
+    "test_csv": DATA_DIR / "visitRwanda_qa.csv",
+    "test_fraction": 0.2,        # Same stratified split as the training notebook
+    "batch_size": 16,
+    "max_answer_len": 200,
+    "cache_dir": BASE_DIR / ".cache" / "eval_predictions",
+}
+
+# Warmup and readiness - the health endpoint runs next to Streamlit (python -m app.serving)
+HEALTH_CONFIG = {
+    "host": "0.0.0.0",
+    "port": int(os.getenv("VISITRWANDA_HEALTH_PORT", "8502")),
+    "warmup_questions": [
+        "How many national parks are in Rwanda?",
+        "What museums can I visit in Rwanda?",
+        "How much does gorilla trekking cost?",
+        "What is the capital of France?"     # exercises the non-tourism gate
+    ]
+}
+
+# Offline artifact bundle (python -m app.tools.build_bundle) - models, NLTK data, knowledge base
+# and prebuilt index baked in at image build time; strict mode never touches the network
+OFFLINE_CONFIG = {
+    "bundle_dir": os.getenv("VISITRWANDA_BUNDLE_DIR", ""),
+    "strict": os.getenv("VISITRWANDA_OFFLINE", "0") == "1",
+    "verify_checksums": os.getenv("VISITRWANDA_VERIFY_BUNDLE", "1") == "1",  # skipped while .verified matches
+}
+
+# Category-sharded retrieval - questions the keyword gate classifies confidently search only
+# their category's shard; low-confidence or generic questions search the global index
+SHARD_CONFIG = {
+    "enabled": True,
+    "routes": {                                      # question category -> knowledge base categories
+        "national_parks": ["National Parks"],
+        "cultural_heritage": ["Cultural and heritage"],
+    },
+    "min_route_confidence": 0.6,
+    "min_shard_size": 5,                             # smaller categories are only in the global index
+}
+
+# Lite serving mode (VISITRWANDA_MODE=lite) - BM25 over the stored questions and answers returns
+# the best curated answer; torch, transformers and sentence-transformers are never imported
+LITE_CONFIG = {
+    "mode": os.getenv("VISITRWANDA_MODE", "full"),
+    "question_weight": 0.6,          # share of the score from matching stored questions vs answers
+    "min_confidence": 0.3,           # weaker lexical matches get the fallback message instead
+}
+
+# Entity gazetteer - questions naming a park, museum or town are scored only against passages
+# that mention it; questions without a known entity search the whole corpus
+GAZETTEER_CONFIG = {
+    "enabled": True,
+    "max_document_frequency": 0.2,   # entities in more passages than this do not narrow anything
+    "min_candidates": 3,             # smaller candidate sets fall back to the whole corpus
+}
+
+# Spelling correction - symmetric-delete index over the gate keywords and corpus vocabulary,
+# so "gorila" or "Nyungue" are answered instead of hitting the non-tourism fallback
+SPELLING_CONFIG = {
+    "enabled": True,
+    "max_edit_distance": 2,          # only words of long_word_length+ characters get 2 edits
+    "prefix_length": 7,              # deletions are precomputed on word prefixes of this length
+    "min_word_length": 5,            # shorter words are never corrected (or corrected to)
+    "long_word_length": 8,
+}
+
+# Request profiling - VISITRWANDA_PROFILE=sampling|cprofile profiles every request,
+# answer_question(..., profile=True) profiles one, and VISITRWANDA_PROFILE_SLOW_MS samples
+# any request still running after that many milliseconds
+PROFILING_CONFIG = {
+    "mode": os.getenv("VISITRWANDA_PROFILE", ""),
+    "slow_request_ms": float(os.getenv("VISITRWANDA_PROFILE_SLOW_MS", "0")),
+    "sample_interval_ms": 5.0,
+    "output_dir": BASE_DIR / ".cache" / "profiles",   # .collapsed files feed flamegraph.pl / speedscope
+    "max_profiles": 50,                               # oldest profiles are deleted beyond either cap
+    "max_storage_mb": 50,
+}
+
+# Memory budget - when RSS exceeds it after loading or a reload, the chatbot drops or compacts
+# its larger structures (answer cache, BM25 dicts, passage strings, category shards); 0 disables
+MEMORY_CONFIG = {
+    "budget_mb": float(os.getenv("VISITRWANDA_MEMORY_BUDGET_MB", "0")),
+}
+
+# Stage pipelines - each is an ordered list of stages (cache, gate, retriever, fusion, reader) built by
+# app.utils.pipeline; pipelines in one process share loaded models and indexes, so they can be A/B tested
+PIPELINE_CONFIG = {
+    "default": "accurate",
+    "memo_size": 1024,  # stage outputs remembered across pipelines with the same stage settings
+    "pipelines": {
+        "accurate": [
+            {"stage": "cache", "type": "lru", "size": 256},
+            {"stage": "gate", "type": "keyword"},
+            {"stage": "retriever", "type": "index", "method": "hybrid", "top_k": 3, "route": True},
+            {"stage": "fusion", "type": "concat"},
+            {"stage": "reader", "type": "extractive"},
+        ],
+        "fast": [
+            {"stage": "cache", "type": "lru", "size": 256},
+            {"stage": "gate", "type": "keyword"},
+            {"stage": "retriever", "type": "index", "method": "bm25", "top_k": 2, "route": True},
+            {"stage": "fusion", "type": "concat"},
+            {"stage": "reader", "type": "extractive"},
+        ],
+        "retrieval_only": [
+            {"stage": "gate", "type": "keyword"},
+            {"stage": "retriever", "type": "index", "method": "bm25", "top_k": 1, "route": True},
+            {"stage": "reader", "type": "passage"},
+        ],
+        "generative": [
+            {"stage": "cache", "type": "lru", "size": 256},
+            {"stage": "gate", "type": "keyword"},
+            {"stage": "reader", "type": "generative", "max_new_tokens": 128},
+        ],
+        # The notebook chatbot: unrouted hybrid search and the notebook's reader settings
+        "notebook": [
+            {"stage": "gate", "type": "keyword"},
+            {"stage": "retriever", "type": "index", "method": "hybrid", "top_k": 3, "route": False},
+            {"stage": "fusion", "type": "concat"},
+            {"stage": "reader", "type": "extractive", "max_answer_len": 200, "handle_impossible_answer": False},
+        ],
+    },
+}
+
+# Query log - what users ask, appended off the request thread; the most frequent questions are
+# replayed through the chatbot after startup (and every `prewarm_interval_seconds` if > 0)
+QUERY_LOG_CONFIG = {
+    "enabled": os.getenv("VISITRWANDA_QUERY_LOG", "1") == "1",
+    "path": Path(os.getenv("VISITRWANDA_QUERY_LOG_PATH", str(BASE_DIR / ".cache" / "query_log.jsonl"))),
+    "max_mb": 10,
+    "backups": 5,
+    "queue_size": 10000,  # entries waiting for the writer; more are dropped, never block a request
+    "prewarm_top_n": 100,
+    "prewarm_min_count": 2,
+    "prewarm_batch_size": 8,
+    "prewarm_batch_pause_seconds": 0.5,
+    "prewarm_interval_seconds": float(os.getenv("VISITRWANDA_PREWARM_INTERVAL", "0")),
+}
+
+# Import-time budget - checked by `python -m app.tools.import_budget`; heavy libraries must load
+# on first use so CLI tools, batch jobs and new workers start quickly
+IMPORT_BUDGET_CONFIG = {
+    "entry_points": {  # module -> budget in ms (sum of -X importtime self times)
+        "app.chatbot": 400,
+        "app.utils.context_retrieval": 350,
+        "app.chatbot_notebook": 350,
+        "app.serving": 150,
+        "app.tools.evaluation": 300,
+        "app.utils.kb_store": 300,
+    },
+    "forbidden_modules": ["streamlit", "torch", "transformers", "sentence_transformers", "pandas", "nltk", "scipy"],
+    "runs": 3,
+}
+
+# Text analysis shared by BM25, the lite index and the spelling vocabulary - changing it
+# invalidates saved BM25 indexes, which are rebuilt from the passages on load
+ANALYZER_CONFIG = {
+    "min_token_length": 3,
+    "stem": False,         # Harman S-stemmer: "gorillas" and "gorilla" become the same term
+    "cache_size": 4096,    # memoized query strings
+}
+
+# Torch CPU threads per worker - with several workers on one node, each gets its share of the cores.
+# "auto" uses the result of `python -m app.tools.tune_threads` when it was measured on this host,
+# otherwise the worker's CPUs split across ASYNC_CONFIG["max_workers"] concurrent requests
+THREAD_CONFIG = {
+    "enabled": os.getenv("VISITRWANDA_THREADS", "1") == "1",
+    "workers": int(os.getenv("VISITRWANDA_WORKERS", "1")),            # worker processes on this node
+    "worker_index": int(os.getenv("VISITRWANDA_WORKER_INDEX", "0")),  # this worker, 0-based
+    "intra_op_threads": os.getenv("VISITRWANDA_TORCH_THREADS", "auto"),
+    "inter_op_threads": int(os.getenv("VISITRWANDA_INTEROP_THREADS", "1")),  # sequential graphs; more only contend
+    "pin_cpus": os.getenv("VISITRWANDA_PIN_CPUS", "0") == "1",
+    "tuning_path": BASE_DIR / ".cache" / "thread_tuning.json",
+    "tune_threads": [1, 2, 4, 8],   # intra-op candidates; capped at the CPUs per worker
+    "tune_seconds": 10.0,           # measurement time per candidate
+}
+
+# Offline batch answering - `python -m app.tools.batch_answer`; queue sizes bound memory, whatever
+# the input size, and the checkpoint lets an interrupted run continue with --resume
+BATCH_CONFIG = {
+    "batch_size": 16,                 # questions per QA model call
+    "queue_size": 64,                 # items waiting between two stages
+    "max_batch_wait_seconds": 0.05,   # send a partial batch rather than wait longer for more
+    "checkpoint_every": 100,          # answers written between checkpoints
+}
+
+# Semantic answer cache (full mode) - a question reuses the answer of the most similar question
+# already answered when their all-MiniLM-L6-v2 embeddings are at least `threshold` cosine-similar
+SEMANTIC_CACHE_CONFIG = {
+    "enabled": os.getenv("VISITRWANDA_SEMANTIC_CACHE", "1") == "1",
+    "threshold": 0.9,        # paraphrases of one question; lower values start mixing related questions
+    "max_entries": 2048,
+    "policy": "lru",         # or "lfu": keep the most frequently reused answers
+    "same_category": True,   # only reuse answers given for the same tourism category
+    "same_entities": True,   # ...and naming the same gazetteer entities (parks, districts, lakes)
+}
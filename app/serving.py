@@ -0,0 +1,115 @@
+"""
+Rwanda Tourism Chatbot - Production serving entry point
+Loads and warms the chatbot in the Streamlit server process before users arrive,
+and exposes /healthz and /readyz for load balancers
+
+Usage:
+    python -m app.serving --port 8501 --address 0.0.0.0
+"""
+
+import argparse
+import threading
+import time
+from typing import Optional
+
+from app.config.settings import HEALTH_CONFIG, RELOAD_CONFIG
+from app.utils.readiness import ReadinessTracker, start_health_server
+from app.utils.thread_topology import get_thread_stats
+
+_chatbot = None
+_chatbot_lock = threading.Lock()
+server_readiness = ReadinessTracker()
+
+
+def get_chatbot(warmup: bool = True):
+    """Process-wide chatbot: built, warmed up and watched for KB changes exactly once"""
+    global _chatbot
+    with _chatbot_lock:
+        if _chatbot is None:
+            from app.chatbot import RwandaTourismChatbot
+
+            server_readiness.mark("chatbot", False, error="loading")
+            started = time.perf_counter()
+            try:
+                chatbot = RwandaTourismChatbot()
+            except Exception as e:
+                server_readiness.mark("chatbot", False, error=str(e))
+                raise
+            server_readiness.mark("chatbot", True, [(time.perf_counter() - started) * 1000])
+
+            if warmup:
+                chatbot.warmup()
+                # Before /readyz passes: the questions users ask most are answered from cache
+                chatbot.prewarm_cache()
+                chatbot.start_prewarm_schedule()
+            if RELOAD_CONFIG["watch"]:
+                # Content edits are picked up without restarting Streamlit
+                chatbot.start_auto_reload()
+            _chatbot = chatbot
+        return _chatbot
+
+
+def _readiness_details() -> dict:
+    """Chatbot warmup state merged into the server-level report"""
+    if _chatbot is None:
+        return {"ready": False}
+    report = _chatbot.readiness.report()
+    details = {
+        "ready": server_readiness.is_ready() and report["ready"],
+        "components": {**server_readiness.report()["components"], **report["components"]},
+        "index_version": _chatbot.index_version,
+        "torch_threads": get_thread_stats(),
+    }
+    retrieval = _chatbot.retrieval_system
+    if retrieval is not None and retrieval.shards:
+        details["retrieval_shards"] = retrieval.get_shard_stats()
+    if getattr(retrieval, "gazetteer", None) is not None:
+        details["gazetteer"] = retrieval.gazetteer.get_stats()
+    if getattr(retrieval, "spelling", None) is not None:
+        details["spelling"] = {
+            "gate": _chatbot.non_tourism_handler.spelling.get_stats(),
+            "retrieval": retrieval.spelling.get_stats(),
+        }
+    if getattr(retrieval, "analyzer", None) is not None:
+        details["analyzer"] = {"signature": retrieval.analyzer.signature, "cache": retrieval.analyzer.cache_info()}
+    if _chatbot.semantic_cache is not None:
+        details["semantic_cache"] = _chatbot.semantic_cache.get_stats()
+    if _chatbot.query_log is not None:
+        details["query_log"] = _chatbot.query_log.get_stats()
+    if getattr(_chatbot, "generative_reader", None) is not None:
+        details["generative_reader"] = _chatbot.generative_reader.get_stats()
+    return details
+
+
+def serve(port: int = 8501, address: str = "0.0.0.0", health_port: Optional[int] = None):
+    """Start the health endpoint, warm the chatbot in the background, then run Streamlit in-process"""
+    start_health_server(server_readiness, HEALTH_CONFIG["host"], health_port or HEALTH_CONFIG["port"],
+                        extra=_readiness_details)
+    server_readiness.mark("chatbot", False, error="loading")
+    threading.Thread(target=get_chatbot, daemon=True, name="chatbot-warmup").start()
+
+    from streamlit.web import bootstrap
+
+    flag_options = {
+        "server_port": port,
+        "server_address": address,
+        "server_headless": True,
+    }
+    bootstrap.load_config_options(flag_options=flag_options)
+    bootstrap.run("app.py", False, [], flag_options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Visit Rwanda chatbot with readiness gating")
+    parser.add_argument("--port", type=int, default=8501)
+    parser.add_argument("--address", default="0.0.0.0")
+    parser.add_argument("--health-port", type=int, default=HEALTH_CONFIG["port"])
+    args = parser.parse_args()
+    serve(args.port, args.address, args.health_port)
+
+
+if __name__ == "__main__":
+    # Under `python -m app.serving` this file runs as __main__, a different module object from the
+    # `app.serving` that app.py imports; delegate so exactly one module owns the chatbot singleton
+    from app.serving import main as serving_main
+    serving_main()
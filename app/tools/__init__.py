@@ -0,0 +1 @@
+# Tools package
\ No newline at end of file
@@ -0,0 +1,282 @@
+"""
+Batch Answering for Rwanda Tourism QA
+Answers a JSONL or CSV file of questions into a JSONL file. Reading, gating, retrieval, batched
+QA and writing run as concurrent stages joined by bounded queues, so memory stays flat and a
+large file finishes at the pace of the slowest stage. A checkpoint makes interrupted runs resumable
+
+Usage:
+    python -m app.tools.batch_answer questions.jsonl answers.jsonl
+    python -m app.tools.batch_answer partner_faq.csv answers.jsonl --batch-size 32 --resume
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.config.settings import BATCH_CONFIG, LOAD_CONFIG
+from app.utils.async_runner import error_response
+
+_DONE = object()
+
+
+class StageFailed(RuntimeError):
+    """Another stage stopped with an error; this one stops too"""
+
+
+def iter_questions(path, question_field: str = "question", id_field: str = "id") -> Iterator[Dict]:
+    """(id, question) records streamed from a .jsonl (objects or bare strings) or .csv file"""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for number, row in enumerate(rows):
+            if isinstance(row, str):
+                row = {question_field: row}
+            yield {"id": row.get(id_field, number), "question": (row.get(question_field) or "").strip()}
+
+
+def read_checkpoint(path) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_checkpoint(path, checkpoint: Dict):
+    """Atomic replace, so a crash leaves the previous checkpoint rather than a torn one"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+class BatchAnswerer:
+    """Five threads - read, gate, retrieve, read(er), write - each owning one stage of every question
+
+    Questions go through the chatbot's batch pipeline (the full-tier serving stages), split at the
+    retriever and the reader so the reader can be called once per batch
+    """
+
+    def __init__(self, chatbot, batch_size: Optional[int] = None, queue_size: Optional[int] = None,
+                 top_k: Optional[int] = None, checkpoint_every: Optional[int] = None):
+        self.chatbot = chatbot
+        self.batch_size = batch_size or BATCH_CONFIG["batch_size"]
+        self.queue_size = queue_size or BATCH_CONFIG["queue_size"]
+        self.top_k = top_k or LOAD_CONFIG["default_top_k"]
+        self.pipeline = chatbot.batch_pipeline(self.top_k)
+        self.checkpoint_every = checkpoint_every or BATCH_CONFIG["checkpoint_every"]
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self.busy_seconds = Counter()
+        self.counts = Counter()
+
+    # Queue plumbing: a stage blocked on a full or empty queue still notices when another one fails
+
+    def _put(self, q: "queue.Queue", item):
+        while True:
+            if self._stop.is_set():
+                raise StageFailed()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: "queue.Queue", timeout: Optional[float] = None):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            if self._stop.is_set():
+                raise StageFailed()
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Empty
+            try:
+                return q.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def _stage(self, name: str, work: Callable[[], None]) -> threading.Thread:
+        def run():
+            try:
+                work()
+            except StageFailed:
+                pass
+            except BaseException as e:
+                self._errors.append(e)
+                self._stop.set()
+        thread = threading.Thread(target=run, daemon=True, name=f"batch-{name}")
+        thread.start()
+        return thread
+
+    def _timed(self, stage: str, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.busy_seconds[stage] += time.perf_counter() - started
+
+    # Stages
+
+    def _read(self, records: Iterator[Dict], out: "queue.Queue"):
+        for record in records:
+            self._put(out, record)
+        self._put(out, _DONE)
+
+    def _gate(self, inp: "queue.Queue", out: "queue.Queue"):
+        while True:
+            item = self._get(inp)
+            if item is _DONE:
+                break
+            item["run"] = self.chatbot.start_batch(item["question"], self.top_k)
+            # Gate and answer cache; non-tourism questions and cache hits are answered here
+            self._timed("gate", self.pipeline.advance, item["run"], ("retriever", "reader"), error_response)
+            self._put(out, item)
+        self._put(out, _DONE)
+
+    def _retrieve(self, inp: "queue.Queue", out: "queue.Queue"):
+        while True:
+            item = self._get(inp)
+            if item is _DONE:
+                break
+            if not item["run"].done:
+                self._timed("retrieve", self.pipeline.advance, item["run"], ("reader",), error_response)
+            self._put(out, item)
+        self._put(out, _DONE)
+
+    def _answer(self, inp: "queue.Queue", out: "queue.Queue"):
+        """Collect up to batch_size questions (without holding a partial batch for long) and run them together"""
+        done = False
+        while not done:
+            batch = [self._get(inp)]
+            while batch[-1] is not _DONE and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._get(inp, timeout=BATCH_CONFIG["max_batch_wait_seconds"]))
+                except queue.Empty:
+                    break
+            if batch[-1] is _DONE:
+                batch.pop()
+                done = True
+            pending = [item["run"] for item in batch if not item["run"].done]
+            if pending:
+                # One reader call per batch; a failing batch is retried per question and failures become error records
+                self._timed("answer", self.pipeline.advance_batch, pending, error_response)
+            for item in batch:
+                self._put(out, item)
+        self._put(out, _DONE)
+
+    def _write(self, inp: "queue.Queue", output, checkpoint_path, checkpoint: Dict):
+        with open(output, "a", encoding="utf-8") as f:
+            while True:
+                item = self._get(inp)
+                if item is _DONE:
+                    break
+                started = time.perf_counter()
+                response = item["run"].response
+                f.write(json.dumps({"id": item["id"], "question": item["question"], **response},
+                                   ensure_ascii=False) + "\n")
+                checkpoint["records"] += 1
+                self.counts["written"] += 1
+                self.counts["errors" if "error" in response else response.get("category") or "answered"] += 1
+                if checkpoint["records"] % self.checkpoint_every == 0:
+                    f.flush()
+                    checkpoint["output_bytes"] = f.tell()
+                    write_checkpoint(checkpoint_path, checkpoint)
+                self.busy_seconds["write"] += time.perf_counter() - started
+            f.flush()
+            checkpoint["output_bytes"] = f.tell()
+            checkpoint["complete"] = True
+            write_checkpoint(checkpoint_path, checkpoint)
+
+    def run(self, input_path, output_path, resume: bool = False, question_field: str = "question",
+            id_field: str = "id") -> Dict:
+        """Answer every question in `input_path`; with `resume`, continue after the last checkpoint"""
+        checkpoint_path = f"{output_path}.checkpoint"
+        checkpoint = {"input": str(Path(input_path).resolve()), "records": 0, "output_bytes": 0, "complete": False}
+        previous = read_checkpoint(checkpoint_path) if resume else None
+        if previous is not None:
+            if previous.get("input") != checkpoint["input"]:
+                raise ValueError(f"checkpoint {checkpoint_path} belongs to {previous.get('input')}")
+            checkpoint.update(previous, complete=False)
+            # Drop anything written after the checkpoint; those questions are answered again
+            with open(output_path, "a", encoding="utf-8") as f:
+                f.truncate(checkpoint["output_bytes"])
+            print(f" Resuming after {checkpoint['records']} answered questions")
+        else:
+            open(output_path, "w").close()
+
+        records = iter_questions(input_path, question_field, id_field)
+        for _ in range(checkpoint["records"]):
+            next(records, None)
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(4)]
+        started = time.perf_counter()
+        threads = [
+            self._stage("read", lambda: self._read(records, queues[0])),
+            self._stage("gate", lambda: self._gate(queues[0], queues[1])),
+            self._stage("retrieve", lambda: self._retrieve(queues[1], queues[2])),
+            self._stage("answer", lambda: self._answer(queues[2], queues[3])),
+            self._stage("write", lambda: self._write(queues[3], output_path, checkpoint_path, checkpoint)),
+        ]
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self._stop.set()
+            print(f" Interrupted; rerun with --resume to continue after record {checkpoint['records']}")
+            raise
+        if self._errors:
+            raise self._errors[0]
+
+        elapsed = time.perf_counter() - started
+        written = self.counts["written"]
+        return {
+            "written": written,
+            "total_records": checkpoint["records"],
+            "seconds": elapsed,
+            "questions_per_second": written / elapsed if elapsed > 0 else 0.0,
+            # Overlap works when the run takes about as long as its busiest stage, not their sum
+            "stage_busy_seconds": dict(self.busy_seconds),
+            "outcomes": {k: v for k, v in self.counts.items() if k != "written"},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions into JSONL")
+    parser.add_argument("input", help="JSONL (objects with a question field, or strings) or CSV file")
+    parser.add_argument("output", help="JSONL file of answers, one per input question, in input order")
+    parser.add_argument("--resume", action="store_true", help="Continue from OUTPUT.checkpoint")
+    parser.add_argument("--batch-size", type=int, default=BATCH_CONFIG["batch_size"])
+    parser.add_argument("--queue-size", type=int, default=BATCH_CONFIG["queue_size"])
+    parser.add_argument("--top-k", type=int, default=LOAD_CONFIG["default_top_k"])
+    parser.add_argument("--question-field", default="question")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--mode", choices=["full", "lite"], help="Chatbot mode (default from LITE_CONFIG)")
+    args = parser.parse_args()
+
+    from app.chatbot import RwandaTourismChatbot
+    print(" Loading chatbot...")
+    chatbot = RwandaTourismChatbot(mode=args.mode)
+    answerer = BatchAnswerer(chatbot, args.batch_size, args.queue_size, args.top_k)
+    report = answerer.run(args.input, args.output, args.resume, args.question_field, args.id_field)
+
+    print(f" Answered {report['written']} questions in {report['seconds']:.1f}s "
+          f"({report['questions_per_second']:.1f}/s)")
+    busy = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in
+                     sorted(report["stage_busy_seconds"].items(), key=lambda kv: -kv[1]))
+    print(f" Stage busy time: {busy}")
+    print(f" Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Offline Artifact Bundle Builder for Rwanda Tourism QA
+Collects the QA checkpoint, sentence-transformer, NLTK data, compact knowledge base, a prebuilt
+retrieval index and (when present) the generative flan-t5 checkpoint into one directory with a
+checksummed manifest; run at image build time
+
+Usage:
+    python -m app.tools.build_bundle --output /opt/visitrwanda/bundle
+    VISITRWANDA_BUNDLE_DIR=/opt/visitrwanda/bundle VISITRWANDA_OFFLINE=1 python -m app.serving
+"""
+
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+
+from app.config.settings import DATASET_CONFIG, GENERATIVE_CONFIG, MODEL_CONFIG
+from app.utils import offline
+from app.utils.kb_store import CompactKnowledgeBase, convert_csv
+
+
+def build_bundle(output_dir, qa_model=None, embedding_model=None, csv_path=None,
+                 retrieval_method: str = "hybrid", generative_model=None) -> dict:
+    """Build every bundle component into `output_dir`; the manifest is written last
+
+    The generative checkpoint is optional: an explicit `generative_model` must exist, the default
+    GENERATIVE_CONFIG path is copied only when it does
+    """
+    output_dir = Path(output_dir)
+    qa_model = Path(qa_model or MODEL_CONFIG["model_path"])
+    embedding_model = embedding_model or MODEL_CONFIG["embedding_model"]
+    csv_path = Path(csv_path or DATASET_CONFIG["knowledge_base_path"])
+    if not qa_model.is_dir():
+        raise FileNotFoundError(f"QA checkpoint not found: {qa_model}")
+    if not csv_path.exists():
+        raise FileNotFoundError(f"knowledge base CSV not found: {csv_path}")
+    if generative_model is not None and not Path(generative_model).is_dir():
+        raise FileNotFoundError(f"generative checkpoint not found: {generative_model}")
+    generative_model = Path(generative_model or GENERATIVE_CONFIG["model_path"])
+
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    output_dir.mkdir(parents=True)
+    started = time.perf_counter()
+
+    print(f" Copying QA checkpoint from {qa_model}")
+    shutil.copytree(qa_model, output_dir / offline.QA_MODEL_DIR)
+
+    if generative_model.is_dir():
+        print(f" Copying generative checkpoint from {generative_model}")
+        shutil.copytree(generative_model, output_dir / offline.GENERATIVE_MODEL_DIR)
+    else:
+        # Strict offline mode then refuses VISITRWANDA_READER=generative at startup
+        print(f" No generative checkpoint at {generative_model}; bundle supports the extractive reader only")
+
+    print(f" Saving sentence-transformer '{embedding_model}'")
+    from sentence_transformers import SentenceTransformer
+    sentence_model = SentenceTransformer(embedding_model)
+    sentence_model.save(str(output_dir / offline.EMBEDDING_MODEL_DIR))
+
+    print(" Downloading NLTK data")
+    import nltk
+    nltk_dir = output_dir / offline.NLTK_DATA_DIR
+    for _, name in offline.NLTK_RESOURCES:
+        if not nltk.download(name, download_dir=str(nltk_dir), quiet=True):
+            raise RuntimeError(f"failed to download NLTK resource '{name}'")
+    nltk.data.path.insert(0, str(nltk_dir))
+
+    print(f" Converting knowledge base from {csv_path}")
+    kb_dir = output_dir / offline.KNOWLEDGE_BASE_DIR
+    convert_csv(csv_path, kb_dir)
+    knowledge_base = CompactKnowledgeBase(kb_dir)
+
+    print(f" Building {retrieval_method} index over {len(knowledge_base)} passages")
+    from app.utils.context_retrieval import ContextRetrievalSystem
+    system = ContextRetrievalSystem(retrieval_method)
+    system.sentence_model = sentence_model  # encode with exactly the model being bundled
+    if retrieval_method in ["bm25", "hybrid"]:
+        from rank_bm25 import BM25Okapi
+        system.bm25 = BM25Okapi(system.analyzer.analyze_batch(knowledge_base))
+    if retrieval_method in ["semantic", "hybrid"]:
+        system.context_embeddings = sentence_model.encode(
+            list(knowledge_base), convert_to_tensor=True, show_progress_bar=False
+        )
+    system.contexts = knowledge_base
+    system.save_index(output_dir / offline.INDEX_DIR)
+
+    components = {
+        "qa_model": str(qa_model),
+        "generative_model": str(generative_model) if generative_model.is_dir() else None,
+        "embedding_model": embedding_model,
+        "knowledge_base": str(csv_path),
+        "retrieval_method": retrieval_method,
+        "num_passages": len(knowledge_base),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    manifest = offline.build_manifest(output_dir, components)
+    with open(output_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    # The checksums were just computed from these files, so the first start does not hash them again
+    offline.ArtifactBundle(output_dir, verify_checksums=False).mark_verified()
+
+    total_bytes = sum(entry["size"] for entry in manifest["files"].values())
+    print(f" Bundle ready: {output_dir} ({len(manifest['files'])} files, "
+          f"{total_bytes / 1e6:.1f} MB, {time.perf_counter() - started:.0f}s)")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline artifact bundle")
+    parser.add_argument("--output", required=True, help="Bundle directory (replaced if it exists)")
+    parser.add_argument("--qa-model", default=str(MODEL_CONFIG["model_path"]))
+    parser.add_argument("--embedding-model", default=MODEL_CONFIG["embedding_model"])
+    parser.add_argument("--generative-model",
+                        help=f"flan-t5 checkpoint for VISITRWANDA_READER=generative "
+                             f"(default: {GENERATIVE_CONFIG['model_path']} when it exists)")
+    parser.add_argument("--csv", default=str(DATASET_CONFIG["knowledge_base_path"]))
+    parser.add_argument("--retrieval-method", choices=["bm25", "semantic", "hybrid"], default="hybrid")
+    parser.add_argument("--verify", action="store_true", help="Re-read the bundle and check every checksum")
+    args = parser.parse_args()
+
+    build_bundle(args.output, args.qa_model, args.embedding_model, args.csv, args.retrieval_method,
+                 args.generative_model)
+    if args.verify:
+        offline.ArtifactBundle(args.output, verify_checksums=True, force=True)
+        print(" Verified all checksums")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Evaluation Harness for Rwanda Tourism QA checkpoints
+Batched inference with a prediction cache, vectorized EM/F1/ROUGE and side-by-side comparison
+
+Usage:
+    python -m app.tools.evaluation                           # conservative, balanced, aggressive
+    python -m app.tools.evaluation --checkpoints conservative models/my_new_checkpoint
+    python -m app.tools.evaluation --output experiment_metrics.json
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config.settings import EVALUATION_CONFIG
+
+# Files whose full contents identify a checkpoint; weights are identified by size + mtime
+_SMALL_MODEL_FILES = ("config.json", "tokenizer_config.json", "special_tokens_map.json", "vocab.txt")
+_WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin")
+
+
+def model_fingerprint(model_path) -> str:
+    """Stable hash of a checkpoint directory, used to key cached predictions"""
+    model_path = Path(model_path)
+    digest = hashlib.sha256()
+    for name in _SMALL_MODEL_FILES:
+        path = model_path / name
+        if path.exists():
+            digest.update(name.encode())
+            digest.update(path.read_bytes())
+    for name in _WEIGHT_FILES:
+        path = model_path / name
+        if path.exists():
+            stat = path.stat()
+            digest.update(f"{name}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+    return digest.hexdigest()[:16]
+
+
+class PredictionCache:
+    """Predictions of one checkpoint, keyed by question and context, persisted as JSON"""
+
+    def __init__(self, cache_dir, fingerprint: str):
+        self.path = Path(cache_dir) / f"{fingerprint}.json"
+        self.entries: Dict[str, Dict] = {}
+        self._dirty = False
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(question: str, context: str) -> str:
+        return hashlib.sha1(f"{question}\x00{context}".encode("utf-8")).hexdigest()
+
+    def get(self, question: str, context: str) -> Optional[Dict]:
+        return self.entries.get(self.key(question, context))
+
+    def put(self, question: str, context: str, prediction: Dict):
+        self.entries[self.key(question, context)] = prediction
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+@lru_cache(maxsize=None)
+def _stem(token: str) -> str:
+    return _porter().stem(token)
+
+
+@lru_cache(maxsize=1)
+def _porter():
+    from nltk.stem.porter import PorterStemmer
+    # rouge_score stems with the original algorithm; NLTK's default mode stems some words differently
+    return PorterStemmer(PorterStemmer.ORIGINAL_ALGORITHM)
+
+
+def rouge_tokenize(text: str) -> List[str]:
+    """Same normalization as rouge_score with use_stemmer=True"""
+    tokens = re.sub(r"[^a-z0-9]+", " ", text.lower()).split()
+    return [_stem(t) if len(t) > 3 else t for t in tokens]
+
+
+def _ngram_counts(token_lists: List[List[str]], n: int, vocab: Dict) -> tuple:
+    rows, cols = [], []
+    for i, tokens in enumerate(token_lists):
+        for gram in zip(*[tokens[j:] for j in range(n)]):
+            rows.append(i)
+            cols.append(vocab.setdefault(gram, len(vocab)))
+    return rows, cols
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=float), where=denominator > 0)
+
+
+def overlap_f1(pred_tokens: List[List[str]], ref_tokens: List[List[str]], n: int = 1) -> np.ndarray:
+    """Per-pair n-gram overlap F1 for all pairs at once, via sparse count matrices"""
+    from scipy import sparse
+
+    vocab = {}
+    p_rows, p_cols = _ngram_counts(pred_tokens, n, vocab)
+    r_rows, r_cols = _ngram_counts(ref_tokens, n, vocab)
+    shape = (len(pred_tokens), max(len(vocab), 1))
+    pred = sparse.csr_matrix((np.ones(len(p_rows)), (p_rows, p_cols)), shape=shape)
+    ref = sparse.csr_matrix((np.ones(len(r_rows)), (r_rows, r_cols)), shape=shape)
+
+    overlap = np.asarray(pred.minimum(ref).sum(axis=1)).ravel()
+    precision = _safe_divide(overlap, np.asarray(pred.sum(axis=1)).ravel())
+    recall = _safe_divide(overlap, np.asarray(ref.sum(axis=1)).ravel())
+    return _safe_divide(2 * precision * recall, precision + recall)
+
+
+def _lcs_length(a: List[str], b: List[str]) -> int:
+    if not a or not b:
+        return 0
+    previous = np.zeros(len(b) + 1, dtype=np.int32)
+    b_array = np.array(b, dtype=object)
+    for token in a:
+        match = np.concatenate(([0], previous[:-1] + 1))
+        current = np.where(np.concatenate(([False], b_array == token)), match, 0)
+        # Running max along the row replaces the inner loop of the classic DP
+        current = np.maximum.accumulate(np.maximum(current, previous))
+        previous = current
+    return int(previous[-1])
+
+
+def rouge_l(pred_tokens: List[List[str]], ref_tokens: List[List[str]]) -> np.ndarray:
+    """Per-pair ROUGE-L F-measure (longest common subsequence)"""
+    lcs = np.array([_lcs_length(p, r) for p, r in zip(pred_tokens, ref_tokens)], dtype=float)
+    precision = _safe_divide(lcs, np.array([len(p) for p in pred_tokens], dtype=float))
+    recall = _safe_divide(lcs, np.array([len(r) for r in ref_tokens], dtype=float))
+    return _safe_divide(2 * precision * recall, precision + recall)
+
+
+def compute_metrics(predictions: List[str], references: List[str]) -> Dict[str, np.ndarray]:
+    """Per-example EM, token F1 and ROUGE-1/2/L, matching the notebook's ComprehensiveEvaluator"""
+    preds = np.array([p.strip().lower() for p in predictions], dtype=object)
+    refs = np.array([r.strip().lower() for r in references], dtype=object)
+    rouge_preds = [rouge_tokenize(p) for p in predictions]
+    rouge_refs = [rouge_tokenize(r) for r in references]
+    return {
+        "exact_match": (preds == refs).astype(float),
+        "f1": overlap_f1([p.split() for p in preds], [r.split() for r in refs], 1),
+        "rouge1": overlap_f1(rouge_preds, rouge_refs, 1),
+        "rouge2": overlap_f1(rouge_preds, rouge_refs, 2),
+        "rougeL": rouge_l(rouge_preds, rouge_refs),
+    }
+
+
+def load_test_examples(csv_path, test_fraction: float = 0.2, seed: int = 42) -> List[Dict]:
+    """Read question/context/answer rows, taking the notebook's stratified 20% test split"""
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        rows = [row for row in csv.DictReader(f) if row.get("question") and row.get("answer")]
+    for row in rows:
+        row["context"] = row.get("context") or row["answer"]
+    if not test_fraction or test_fraction >= 1:
+        return rows
+
+    from sklearn.model_selection import train_test_split
+    categories = [row.get("category", "") for row in rows]
+    _, test_rows = train_test_split(rows, test_size=test_fraction, random_state=seed, stratify=categories)
+    return test_rows
+
+
+class ComprehensiveEvaluator:
+    """Evaluate QA checkpoints on a fixed test set, reusing cached predictions"""
+
+    def __init__(self, cache_dir=None, batch_size: int = None, max_answer_len: int = None,
+                 use_cache: bool = True):
+        self.cache_dir = cache_dir or EVALUATION_CONFIG["cache_dir"]
+        self.batch_size = batch_size or EVALUATION_CONFIG["batch_size"]
+        self.max_answer_len = max_answer_len or EVALUATION_CONFIG["max_answer_len"]
+        self.use_cache = use_cache
+
+    def _load_pipeline(self, model_path):
+        import torch
+        from transformers import pipeline
+        return pipeline(
+            "question-answering",
+            model=str(model_path),
+            tokenizer=str(model_path),
+            device=0 if torch.cuda.is_available() else -1
+        )
+
+    def predict(self, model_path, examples: List[Dict]) -> tuple:
+        """Predictions for every example plus timing details; only cache misses hit the model"""
+        fingerprint = model_fingerprint(model_path)
+        cache = PredictionCache(self.cache_dir, fingerprint) if self.use_cache else None
+        predictions: List[Optional[Dict]] = [
+            cache.get(ex["question"], ex["context"]) if cache else None for ex in examples
+        ]
+        missing = [i for i, p in enumerate(predictions) if p is None]
+        timings = {"fingerprint": fingerprint, "cached": len(examples) - len(missing),
+                   "load_seconds": 0.0, "inference_seconds": 0.0}
+
+        if missing:
+            started = time.perf_counter()
+            qa_pipeline = self._load_pipeline(model_path)
+            timings["load_seconds"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            inputs = [{"question": examples[i]["question"], "context": examples[i]["context"]} for i in missing]
+            outputs = qa_pipeline(
+                inputs,
+                batch_size=self.batch_size,
+                max_answer_len=self.max_answer_len,
+                handle_impossible_answer=False
+            )
+            if isinstance(outputs, dict):
+                outputs = [outputs]
+            timings["inference_seconds"] = time.perf_counter() - started
+
+            for i, output in zip(missing, outputs):
+                prediction = {"answer": output["answer"].strip(), "score": float(output["score"])}
+                predictions[i] = prediction
+                if cache:
+                    cache.put(examples[i]["question"], examples[i]["context"], prediction)
+            if cache:
+                cache.save()
+
+        timings["ms_per_question"] = 1000 * timings["inference_seconds"] / max(len(missing), 1)
+        return predictions, timings
+
+    def evaluate_experiment(self, model_path, examples: List[Dict], experiment_name: str) -> Dict:
+        """Metrics and timings for one checkpoint"""
+        started = time.perf_counter()
+        predictions, timings = self.predict(model_path, examples)
+        per_example = compute_metrics(
+            [p["answer"] for p in predictions], [ex["answer"] for ex in examples]
+        )
+        metrics = {name: float(values.mean()) if len(values) else 0.0 for name, values in per_example.items()}
+        metrics["avg_confidence"] = float(np.mean([p["score"] for p in predictions])) if predictions else 0.0
+        metrics["total_questions"] = len(examples)
+        metrics.update(timings)
+        metrics["total_seconds"] = time.perf_counter() - started
+        print(f" {experiment_name}: F1 {metrics['f1']:.3f} "
+              f"({timings['cached']}/{len(examples)} cached, {metrics['total_seconds']:.1f}s)")
+        return metrics
+
+    def compare(self, checkpoints: Dict[str, str], examples: List[Dict]) -> Dict[str, Dict]:
+        """Evaluate several checkpoints on the same examples"""
+        all_metrics = {}
+        for name, model_path in checkpoints.items():
+            if not Path(model_path).exists():
+                print(f" Skipping {name}: checkpoint not found at {model_path}")
+                continue
+            all_metrics[name] = self.evaluate_experiment(model_path, examples, name)
+        return all_metrics
+
+
+def format_comparison(all_metrics: Dict[str, Dict]) -> str:
+    """Side-by-side table of quality metrics and timings"""
+    columns = [("exact_match", "EM"), ("f1", "F1"), ("rouge1", "ROUGE-1"), ("rouge2", "ROUGE-2"),
+               ("rougeL", "ROUGE-L"), ("avg_confidence", "Conf"), ("ms_per_question", "ms/q"),
+               ("total_seconds", "Total s")]
+    header = f"{'Experiment':<16}" + "".join(f"{label:>10}" for _, label in columns)
+    lines = [header, "-" * len(header)]
+    for name, metrics in all_metrics.items():
+        values = []
+        for key, _ in columns:
+            fmt = "{:>10.1f}" if key in ("ms_per_question", "total_seconds") else "{:>10.3f}"
+            values.append(fmt.format(metrics[key]))
+        lines.append(f"{name:<16}" + "".join(values))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Rwanda tourism QA checkpoints on EM/F1/ROUGE")
+    parser.add_argument("--checkpoints", nargs="+", default=list(EVALUATION_CONFIG["checkpoints"]),
+                        help="Configured checkpoint names or paths to model directories")
+    parser.add_argument("--test-csv", default=str(EVALUATION_CONFIG["test_csv"]))
+    parser.add_argument("--test-fraction", type=float, default=EVALUATION_CONFIG["test_fraction"],
+                        help="Stratified test split size; 1 evaluates every row")
+    parser.add_argument("--batch-size", type=int, default=EVALUATION_CONFIG["batch_size"])
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not write cached predictions")
+    parser.add_argument("--output", help="Write metrics for every checkpoint to this JSON file")
+    args = parser.parse_args()
+
+    checkpoints = {
+        name: EVALUATION_CONFIG["checkpoints"].get(name, name) for name in args.checkpoints
+    }
+    checkpoints = {Path(name).name if name == path else name: path for name, path in checkpoints.items()}
+    examples = load_test_examples(args.test_csv, args.test_fraction)
+    print(f" Evaluating {len(checkpoints)} checkpoint(s) on {len(examples)} questions from {args.test_csv}")
+
+    evaluator = ComprehensiveEvaluator(batch_size=args.batch_size, use_cache=not args.no_cache)
+    all_metrics = evaluator.compare(checkpoints, examples)
+    if not all_metrics:
+        print(" No checkpoints were evaluated")
+        return
+
+    print()
+    print(format_comparison(all_metrics))
+    best = max(all_metrics.items(), key=lambda item: item[1]["f1"])
+    print(f"\n Best by F1: {best[0]} ({best[1]['f1']:.3f})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(all_metrics, f, indent=2, default=str)
+        print(f" Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Import-Time Budget Check for Rwanda Tourism QA
+Imports each core entry point in a fresh interpreter under `python -X importtime` and fails when
+one is slower than its budget or pulls in a heavy dependency that should load lazily
+
+Usage:
+    python -m app.tools.import_budget
+    python -m app.tools.import_budget --runs 5 --top 15 --json
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+from app.config.settings import BASE_DIR, IMPORT_BUDGET_CONFIG
+
+# import time: self [us] | cumulative | imported package
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """One record per imported module with self and cumulative microseconds and nesting depth"""
+    records = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append({
+                "module": module,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": (len(indent) - 1) // 2,
+            })
+    return records
+
+
+def measure(module: str, forbidden: List[str]) -> Dict:
+    """Import `module` in a fresh interpreter; total time and which forbidden modules got loaded"""
+    probe = (
+        f"import {module}; import sys, json; "
+        f"print(json.dumps([m for m in {forbidden!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=str(BASE_DIR), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        error = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"importing {module} failed: {error[-1] if error else result.returncode}")
+    records = parse_importtime(result.stderr)
+    return {
+        "total_ms": sum(r["self_us"] for r in records) / 1000,
+        "records": records,
+        "forbidden_loaded": json.loads(result.stdout.strip().splitlines()[-1]),
+    }
+
+
+def slowest_packages(records: List[Dict], top: int, own_package: str = "app") -> List[Dict]:
+    """Third-party and stdlib packages by cumulative import time (what to make lazy first)"""
+    packages: Dict[str, int] = {}
+    for record in records:
+        package = record["module"].split(".")[0]
+        if package != own_package:
+            # The outermost import of a package has the largest cumulative time
+            packages[package] = max(packages.get(package, 0), record["cumulative_us"])
+    ranked = sorted(packages.items(), key=lambda kv: -kv[1])[:top]
+    return [{"package": name, "cumulative_ms": us / 1000} for name, us in ranked]
+
+
+def check(entry_points: Optional[Dict[str, float]] = None, forbidden: Optional[List[str]] = None,
+          runs: int = 3, top: int = 10) -> Dict:
+    """Best of `runs` fresh imports per entry point, compared with its budget"""
+    entry_points = entry_points or IMPORT_BUDGET_CONFIG["entry_points"]
+    forbidden = forbidden if forbidden is not None else IMPORT_BUDGET_CONFIG["forbidden_modules"]
+    results = {}
+    for module, budget_ms in entry_points.items():
+        # The fastest run is the least disturbed by other processes and a cold page cache
+        best = min((measure(module, forbidden) for _ in range(runs)), key=lambda m: m["total_ms"])
+        results[module] = {
+            "import_ms": best["total_ms"],
+            "budget_ms": budget_ms,
+            "forbidden_loaded": best["forbidden_loaded"],
+            "slowest_packages": slowest_packages(best["records"], top),
+            "ok": best["total_ms"] <= budget_ms and not best["forbidden_loaded"],
+        }
+    return {"ok": all(r["ok"] for r in results.values()), "entry_points": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when core modules import too slowly or too much")
+    parser.add_argument("--runs", type=int, default=IMPORT_BUDGET_CONFIG["runs"])
+    parser.add_argument("--top", type=int, default=5, help="slowest packages to list per entry point")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    report = check(runs=args.runs, top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for module, result in report["entry_points"].items():
+            status = "ok  " if result["ok"] else "FAIL"
+            print(f" {status} {module:<32}{result['import_ms']:>8.1f} ms  (budget {result['budget_ms']:.0f} ms)")
+            if result["forbidden_loaded"]:
+                print(f"      imports {', '.join(result['forbidden_loaded'])} at import time")
+            slowest = ", ".join(f"{p['package']} {p['cumulative_ms']:.0f} ms" for p in result["slowest_packages"])
+            print(f"      slowest: {slowest}")
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
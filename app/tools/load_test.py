@@ -0,0 +1,233 @@
+"""
+Concurrent Load Generator for Rwanda Tourism QA
+Drives RwandaTourismChatbot.answer_question in process and reports throughput curves
+
+Usage:
+    python -m app.tools.load_test --mode closed --concurrency 1 2 4 8 16 --duration 30
+    python -m app.tools.load_test --mode open --rates 0.5 1 2 4 8 --duration 60 --slo-ms 2000
+    python -m app.tools.load_test --cache --zipf 1.1   # include answer cache hits, as real traffic would
+"""
+
+import argparse
+import csv
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.config.settings import DATA_DIR
+
+DEFAULT_QUESTION_FILES = [DATA_DIR / "visitRwanda_qa.csv", DATA_DIR / "real_visit_rwanda_data_fixed.csv"]
+
+
+class QuestionMix:
+    """Questions drawn from the dataset CSVs, uniformly or with a Zipf-skewed popular head"""
+
+    def __init__(self, csv_paths, zipf: float = 0.0, seed: int = 7):
+        questions = []
+        for path in csv_paths:
+            try:
+                with open(path, "r", encoding="utf-8", newline="") as f:
+                    questions.extend((row.get("question") or "").strip() for row in csv.DictReader(f))
+            except FileNotFoundError:
+                continue
+        self.questions = sorted({q for q in questions if q})
+        if not self.questions:
+            raise ValueError("no questions found in the dataset CSVs")
+        self._rng = random.Random(seed)
+        self._rng.shuffle(self.questions)
+        self._lock = threading.Lock()
+        if zipf > 0:
+            ranks = np.arange(1, len(self.questions) + 1, dtype=float)
+            weights = ranks ** -zipf
+            self._cumulative = np.cumsum(weights / weights.sum())
+        else:
+            self._cumulative = None
+
+    def sample(self) -> str:
+        with self._lock:
+            u = self._rng.random()
+        if self._cumulative is None:
+            return self.questions[int(u * len(self.questions))]
+        return self.questions[min(int(np.searchsorted(self._cumulative, u)), len(self.questions) - 1)]
+
+
+class LevelRecorder:
+    """Thread-safe latency and outcome collection for one load level"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies_ms: List[float] = []
+        self.errors = 0
+        self.cached = 0
+        self.tiers = Counter()
+
+    def record(self, latency_ms: float, response: Optional[Dict]):
+        with self._lock:
+            self.latencies_ms.append(latency_ms)
+            if not response or response.get("error"):
+                self.errors += 1
+            if response and response.get("tier"):
+                self.tiers[response["tier"]] += 1
+            if response and response.get("cached"):
+                self.cached += 1
+
+    def summary(self, elapsed: float) -> Dict:
+        latencies = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        completed = len(self.latencies_ms)
+        return {
+            "completed": completed,
+            "errors": self.errors,
+            # Cache hits are dictionary lookups; a level dominated by them says nothing about QA cost
+            "cached": self.cached,
+            "throughput_rps": completed / elapsed if elapsed > 0 else 0.0,
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+            "latency_p99_ms": float(np.percentile(latencies, 99)),
+            "latency_max_ms": float(latencies.max()),
+            "tiers": dict(self.tiers),
+        }
+
+
+def _call(target: Callable[[str], Dict], question: str, recorder: LevelRecorder, scheduled_at: float):
+    """Latency is measured from the scheduled start, so queueing delay is never hidden"""
+    try:
+        response = target(question)
+    except Exception as e:
+        response = {"error": str(e)}
+    recorder.record((time.perf_counter() - scheduled_at) * 1000, response)
+
+
+def run_closed_loop(target, mix: QuestionMix, concurrency: int, duration: float) -> Dict:
+    """`concurrency` users, each sending the next question as soon as the previous one returns"""
+    recorder = LevelRecorder()
+    stop_at = time.perf_counter() + duration
+
+    def user():
+        while time.perf_counter() < stop_at:
+            _call(target, mix.sample(), recorder, time.perf_counter())
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = recorder.summary(time.perf_counter() - started)
+    result.update({"mode": "closed", "concurrency": concurrency})
+    return result
+
+
+def run_open_loop(target, mix: QuestionMix, rate: float, duration: float, max_outstanding: int = 256,
+                  seed: int = 11) -> Dict:
+    """Poisson arrivals at `rate` requests/second regardless of how fast answers come back"""
+    recorder = LevelRecorder()
+    rng = random.Random(seed)
+    executor = ThreadPoolExecutor(max_workers=max_outstanding)
+    started = time.perf_counter()
+    next_arrival = started
+    sent = 0
+    while next_arrival < started + duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        executor.submit(_call, target, mix.sample(), recorder, next_arrival)
+        sent += 1
+        next_arrival += rng.expovariate(rate)
+    executor.shutdown(wait=True)
+    result = recorder.summary(time.perf_counter() - started)
+    result.update({"mode": "open", "offered_rps": rate, "sent": sent})
+    return result
+
+
+def find_saturation(levels: List[Dict], slo_ms: Optional[float], min_gain: float = 0.1) -> Optional[Dict]:
+    """First level where throughput stops growing by `min_gain` or p95 breaks the SLO"""
+    for previous, current in zip(levels, levels[1:]):
+        stalled = current["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain)
+        if stalled or (slo_ms and current["latency_p95_ms"] > slo_ms):
+            return previous
+    if slo_ms and levels and levels[0]["latency_p95_ms"] > slo_ms:
+        return levels[0]
+    return None
+
+
+def format_levels(levels: List[Dict]) -> str:
+    header = f"{'level':>8}{'done':>7}{'err':>5}{'cached':>8}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  tiers"
+    lines = [header, "-" * (len(header) + 10)]
+    for level in levels:
+        name = level.get("concurrency", level.get("offered_rps"))
+        tiers = ", ".join(f"{k}:{v}" for k, v in level["tiers"].items())
+        lines.append(
+            f"{name:>8}{level['completed']:>7}{level['errors']:>5}{level['cached']:>8}{level['throughput_rps']:>8.2f}"
+            f"{level['latency_p50_ms']:>9.0f}{level['latency_p95_ms']:>9.0f}{level['latency_p99_ms']:>9.0f}  {tiers}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure chatbot throughput and latency under concurrent load")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4, 8, 16],
+                        help="Closed loop: simultaneous users per level")
+    parser.add_argument("--rates", nargs="+", type=float, default=[0.5, 1, 2, 4, 8],
+                        help="Open loop: offered requests/second per level")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per level")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before the first level")
+    parser.add_argument("--zipf", type=float, default=0.0,
+                        help="Skew the question mix toward a popular head (0 = uniform, ~1.1 = chat-like)")
+    parser.add_argument("--slo-ms", type=float, help="p95 latency objective used to find the saturation point")
+    parser.add_argument("--cache", action="store_true",
+                        help="Serve from the answer caches (emptied before each level); default bypasses them")
+    parser.add_argument("--output", help="Write every level's results to this JSON file")
+    args = parser.parse_args()
+
+    from app.chatbot import RwandaTourismChatbot
+    print(" Loading chatbot...")
+    chatbot = RwandaTourismChatbot()
+    mix = QuestionMix(DEFAULT_QUESTION_FILES, zipf=args.zipf)
+    print(f" Question mix: {len(mix.questions)} distinct questions")
+    query_memo = getattr(chatbot.retrieval_system, "query_memo", None)
+    if query_memo is not None and not args.cache:
+        # A few hundred distinct questions fit the embedding memo; measure the encoder instead
+        query_memo.enabled = False
+
+    def target(question: str):
+        # Benchmark traffic stays out of the query log
+        return chatbot.answer_question(question, log=False, use_cache=args.cache)
+
+    for _ in range(args.warmup):
+        target(mix.sample())
+
+    levels = []
+    for level in (args.concurrency if args.mode == "closed" else args.rates):
+        if args.cache:
+            chatbot.clear_caches()  # each level starts cold instead of inheriting the last one's hits
+        print(f" Running {args.mode}-loop level {level} for {args.duration:.0f}s...")
+        if args.mode == "closed":
+            levels.append(run_closed_loop(target, mix, int(level), args.duration))
+        else:
+            levels.append(run_open_loop(target, mix, float(level), args.duration))
+
+    print()
+    print(format_levels(levels))
+    saturation = find_saturation(levels, args.slo_ms)
+    if saturation:
+        name = saturation.get("concurrency", saturation.get("offered_rps"))
+        print(f"\n Saturation point: level {name} "
+              f"({saturation['throughput_rps']:.2f} rps, p95 {saturation['latency_p95_ms']:.0f} ms)")
+    else:
+        print("\n No saturation observed; try higher levels")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"levels": levels, "saturation": saturation}, f, indent=2)
+        print(f" Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Retrieval Recall-vs-Latency Sweep for Rwanda Tourism QA
+Uses each dataset question's own answer as its relevant passage and measures recall@k, MRR and latency
+
+Usage:
+    python -m app.tools.retrieval_sweep
+    python -m app.tools.retrieval_sweep --methods bm25 hybrid --top-k 1 3 5 --scales 1 4 16 --output sweep.json
+    python -m app.tools.retrieval_sweep --min-recall 0.9      # also recommend the cheapest passing config
+"""
+
+import argparse
+import csv
+import json
+import random
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.config.settings import DATASET_CONFIG
+from app.utils.context_retrieval import ContextRetrievalSystem
+
+
+def load_labeled_queries(csv_path) -> Tuple[List[str], List[Tuple[str, int]]]:
+    """Unique answers become the corpus; each question is labeled with its answer's passage id"""
+    passages, passage_ids, queries = [], {}, []
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            question = (row.get("question") or "").strip()
+            answer = (row.get("answer") or "").strip()
+            if not question or not answer:
+                continue
+            if answer not in passage_ids:
+                passage_ids[answer] = len(passages)
+                passages.append(answer)
+            queries.append((question, passage_ids[answer]))
+    return passages, queries
+
+
+def scale_corpus(passages: List[str], scale: int, seed: int = 13) -> List[str]:
+    """Append (scale - 1) x len(passages) distractors built by shuffling words across passages"""
+    if scale <= 1:
+        return list(passages)
+    rng = random.Random(seed)
+    vocabulary = [word for passage in passages for word in passage.split()]
+    lengths = [len(passage.split()) for passage in passages]
+    distractors = []
+    for i in range((scale - 1) * len(passages)):
+        words = rng.sample(vocabulary, min(lengths[i % len(lengths)], len(vocabulary)))
+        distractors.append(" ".join(words) + f" (distractor {i})")
+    return list(passages) + distractors
+
+
+def evaluate_config(system: ContextRetrievalSystem, queries: List[Tuple[str, int]],
+                    passage_ids: Dict[str, int], method: str, top_k: int) -> Dict:
+    """recall@k, MRR@k and per-query latency for one method / top_k / depth on a built index"""
+    hits, reciprocal_ranks, latencies = [], [], []
+    for question, relevant_id in queries:
+        started = time.perf_counter()
+        results = system.retrieve_contexts(question, top_k=top_k, method=method)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        ranked_ids = [passage_ids.get(ctx) for ctx in results]
+        rank = ranked_ids.index(relevant_id) + 1 if relevant_id in ranked_ids else 0
+        hits.append(1.0 if rank else 0.0)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+
+    latencies = np.array(latencies)
+    return {
+        "recall_at_k": float(np.mean(hits)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "latency_mean_ms": float(latencies.mean()),
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "queries": len(queries),
+    }
+
+
+def run_sweep(csv_path, methods: List[str], top_ks: List[int], multipliers: List[int],
+              scales: List[int], max_queries: int = 0) -> List[Dict]:
+    """Every combination of method, top_k, candidate depth and corpus scale"""
+    passages, queries = load_labeled_queries(csv_path)
+    if max_queries:
+        queries = queries[:max_queries]
+    # One index per scale serves every method through retrieve_contexts(method=...)
+    needs_bm25 = any(m in ("bm25", "hybrid") for m in methods)
+    needs_semantic = any(m in ("semantic", "hybrid") for m in methods)
+    if needs_bm25 and needs_semantic:
+        index_method = "hybrid"
+    else:
+        index_method = "semantic" if needs_semantic else "bm25"
+
+    rows = []
+    for scale in scales:
+        corpus = scale_corpus(passages, scale)
+        passage_ids = {ctx: i for i, ctx in enumerate(corpus)}
+        print(f" Building {index_method} index over {len(corpus)} passages (scale x{scale})")
+        system = ContextRetrievalSystem(index_method)
+        # The dataset repeats its questions across configs; each must reach the encoder again
+        system.query_memo.enabled = False
+        started = time.perf_counter()
+        system.build_retrieval_index(corpus)
+        build_seconds = time.perf_counter() - started
+
+        for method in methods:
+            # Candidate depth only changes hybrid fusion; other methods are measured once
+            for multiplier in (multipliers if method == "hybrid" else [None]):
+                if multiplier is not None:
+                    system.candidate_multiplier = multiplier
+                for top_k in top_ks:
+                    result = evaluate_config(system, queries, passage_ids, method, top_k)
+                    result.update({
+                        "method": method, "top_k": top_k, "candidate_multiplier": multiplier,
+                        "scale": scale, "corpus_size": len(corpus), "build_seconds": build_seconds,
+                    })
+                    rows.append(result)
+                    print(f"   {method:<8} k={top_k:<2} depth={multiplier or '-'} "
+                          f"recall={result['recall_at_k']:.3f} p50={result['latency_p50_ms']:.1f}ms")
+    return rows
+
+
+def format_table(rows: List[Dict]) -> str:
+    header = (f"{'method':<9}{'scale':>6}{'corpus':>8}{'top_k':>6}{'depth':>6}"
+              f"{'recall@k':>10}{'MRR':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['method']:<9}{row['scale']:>6}{row['corpus_size']:>8}{row['top_k']:>6}"
+            f"{row['candidate_multiplier'] or '-':>6}{row['recall_at_k']:>10.3f}{row['mrr']:>8.3f}"
+            f"{row['latency_p50_ms']:>9.2f}{row['latency_p95_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def cheapest_passing(rows: List[Dict], min_recall: float, scale: int) -> Dict:
+    """Lowest p95 latency configuration at `scale` whose recall@k meets the bar"""
+    passing = [r for r in rows if r["scale"] == scale and r["recall_at_k"] >= min_recall]
+    return min(passing, key=lambda r: r["latency_p95_ms"]) if passing else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep retrieval configurations for recall vs latency")
+    parser.add_argument("--csv", default=str(DATASET_CONFIG["knowledge_base_path"]))
+    parser.add_argument("--methods", nargs="+", default=["bm25", "semantic", "hybrid"],
+                        choices=["bm25", "semantic", "hybrid"])
+    parser.add_argument("--top-k", nargs="+", type=int, default=[1, 3, 5])
+    parser.add_argument("--candidate-multipliers", nargs="+", type=int, default=[1, 2, 4],
+                        help="Hybrid candidate depth as a multiple of top_k (the app uses 2)")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 4],
+                        help="Corpus size multipliers; extra passages are shuffled-word distractors")
+    parser.add_argument("--max-queries", type=int, default=0, help="Limit queries per configuration (0 = all)")
+    parser.add_argument("--min-recall", type=float, help="Report the cheapest configuration meeting this recall@k")
+    parser.add_argument("--output", help="Write all rows to this JSON file")
+    args = parser.parse_args()
+
+    rows = run_sweep(args.csv, args.methods, args.top_k, args.candidate_multipliers,
+                     args.scales, args.max_queries)
+    print()
+    print(format_table(rows))
+
+    if args.min_recall is not None:
+        for scale in args.scales:
+            best = cheapest_passing(rows, args.min_recall, scale)
+            if best:
+                print(f"\n Scale x{scale}: cheapest config with recall@k >= {args.min_recall}: "
+                      f"{best['method']} top_k={best['top_k']} depth={best['candidate_multiplier'] or '-'} "
+                      f"(p95 {best['latency_p95_ms']:.2f} ms)")
+            else:
+                print(f"\n Scale x{scale}: no configuration reached recall@k >= {args.min_recall}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f" Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
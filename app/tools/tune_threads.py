@@ -0,0 +1,204 @@
+"""
+Torch Thread Auto-Tuner for Rwanda Tourism QA
+Runs the real models in as many worker processes as the node will serve, once per intra-op /
+inter-op thread setting, and records the setting with the highest combined throughput.
+THREAD_CONFIG["intra_op_threads"] = "auto" picks the recorded result up on the same host
+
+Usage:
+    python -m app.tools.tune_threads --workers 4
+    python -m app.tools.tune_threads --workers 2 --threads 1 2 3 --inter-op 1 2 --seconds 20 --pin
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config.settings import BASE_DIR, DATASET_CONFIG, GENERATIVE_CONFIG, THREAD_CONFIG
+from app.utils.thread_topology import available_cpus, host_fingerprint
+
+
+def load_samples(csv_path, limit: int = 200) -> List[Dict[str, str]]:
+    """(question, context) pairs from the dataset, as the reader sees them in production"""
+    samples = []
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            question = (row.get("question") or "").strip()
+            context = (row.get("context") or row.get("answer") or "").strip()
+            if question and context:
+                samples.append({"question": question, "context": context})
+            if len(samples) >= limit:
+                break
+    if not samples:
+        raise ValueError(f"no question/context rows in {csv_path}")
+    return samples
+
+
+def bench_worker(seconds: float, csv_path) -> Dict:
+    """One worker: load the models under THREAD_CONFIG, wait for "go" on stdin, then answer for `seconds`"""
+    from app.utils.context_retrieval import _load_sentence_model
+    from app.utils.thread_topology import configure_torch_threads, get_thread_stats
+
+    configure_torch_threads()
+    samples = load_samples(csv_path)
+    sentence_model = _load_sentence_model()
+    if GENERATIVE_CONFIG["reader"] == "generative":
+        from app.utils.generative_reader import GenerativeReader
+
+        reader = GenerativeReader()
+
+        def read(sample):
+            return reader.generate(sample["question"])
+    else:
+        from app.utils.pipeline import load_qa_model
+
+        qa_model = load_qa_model()
+
+        def read(sample):
+            return qa_model(question=sample["question"], context=sample["context"])
+
+    def request(sample):
+        # Query embedding for semantic retrieval, then the reader: the two torch-bound steps of a request
+        sentence_model.encode(sample["question"], convert_to_tensor=True, show_progress_bar=False)
+        read(sample)
+
+    for sample in samples[:3]:
+        request(sample)
+    print("ready", flush=True)
+    sys.stdin.readline()
+
+    latencies = []
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        request_started = time.perf_counter()
+        request(samples[len(latencies) % len(samples)])
+        latencies.append((time.perf_counter() - request_started) * 1000)
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "threads": get_thread_stats(),
+    }
+
+
+def run_setting(workers: int, intra_op: Optional[int], inter_op: Optional[int], pin: bool,
+                seconds: float, csv_path) -> Dict:
+    """Start `workers` benchmark processes with one thread setting and release them together"""
+    processes = []
+    for index in range(workers):
+        env = dict(os.environ, VISITRWANDA_WORKERS=str(workers), VISITRWANDA_WORKER_INDEX=str(index),
+                   VISITRWANDA_PIN_CPUS="1" if pin else "0")
+        if intra_op is None:
+            env["VISITRWANDA_THREADS"] = "0"  # torch's own defaults, the baseline to beat
+        else:
+            env.update(VISITRWANDA_THREADS="1", VISITRWANDA_TORCH_THREADS=str(intra_op),
+                       VISITRWANDA_INTEROP_THREADS=str(inter_op))
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "app.tools.tune_threads", "--bench-worker",
+             "--seconds", str(seconds), "--csv", str(csv_path)],
+            cwd=str(BASE_DIR), env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        ))
+    try:
+        # Model loading time varies; measurement starts only once every worker is loaded
+        for process in processes:
+            for line in process.stdout:
+                if line.strip() == "ready":
+                    break
+            else:
+                raise RuntimeError(f"benchmark worker exited with code {process.wait()} before loading")
+        for process in processes:
+            process.stdin.write("go\n")
+            process.stdin.flush()
+        reports = []
+        for process in processes:
+            output, _ = process.communicate()
+            if process.returncode != 0:
+                raise RuntimeError(f"benchmark worker failed with code {process.returncode}")
+            reports.append(json.loads(output.strip().splitlines()[-1]))
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+    return {
+        "intra_op_threads": intra_op,
+        "inter_op_threads": inter_op,
+        "throughput_rps": sum(r["requests"] / r["seconds"] for r in reports),
+        "latency_p50_ms": float(np.median([r["latency_p50_ms"] for r in reports])),
+        "latency_p95_ms": max(r["latency_p95_ms"] for r in reports),
+    }
+
+
+def candidate_settings(workers: int, threads: List[int], inter_ops: List[int]) -> List[tuple]:
+    """Intra-op counts up to each worker's share of the CPUs (the share itself always included)"""
+    per_worker = max(1, len(available_cpus()) // max(1, workers))
+    intra_ops = sorted({t for t in threads if 1 <= t <= per_worker} | {per_worker})
+    return [(intra, inter) for intra in intra_ops for inter in inter_ops]
+
+
+def tune(workers: int, threads: List[int], inter_ops: List[int], pin: bool, seconds: float, csv_path) -> Dict:
+    """Measure torch's defaults and every candidate; the best is the highest combined throughput"""
+    results = []
+    for intra_op, inter_op in [(None, None)] + candidate_settings(workers, threads, inter_ops):
+        label = "torch default" if intra_op is None else f"intra-op {intra_op}, inter-op {inter_op}"
+        print(f" {workers} worker(s), {label}: measuring for {seconds:.0f}s...")
+        result = run_setting(workers, intra_op, inter_op, pin, seconds, csv_path)
+        print(f"   {result['throughput_rps']:.2f} req/s, p95 {result['latency_p95_ms']:.0f} ms")
+        results.append(result)
+    tuned = [r for r in results if r["intra_op_threads"] is not None]
+    best = max(tuned, key=lambda r: (r["throughput_rps"], -r["latency_p95_ms"]))
+    return {
+        "host": host_fingerprint(),
+        "workers": workers,
+        "pin_cpus": pin,
+        "intra_op_threads": best["intra_op_threads"],
+        "inter_op_threads": best["inter_op_threads"],
+        "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the torch thread settings with the best throughput per node")
+    parser.add_argument("--workers", type=int, default=THREAD_CONFIG["workers"],
+                        help="Worker processes the node will run (default VISITRWANDA_WORKERS)")
+    parser.add_argument("--threads", nargs="+", type=int, default=THREAD_CONFIG["tune_threads"],
+                        help="Intra-op thread counts to try")
+    parser.add_argument("--inter-op", nargs="+", type=int, default=[1, 2], help="Inter-op thread counts to try")
+    parser.add_argument("--seconds", type=float, default=THREAD_CONFIG["tune_seconds"])
+    parser.add_argument("--pin", action="store_true", help="Pin each worker to its own CPUs while measuring")
+    parser.add_argument("--csv", default=str(DATASET_CONFIG["knowledge_base_path"]))
+    parser.add_argument("--output", default=str(THREAD_CONFIG["tuning_path"]),
+                        help="Where to record the result for THREAD_CONFIG to pick up")
+    parser.add_argument("--dry-run", action="store_true", help="Report without recording the result")
+    parser.add_argument("--bench-worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.bench_worker:
+        print(json.dumps(bench_worker(args.seconds, args.csv)))
+        return
+
+    tuning = tune(args.workers, args.threads, args.inter_op, args.pin, args.seconds, args.csv)
+    baseline = tuning["results"][0]
+    best = next(r for r in tuning["results"][1:]
+                if (r["intra_op_threads"], r["inter_op_threads"]) ==
+                (tuning["intra_op_threads"], tuning["inter_op_threads"]))
+    print(f"\n Best: intra-op {best['intra_op_threads']}, inter-op {best['inter_op_threads']} - "
+          f"{best['throughput_rps']:.2f} req/s vs {baseline['throughput_rps']:.2f} with torch defaults "
+          f"(p95 {best['latency_p95_ms']:.0f} vs {baseline['latency_p95_ms']:.0f} ms)")
+    if not args.dry_run:
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(tuning, f, indent=2)
+        print(f" Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Async Answer Runner for Rwanda Tourism QA
+Runs blocking chatbot calls in a bounded executor with per-request deadlines
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from app.config.settings import ASYNC_CONFIG
+
+
+class DeadlineExceeded(Exception):
+    """Raised inside a request when its deadline passed or its caller went away"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"deadline exceeded before stage: {stage}")
+        self.stage = stage
+
+
+class RequestDeadline:
+    """Per-request time budget shared between the caller and the worker thread"""
+
+    def __init__(self, timeout: float):
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + timeout
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        """Seconds since the request was accepted"""
+        return time.monotonic() - self.started_at
+
+    def cancel(self):
+        """Mark the request as abandoned so the worker stops at the next stage"""
+        self._cancelled.set()
+
+    def expired(self) -> bool:
+        """True once the caller cancelled or the time budget ran out"""
+        return self._cancelled.is_set() or time.monotonic() >= self.expires_at
+
+    def check(self, stage: str):
+        """Abort the request before running `stage` if it is no longer wanted"""
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+
+def timeout_response(deadline: RequestDeadline, stage: str = "pending") -> Dict:
+    """Structured result returned when a request does not finish in time"""
+    return {
+        "answer": (
+            "I'm sorry, answering your question about Rwanda tourism is taking longer "
+            "than expected. Please try again in a moment."
+        ),
+        "confidence": 0.0,
+        "category": "timeout",
+        "timed_out": True,
+        "stage": stage,
+        "elapsed": round(deadline.elapsed(), 3),
+        "error": "deadline_exceeded",
+    }
+
+
+def error_response(error: Exception) -> Dict:
+    """Structured result returned when answering raised; the message is safe to show to users"""
+    return {
+        "answer": (
+            "I apologize, but I encountered an error processing your question about Rwanda tourism. "
+            "Please try rephrasing your question."
+        ),
+        "confidence": 0.0,
+        "error": str(error),
+    }
+
+
+def overloaded_response() -> Dict:
+    """Structured result returned when too many requests are already pending"""
+    return {
+        "answer": (
+            "I'm receiving a lot of questions right now. "
+            "Please ask again in a few seconds."
+        ),
+        "confidence": 0.0,
+        "category": "overloaded",
+        "timed_out": False,
+        "error": "overloaded",
+    }
+
+
+class AsyncAnswerRunner:
+    """Bounded executor that turns blocking `answer_question` calls into coroutines"""
+
+    def __init__(self, max_workers: int = None, max_pending: int = None):
+        self.max_workers = max_workers or ASYNC_CONFIG["max_workers"]
+        self.max_pending = max_pending or ASYNC_CONFIG["max_pending"]
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="rwanda-answer"
+        )
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.stats = {"completed": 0, "timed_out": 0, "cancelled": 0, "rejected": 0, "skipped": 0}
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                return False
+            self._pending += 1
+            return True
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _count(self, outcome: str):
+        # Worker threads and the event loop both update stats; += on a dict entry is not atomic
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def _call(self, fn: Callable, question: str, deadline: RequestDeadline):
+        """Executed on a worker thread; skips work whose caller already left"""
+        if deadline.expired():
+            self._count("skipped")
+            return None
+        return fn(question, deadline=deadline)
+
+    async def run(self, fn: Callable, question: str, timeout: Optional[float] = None) -> Dict:
+        """Run `fn(question, deadline=...)` off the event loop within `timeout` seconds"""
+        timeout = ASYNC_CONFIG["default_deadline_seconds"] if timeout is None else timeout
+        if not self._acquire():
+            return overloaded_response()
+
+        deadline = RequestDeadline(timeout)
+        work = self._executor.submit(self._call, fn, question, deadline)
+        # Fires when the work really finishes, or when it is cancelled before starting
+        work.add_done_callback(lambda _: self._release())
+        future = asyncio.wrap_future(work)
+
+        try:
+            result = await asyncio.wait_for(future, timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            # wait_for already cancelled the future, which drops it if still queued
+            deadline.cancel()
+            self._count("timed_out")
+            return timeout_response(deadline)
+        except asyncio.CancelledError:
+            deadline.cancel()
+            self._count("cancelled")
+            raise
+
+        self._count("completed")
+        return result if result is not None else timeout_response(deadline)
+
+    def shutdown(self):
+        """Stop accepting work and drop anything still queued"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_runner: Optional[AsyncAnswerRunner] = None
+_default_runner_lock = threading.Lock()
+
+
+def get_default_runner() -> AsyncAnswerRunner:
+    """Process-wide runner so every chatbot instance shares one CPU budget"""
+    global _default_runner
+    with _default_runner_lock:
+        if _default_runner is None:
+            _default_runner = AsyncAnswerRunner()
+        return _default_runner
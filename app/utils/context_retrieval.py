@@ -3,88 +3,418 @@ Context Retrieval System for Rwanda Tourism QA
 Combines BM25 and semantic search for optimal context retrieval
 """
 
+import json
+import threading
+import warnings
+from collections import Counter, OrderedDict
+from itertools import zip_longest
+from pathlib import Path
 import numpy as np
-import torch
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
 from rank_bm25 import BM25Okapi
-from sentence_transformers import SentenceTransformer, util
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-import streamlit as st
-
-# Download NLTK data if not present
-try:
-    stopwords.words('english')
-except LookupError:
-    nltk.download('stopwords')
-    
-try:
-    word_tokenize("test")
-except LookupError:
-    nltk.download('punkt')
+from app.utils.shared_index import CompactBM25, SharedRetrievalIndex, StaleSharedIndex, content_digest
+from app.utils.offline import resolve_embedding_model
+from app.utils.gazetteer import EntityGazetteer
+from app.utils.spelling import SymSpellIndex, build_spelling_index
+from app.utils.text_analyzer import TextAnalyzer, get_default_analyzer
+from app.utils.thread_topology import configure_torch_threads
+
+if TYPE_CHECKING:
+    # torch and sentence-transformers are imported when a retriever first needs them
+    from sentence_transformers import SentenceTransformer
+
+
+def _load_sentence_model() -> "SentenceTransformer":
+    configure_torch_threads()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(resolve_embedding_model())
+
+
+class ShardStats:
+    """Thread-safe counts of routed queries: which shard served them, and why others went global"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routed_queries = 0
+        self.shard_hits = Counter()
+        self.fallbacks = Counter()
+
+    def record(self, shards: List[str], fallback_reason: Optional[str] = None):
+        with self._lock:
+            self.routed_queries += 1
+            if fallback_reason:
+                self.fallbacks[fallback_reason] += 1
+            else:
+                self.shard_hits.update(shards)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            total = self.routed_queries or 1
+            return {
+                "routed_queries": self.routed_queries,
+                "shard_hit_rate": {name: hits / total for name, hits in self.shard_hits.items()},
+                "global_fallback_rate": sum(self.fallbacks.values()) / total,
+                "fallbacks": dict(self.fallbacks),
+            }
+
+
+class QueryEmbeddingMemo:
+    """Recent query embeddings, shared by an index, its shards and the semantic answer cache"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        # Benchmarks switch it off so every query pays for the encoder, as a new question would
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            embedding = self._entries.get(query)
+            if embedding is not None:
+                self._entries.move_to_end(query)
+            return embedding
+
+    def put(self, query: str, embedding: np.ndarray):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[query] = embedding
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> bool:
+        with self._lock:
+            had_entries = bool(self._entries)
+            self._entries.clear()
+        return had_entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class ContextRetrievalSystem:
     """Hybrid BM25 + Semantic search for context retrieval"""
 
-    def __init__(self, retrieval_method: str = "hybrid"):
+    def __init__(self, retrieval_method: str = "hybrid", candidate_multiplier: int = 2,
+                 analyzer: Optional[TextAnalyzer] = None):
         self.retrieval_method = retrieval_method
+        # Hybrid search fuses top_k * candidate_multiplier results from each retriever
+        self.candidate_multiplier = candidate_multiplier
         self.bm25 = None
         self.sentence_model = None
         self.context_embeddings = None
         self.contexts = []
-        self.stop_words = set(stopwords.words('english'))
+        # Shared with shards, spelling and every other lexical index so index and query terms match
+        self.analyzer = analyzer or get_default_analyzer()
+        self.stop_words = self.analyzer.stop_words
+        self.shared_index: Optional[SharedRetrievalIndex] = None
+        # Per-category sub-indexes; the full index above stays as the global fallback
+        self.shards: Dict[str, "ContextRetrievalSystem"] = {}
+        self.shard_routes: Dict[str, List[str]] = {}
+        self.min_route_confidence = 0.0
+        self.shard_stats = ShardStats()
+        self.gazetteer: Optional[EntityGazetteer] = None
+        self.spelling: Optional[SymSpellIndex] = None
+        self.query_memo = QueryEmbeddingMemo()
+
+    def build_retrieval_index(self, contexts: List[str]):
+        """Build retrieval index (the app caches the whole chatbot, so no per-call cache here)"""
+        self.contexts = contexts
+
+        if self.retrieval_method in ["bm25", "hybrid"]:
+            self.bm25 = BM25Okapi(self.analyzer.analyze_batch(contexts))
+
+        if self.retrieval_method in ["semantic", "hybrid"]:
+            self.sentence_model = _load_sentence_model()
+            self.context_embeddings = self.sentence_model.encode(
+                list(contexts), convert_to_tensor=True, show_progress_bar=False
+            )
+
+    def publish_shared(self, name: str, content_hash: Optional[str] = None) -> SharedRetrievalIndex:
+        """Copy the built index into a named shared-memory segment other workers can attach to"""
+        embeddings = None
+        if self.context_embeddings is not None:
+            embeddings = self.context_embeddings.cpu().numpy()
+        self.shared_index = SharedRetrievalIndex.publish(name, self.contexts, self.bm25, embeddings, content_hash)
+        return self.shared_index
+
+    @classmethod
+    def attach_shared(cls, name: str, retrieval_method: str = "hybrid",
+                      content_hash: Optional[str] = None) -> "ContextRetrievalSystem":
+        """Build a retrieval system over a published segment without copying its arrays"""
+        system = cls(retrieval_method)
+        shared = SharedRetrievalIndex.attach(name, content_hash=content_hash)
+        system.shared_index = shared
+        system.contexts = shared.contexts
+        system.bm25 = shared.bm25
+        if shared.embeddings is not None:
+            import torch
+
+            with warnings.catch_warnings():
+                # The tensor aliases read-only shared memory; retrieval never writes to it
+                warnings.simplefilter("ignore", UserWarning)
+                system.context_embeddings = torch.from_numpy(shared.embeddings)
+        print(f" Attached to shared retrieval index '{name}' with {len(system.contexts)} contexts")
+        return system
 
-    @st.cache_resource
-    def build_retrieval_index(_self, contexts: List[str]):
-        """Build retrieval index with caching"""
-        _self.contexts = contexts
+    @classmethod
+    def build_or_attach_shared(cls, contexts: List[str], name: str,
+                               retrieval_method: str = "hybrid") -> "ContextRetrievalSystem":
+        """Attach if another worker already published this content under `name`, otherwise build and publish it
 
-        if _self.retrieval_method in ["bm25", "hybrid"]:
-            tokenized = [_self._tokenize_text(ctx) for ctx in contexts]
-            _self.bm25 = BM25Okapi(tokenized)
+        The segment name carries a hash of the passages, retrieval method and analyzer, so after the
+        knowledge base changes new workers publish a fresh segment instead of attaching a stale one
+        """
+        content_hash = content_digest(contexts, retrieval_method, get_default_analyzer().signature)
+        segment_name = f"{name}-{content_hash[:12]}"
+        try:
+            return cls.attach_shared(segment_name, retrieval_method, content_hash)
+        except FileNotFoundError:
+            pass
+        except StaleSharedIndex as e:
+            # Truncated-hash collision: serve a private index rather than mismatched passages
+            print(f" {e}; building a private index")
+            system = cls(retrieval_method)
+            system.build_retrieval_index(contexts)
+            return system
 
-        if _self.retrieval_method in ["semantic", "hybrid"]:
-            _self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-            _self.context_embeddings = _self.sentence_model.encode(
-                contexts, convert_to_tensor=True, show_progress_bar=False
+        system = cls(retrieval_method)
+        system.build_retrieval_index(contexts)
+        try:
+            system.publish_shared(segment_name, content_hash)
+        except FileExistsError:
+            # Another worker published first; drop our copy and share theirs
+            return cls.attach_shared(segment_name, retrieval_method, content_hash)
+        return system
+
+    def build_shards(self, categories: Sequence[str], routes: Dict[str, List[str]],
+                     min_route_confidence: float = 0.6, min_shard_size: int = 1):
+        """Split the built index into one BM25 + embedding shard per routed passage category"""
+        groups: Dict[str, List[int]] = {}
+        for i, category in enumerate(categories):
+            groups.setdefault(category, []).append(i)
+        routed = {category for targets in routes.values() for category in targets}
+
+        shards = {}
+        for category, ids in groups.items():
+            if category not in routed or len(ids) < min_shard_size:
+                continue
+            shard = ContextRetrievalSystem(self.retrieval_method, self.candidate_multiplier, self.analyzer)
+            shard.contexts = [self.contexts[i] for i in ids]
+            if self.bm25 is not None:
+                # IDF is computed within the shard, so category-wide terms stop dominating
+                shard.bm25 = BM25Okapi(self.analyzer.analyze_batch(shard.contexts))
+            if self.context_embeddings is not None:
+                import torch
+
+                # Rows of the global matrix; passages are never re-encoded
+                shard.context_embeddings = self.context_embeddings[torch.as_tensor(ids)]
+                shard.sentence_model = self._get_sentence_model()
+                shard.query_memo = self.query_memo
+            shards[category] = shard
+
+        self.shards = shards
+        self.shard_routes = {
+            question_category: [c for c in targets if c in shards]
+            for question_category, targets in routes.items()
+        }
+        self.min_route_confidence = min_route_confidence
+        if shards:
+            sizes = ", ".join(f"{name}: {len(shard.contexts)}" for name, shard in shards.items())
+            print(f" Built {len(shards)} category shards ({sizes})")
+
+    def route(self, category: str, confidence: float) -> List[str]:
+        """Shards a question of `category` should search; empty means use the global index"""
+        if not self.shards:
+            return []
+        targets = self.shard_routes.get(category)
+        if not targets:
+            self.shard_stats.record([], "unrouted")
+            return []
+        if confidence < self.min_route_confidence:
+            self.shard_stats.record([], "low_confidence")
+            return []
+        return targets
+
+    def get_shard_stats(self) -> Dict:
+        """Shard hit rates and global fallbacks since the index was built"""
+        stats = self.shard_stats.snapshot()
+        stats["shards"] = {name: len(shard.contexts) for name, shard in self.shards.items()}
+        return stats
+
+    def build_gazetteer(self, keywords: Iterable[str] = (), questions: Optional[Sequence[str]] = None,
+                        max_document_frequency: float = 0.2, min_candidates: int = 3):
+        """Entity -> passage inverted index that narrows scoring to passages naming the query's places"""
+        self.gazetteer = EntityGazetteer.build(
+            self.contexts, keywords, questions, max_document_frequency, min_candidates
+        )
+        print(f" Built entity gazetteer with {len(self.gazetteer.postings)} entities")
+        for shard in self.shards.values():
+            # Shards hold plain passage lists, so their questions are not available here
+            shard.gazetteer = EntityGazetteer.build(
+                shard.contexts, keywords, None, max_document_frequency, min_candidates
             )
 
-    def _tokenize_text(self, text: str) -> List[str]:
-        """Tokenize and clean text"""
-        text = text.lower()
-        tokens = word_tokenize(text)
-        tokens = [t for t in tokens if t not in self.stop_words and len(t) > 2]
-        return tokens
-
-    def retrieve_contexts(self, query: str, top_k: int = 3) -> List[str]:
-        """Retrieve top-k contexts"""
-        if self.retrieval_method == "bm25":
-            return self._bm25_retrieval(query, top_k)
-        elif self.retrieval_method == "semantic":
-            return self._semantic_retrieval(query, top_k)
+    def build_spelling(self, extra_words: Iterable[str] = ()):
+        """Spelling index over the corpus vocabulary (weighted by frequency) plus `extra_words`"""
+        words = [word for ctx in self.contexts for word in self.analyzer.words(ctx)]
+        words.extend(extra_words)
+        self.spelling = build_spelling_index(words)
+
+    def save_index(self, output_dir) -> Path:
+        """Write the built BM25 postings and embeddings as .npy files for `load_index`"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "retrieval_method": self.retrieval_method,
+            "num_contexts": len(self.contexts),
+            "analyzer": self.analyzer.signature,
+        }
+        if self.bm25 is not None:
+            bm25 = self.bm25 if isinstance(self.bm25, CompactBM25) else CompactBM25.from_bm25(self.bm25)
+            for key, array in bm25.arrays().items():
+                np.save(output_dir / f"{key}.npy", array)
+            meta["bm25_params"] = bm25.params
+        if self.context_embeddings is not None:
+            np.save(output_dir / "embeddings.npy", self.context_embeddings.cpu().numpy())
+        with open(output_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        return output_dir
+
+    @classmethod
+    def load_index(cls, index_dir, contexts: List[str]) -> "ContextRetrievalSystem":
+        """Memory-map an index written by `save_index`; nothing is re-tokenized or re-encoded"""
+        index_dir = Path(index_dir)
+        with open(index_dir / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["num_contexts"] != len(contexts):
+            raise ValueError(f"prebuilt index has {meta['num_contexts']} contexts, knowledge base has {len(contexts)}")
+
+        system = cls(meta["retrieval_method"])
+        system.contexts = contexts
+        if "bm25_params" in meta and meta.get("analyzer") != system.analyzer.signature:
+            # Terms were produced by a different analyzer; queries would never match them
+            print(f" Prebuilt BM25 index uses analyzer {meta.get('analyzer')}, rebuilding with {system.analyzer.signature}")
+            system.bm25 = BM25Okapi(system.analyzer.analyze_batch(contexts))
+        elif "bm25_params" in meta:
+            arrays = {path.stem: np.load(path, mmap_mode="r") for path in index_dir.glob("bm25_*.npy")}
+            system.bm25 = CompactBM25(arrays, meta["bm25_params"])
+        embeddings_path = index_dir / "embeddings.npy"
+        if embeddings_path.exists():
+            import torch
+
+            with warnings.catch_warnings():
+                # Read-only memory map; retrieval never writes to the embeddings
+                warnings.simplefilter("ignore", UserWarning)
+                system.context_embeddings = torch.from_numpy(np.load(embeddings_path, mmap_mode="r"))
+        return system
+
+    def close_shared(self):
+        """Detach from (and, if this process published it, remove) the shared segment"""
+        if self.shared_index is not None:
+            self.shared_index.unlink()
+            self.shared_index = None
+
+    def _get_sentence_model(self) -> "SentenceTransformer":
+        """Sentence model, loaded on first use for systems attached to a shared index"""
+        if self.sentence_model is None:
+            self.sentence_model = _load_sentence_model()
+        return self.sentence_model
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Query embedding, memoized so semantic search and the answer cache encode each question once
+
+        Callers pass the spell-corrected query (correct_query), which is what retrieval embeds
+        """
+        embedding = self.query_memo.get(query)
+        if embedding is None:
+            embedding = self._get_sentence_model().encode(query, convert_to_numpy=True, show_progress_bar=False)
+            self.query_memo.put(query, embedding)
+        return embedding
+
+    def correct_query(self, query: str) -> str:
+        """The query as retrieval sees it: misspelled place names corrected and expanded"""
+        if self.spelling is None:
+            return query
+        # "Nyungue" must reach BM25, the gazetteer and the encoder as "nyungwe"
+        return self.spelling.correct_text(query, skip=self.stop_words, expand=True)[0]
+
+    def query_entities(self, query: str) -> Tuple[str, ...]:
+        """Gazetteer entities named in the query, after spelling correction, in a stable order"""
+        if self.gazetteer is None:
+            return ()
+        return tuple(sorted(self.gazetteer.detect(self.correct_query(query))))
+
+    def _tokenize_text(self, text: str) -> Tuple[str, ...]:
+        """Query terms (memoized by the shared analyzer)"""
+        return self.analyzer.analyze(text)
+
+    def retrieve_contexts(self, query: str, top_k: int = 3, method: str = None,
+                          category: Optional[str] = None, route_confidence: float = 1.0) -> List[str]:
+        """Retrieve top-k contexts, searching only the routed category shards when `category` is given"""
+        query = self.correct_query(query)
+        shards = self.route(category, route_confidence) if category is not None else []
+        if shards:
+            ranked = [self.shards[name]._search(query, top_k, method) for name in shards]
+            # Interleave per-shard rankings; scores are not comparable across shard-local statistics
+            results = []
+            for group in zip_longest(*ranked):
+                results.extend(ctx for ctx in group if ctx is not None and ctx not in results)
+            if len(results) >= top_k:
+                self.shard_stats.record(shards)
+                return results[:top_k]
+            self.shard_stats.record(shards, "short_results")
+        return self._search(query, top_k, method)
+
+    def _search(self, query: str, top_k: int, method: Optional[str]) -> List[str]:
+        """Search this index, optionally forcing a cheaper method than the index default"""
+        method = method or self.retrieval_method
+        if method == "bm25" and self.bm25 is None:
+            method = self.retrieval_method
+        # Passages naming the query's entities; None scores the whole corpus
+        candidates = self.gazetteer.candidates(query) if self.gazetteer is not None else None
+
+        if method == "bm25":
+            return self._bm25_retrieval(query, top_k, candidates)
+        elif method == "semantic":
+            return self._semantic_retrieval(query, top_k, candidates)
         else:
-            return self._hybrid_retrieval(query, top_k)
+            return self._hybrid_retrieval(query, top_k, candidates)
 
-    def _bm25_retrieval(self, query: str, top_k: int) -> List[str]:
+    def _bm25_retrieval(self, query: str, top_k: int, candidates: Optional[np.ndarray] = None) -> List[str]:
         """BM25 retrieval"""
         tokenized_query = self._tokenize_text(query)
-        scores = self.bm25.get_scores(tokenized_query)
+        if candidates is None:
+            scores = self.bm25.get_scores(tokenized_query)
+            top_indices = np.argsort(scores)[::-1][:top_k]
+            return [self.contexts[i] for i in top_indices if scores[i] > 0]
+        scores = np.asarray(self.bm25.get_batch_scores(tokenized_query, candidates))
         top_indices = np.argsort(scores)[::-1][:top_k]
-        return [self.contexts[i] for i in top_indices if scores[i] > 0]
+        return [self.contexts[candidates[i]] for i in top_indices if scores[i] > 0]
 
-    def _semantic_retrieval(self, query: str, top_k: int) -> List[str]:
+    def _semantic_retrieval(self, query: str, top_k: int, candidates: Optional[np.ndarray] = None) -> List[str]:
         """Semantic retrieval"""
-        query_embedding = self.sentence_model.encode(query, convert_to_tensor=True)
-        cos_scores = util.cos_sim(query_embedding, self.context_embeddings)[0]
-        top_results = torch.topk(cos_scores, k=min(top_k, len(self.contexts)))
-        return [self.contexts[idx] for idx in top_results.indices]
+        import torch
+        from sentence_transformers import util
+
+        query_embedding = torch.from_numpy(self.embed_query(query))
+        if candidates is None:
+            cos_scores = util.cos_sim(query_embedding, self.context_embeddings)[0]
+            top_results = torch.topk(cos_scores, k=min(top_k, len(self.contexts)))
+            return [self.contexts[idx] for idx in top_results.indices]
+        candidate_embeddings = self.context_embeddings[torch.as_tensor(candidates, dtype=torch.long)]
+        cos_scores = util.cos_sim(query_embedding, candidate_embeddings)[0]
+        top_results = torch.topk(cos_scores, k=min(top_k, len(candidates)))
+        return [self.contexts[int(candidates[idx])] for idx in top_results.indices]
 
-    def _hybrid_retrieval(self, query: str, top_k: int) -> List[str]:
+    def _hybrid_retrieval(self, query: str, top_k: int, candidates: Optional[np.ndarray] = None) -> List[str]:
         """Hybrid retrieval combining BM25 and semantic search"""
-        bm25_results = self._bm25_retrieval(query, top_k * 2)
-        semantic_results = self._semantic_retrieval(query, top_k * 2)
+        depth = top_k * self.candidate_multiplier
+        bm25_results = self._bm25_retrieval(query, depth, candidates)
+        semantic_results = self._semantic_retrieval(query, depth, candidates)
 
         # Combine with scoring
         combined = {}
@@ -94,4 +424,4 @@ class ContextRetrievalSystem:
             combined[ctx] = combined.get(ctx, 0) + 1
 
         sorted_results = sorted(combined.items(), key=lambda x: x[1], reverse=True)
-        return [ctx for ctx, _ in sorted_results[:top_k]]
\ No newline at end of file
+        return [ctx for ctx, _ in sorted_results[:top_k]]
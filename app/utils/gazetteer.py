@@ -0,0 +1,102 @@
+"""
+Entity Gazetteer for Rwanda Tourism QA
+Inverted index from named places and tourism keywords to passage ids, used to narrow the
+candidate set before BM25 and embedding scoring
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+_SENTENCE_START_RE = re.compile(r"(?:^|[.!?:;]\s+|\n)[\"'(]*([A-Za-z0-9]+)")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text)
+
+
+def _capitalized_mid_sentence(text: str) -> List[str]:
+    """Capitalized words that do not start a sentence, i.e. capitalized because they are names"""
+    sentence_starts = Counter(_SENTENCE_START_RE.findall(text))
+    capitalized = Counter(w for w in _words(text) if w[0].isupper())
+    return [w for w, count in capitalized.items() if count > sentence_starts.get(w, 0)]
+
+
+class EntityGazetteer:
+    """Entity -> sorted passage ids; a query's candidates are the union over the entities it names"""
+
+    def __init__(self, postings: Dict[str, np.ndarray], corpus_size: int, min_candidates: int = 3):
+        self.postings = postings
+        self.corpus_size = corpus_size
+        self.min_candidates = min_candidates
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    @classmethod
+    def build(cls, passages: Sequence[str], keywords: Iterable[str] = (),
+              questions: Optional[Sequence[str]] = None, max_document_frequency: float = 0.2,
+              min_candidates: int = 3) -> "EntityGazetteer":
+        """Entities are the tourism keywords plus capitalized corpus words never used in lowercase"""
+        texts = [passage if questions is None else f"{questions[i]}. {passage}" for i, passage in enumerate(passages)]
+        documents = [_words(text) for text in texts]
+
+        # "Akagera" or "Huye" are capitalized mid-sentence and never written in lowercase;
+        # "Visitors" only starts sentences, and "Park" also appears as "park"
+        lowercase_words = {w for words in documents for w in words if w.islower()}
+        entities = {
+            w.lower() for text in texts for w in _capitalized_mid_sentence(text)
+            if w.lower() not in lowercase_words and len(w) > 2
+        }
+        entities.update(k.lower() for k in keywords)
+
+        postings: Dict[str, List[int]] = {}
+        for doc_id, words in enumerate(documents):
+            for word in {w.lower() for w in words} & entities:
+                postings.setdefault(word, []).append(doc_id)
+
+        # An entity in most passages ("rwanda", "park") would not narrow anything
+        max_df = max(1, int(max_document_frequency * len(documents)))
+        arrays = {
+            entity: np.asarray(ids, dtype=np.int32)
+            for entity, ids in postings.items() if len(ids) <= max_df
+        }
+        return cls(arrays, len(documents), min_candidates)
+
+    def detect(self, query: str) -> List[str]:
+        """Gazetteer entities named in the query"""
+        return [w for w in dict.fromkeys(w.lower() for w in _words(query)) if w in self.postings]
+
+    def candidates(self, query: str) -> Optional[np.ndarray]:
+        """Sorted candidate passage ids, or None to score the full corpus"""
+        entities = self.detect(query)
+        if not entities:
+            self._count("no_entity")
+            return None
+        ids = np.unique(np.concatenate([self.postings[e] for e in entities]))
+        if len(ids) < self.min_candidates:
+            self._count("too_few_candidates")
+            return None
+        self._count("filtered", candidates=len(ids))
+        return ids
+
+    def _count(self, outcome: str, candidates: int = 0):
+        with self._lock:
+            self.stats[outcome] += 1
+            self.stats["candidates_scored"] += candidates
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            filtered = self.stats["filtered"]
+            total = filtered + self.stats["no_entity"] + self.stats["too_few_candidates"]
+            return {
+                "entities": len(self.postings),
+                "queries": total,
+                "filtered_rate": filtered / total if total else 0.0,
+                "mean_candidates": self.stats["candidates_scored"] / filtered if filtered else 0.0,
+                "corpus_size": self.corpus_size,
+                "fallbacks": {k: self.stats[k] for k in ("no_entity", "too_few_candidates")},
+            }
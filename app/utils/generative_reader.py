@@ -0,0 +1,196 @@
+"""
+Generative Reader for Rwanda Tourism QA
+Streams answers from the fine-tuned flan-t5-small: the encoder runs once, then greedy decoding
+feeds one token per step against the cached decoder keys/values, yielding text as it is produced
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from app.config.settings import GENERATIVE_CONFIG
+from app.utils.async_runner import DeadlineExceeded, RequestDeadline
+from app.utils.offline import resolve_generative_model_path
+from app.utils.thread_topology import configure_torch_threads
+
+
+def banned_ngram_tokens(tokens: List[int], size: int) -> Set[int]:
+    """Tokens that would repeat an n-gram of `size` already present in `tokens`"""
+    if size <= 0 or len(tokens) < size:
+        return set()
+    prefix = tuple(tokens[len(tokens) - size + 1:])
+    return {
+        tokens[i + size - 1] for i in range(len(tokens) - size + 1)
+        if tuple(tokens[i:i + size - 1]) == prefix
+    }
+
+
+class GenerationStream:
+    """Iterating yields text deltas; `text` and `metrics` are complete once iteration ends"""
+
+    def __init__(self, steps: Iterator[str], metrics: Dict):
+        self._steps = steps
+        self.text = ""
+        self.metrics = metrics
+
+    def __iter__(self) -> Iterator[str]:
+        for delta in self._steps:
+            self.text += delta
+            yield delta
+
+
+class GenerativeReader:
+    """Fine-tuned flan-t5 prompted the way it was trained ("question: ..."), decoded incrementally"""
+
+    def __init__(self, model_path: Optional[str] = None, max_input_length: Optional[int] = None,
+                 max_new_tokens: Optional[int] = None, no_repeat_ngram_size: Optional[int] = None):
+        configure_torch_threads()
+        import torch
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+        self.torch = torch
+        self.model_path = model_path or resolve_generative_model_path()
+        self.max_input_length = max_input_length or GENERATIVE_CONFIG["max_input_length"]
+        self.max_new_tokens = max_new_tokens or GENERATIVE_CONFIG["max_new_tokens"]
+        self.no_repeat_ngram_size = (GENERATIVE_CONFIG["no_repeat_ngram_size"]
+                                     if no_repeat_ngram_size is None else no_repeat_ngram_size)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(self.model_path)
+        self.model.eval()
+        self._lock = threading.Lock()
+        self.stats = Counter()
+        self.recent_ttft_ms = deque(maxlen=500)
+        print(f" Generative model loaded from: {self.model_path}")
+
+    def prompt(self, question: str) -> str:
+        return f"question: {question}"
+
+    def stream(self, question: str, max_new_tokens: Optional[int] = None,
+               deadline: Optional[RequestDeadline] = None) -> GenerationStream:
+        """Answer `question` as a stream of text deltas, stopping at EOS or after `max_new_tokens`"""
+        metrics: Dict = {}
+        steps = self._decode(question, max_new_tokens or self.max_new_tokens, deadline, metrics)
+        return GenerationStream(steps, metrics)
+
+    def generate(self, question: str, max_new_tokens: Optional[int] = None,
+                 deadline: Optional[RequestDeadline] = None) -> Dict:
+        """Non-streaming convenience: the full answer plus its decode metrics"""
+        stream = self.stream(question, max_new_tokens, deadline)
+        for _ in stream:
+            pass
+        return {"answer": stream.text.strip(), **stream.metrics}
+
+    def _decode(self, question: str, max_new_tokens: int, deadline: Optional[RequestDeadline],
+                metrics: Dict) -> Iterator[str]:
+        torch = self.torch
+        started = time.perf_counter()
+        first_token_at = None
+        generated: List[int] = []
+        probabilities: List[float] = []
+        emitted = ""
+        stop_reason = "max_new_tokens"
+        eos_id = self.tokenizer.eos_token_id
+        try:
+            # inference_mode is thread-local grad state: enter it per step and never yield inside it,
+            # or the consumer's code between tokens would run with it (and with it leaked on abandon)
+            with torch.inference_mode():
+                inputs = self.tokenizer(
+                    self.prompt(question), return_tensors="pt", truncation=True, max_length=self.max_input_length
+                )
+                encoder_outputs = self.model.get_encoder()(**inputs)
+                next_input = torch.tensor([[self.model.config.decoder_start_token_id]])
+            past_key_values = None
+            for _ in range(max_new_tokens):
+                if deadline:
+                    deadline.check("generation")
+                with torch.inference_mode():
+                    outputs = self.model(
+                        encoder_outputs=encoder_outputs,
+                        attention_mask=inputs["attention_mask"],
+                        decoder_input_ids=next_input,
+                        past_key_values=past_key_values,
+                        use_cache=True,
+                    )
+                    # Only the newest token goes in next step; earlier ones live in the cache
+                    past_key_values = outputs.past_key_values
+                    logits = outputs.logits[0, -1]
+                    banned = banned_ngram_tokens(generated, self.no_repeat_ngram_size)
+                    if banned:
+                        logits[list(banned)] = float("-inf")
+                    token_id = int(logits.argmax())
+                    probability = float(torch.softmax(logits, dim=-1)[token_id])
+                if token_id == eos_id:
+                    stop_reason = "eos"
+                    break
+                generated.append(token_id)
+                probabilities.append(probability)
+                next_input = torch.tensor([[token_id]])
+
+                # Decode the whole prefix: SentencePiece spacing depends on neighbouring tokens
+                text = self.tokenizer.decode(generated, skip_special_tokens=True)
+                if len(text) > len(emitted) and text.startswith(emitted):
+                    delta, emitted = text[len(emitted):], text
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    yield delta
+        except DeadlineExceeded:
+            stop_reason = "deadline"
+            raise
+        except GeneratorExit:
+            stop_reason = "abandoned"  # the consumer stopped reading, e.g. the browser went away
+            raise
+        finally:
+            total_ms = (time.perf_counter() - started) * 1000
+            ttft_ms = (first_token_at - started) * 1000 if first_token_at is not None else total_ms
+            decode_seconds = total_ms / 1000
+            metrics.update({
+                "ttft_ms": ttft_ms,
+                "total_ms": total_ms,
+                "new_tokens": len(generated),
+                "tokens_per_second": len(generated) / decode_seconds if decode_seconds > 0 else 0.0,
+                # Mean probability of the chosen tokens stands in for the extractive reader's span score
+                "confidence": sum(probabilities) / len(probabilities) if probabilities else 0.0,
+                "stop_reason": stop_reason,
+            })
+            self._record(metrics)
+
+    def _record(self, metrics: Dict):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[metrics["stop_reason"]] += 1
+            self.stats["new_tokens"] += metrics["new_tokens"]
+            self.recent_ttft_ms.append(metrics["ttft_ms"])
+
+    def get_stats(self) -> Dict:
+        """Request count, stop reasons and time-to-first-token percentiles over recent requests"""
+        with self._lock:
+            ttft = sorted(self.recent_ttft_ms)
+            requests = self.stats["requests"]
+
+            def percentile(q: float) -> float:
+                return ttft[min(len(ttft) - 1, int(q * len(ttft)))] if ttft else 0.0
+
+            return {
+                "requests": requests,
+                "ttft_p50_ms": percentile(0.5),
+                "ttft_p95_ms": percentile(0.95),
+                "mean_new_tokens": self.stats["new_tokens"] / requests if requests else 0.0,
+                "stop_reasons": {k: self.stats[k] for k in ("eos", "max_new_tokens", "deadline", "abandoned")},
+            }
+
+
+class StreamingAnswer:
+    """A chatbot answer delivered in pieces; `response` is the usual response dict once consumed"""
+
+    def __init__(self, chunks: Iterable[str], finalize: Callable[[str], Dict]):
+        self._chunks = chunks
+        self._finalize = finalize
+        self.response: Optional[Dict] = None
+
+    def __iter__(self) -> Iterator[str]:
+        parts = []
+        for chunk in self._chunks:
+            parts.append(chunk)
+            yield chunk
+        self.response = self._finalize("".join(parts))
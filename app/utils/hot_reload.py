@@ -0,0 +1,80 @@
+"""
+Knowledge Base Hot Reload for Rwanda Tourism QA
+Immutable index snapshots plus a polling file watcher that triggers background rebuilds
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class IndexSnapshot(NamedTuple):
+    """Everything a request needs from the knowledge base, swapped as one reference"""
+    knowledge_base: Sequence[str]
+    retrieval_system: object
+    version: int
+    source: Optional[str]
+
+
+class KnowledgeBaseWatcher:
+    """Poll files for changes and call `on_change` once they have settled"""
+
+    def __init__(self, paths: List[str], on_change: Callable[[], None], interval: float = 5.0):
+        self.paths = [str(p) for p in paths]
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pending = None
+        self._last_seen = self._fingerprint()
+
+    def _fingerprint(self, paths: Optional[List[str]] = None) -> Dict[str, Optional[Tuple[float, int]]]:
+        """(mtime, size) per watched path; None for paths that do not exist"""
+        state = {}
+        for path in paths or self.paths:
+            try:
+                stat = os.stat(path)
+                state[path] = (stat.st_mtime, stat.st_size)
+            except OSError:
+                state[path] = None
+        return state
+
+    def acknowledge(self, paths: List[str]):
+        """Accept the current state of `paths` as seen: the app wrote them itself (e.g. a KB conversion)"""
+        paths = [str(p) for p in paths if str(p) in self.paths]
+        current = self._fingerprint(paths)
+        with self._lock:
+            self._last_seen.update(current)
+            if self._pending is not None:
+                self._pending.update(current)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            current = self._fingerprint()
+            with self._lock:
+                if current == self._last_seen:
+                    continue
+                # Wait one more interval without changes so half-written files are not loaded
+                if current != self._pending:
+                    self._pending = current
+                    continue
+                self._last_seen = current
+                self._pending = None
+            print(" Knowledge base change detected, rebuilding index in the background")
+            try:
+                self.on_change()
+            except Exception as e:
+                print(f" Knowledge base reload trigger failed: {e}")
+
+    def start(self):
+        """Start watching on a daemon thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="kb-watcher")
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching; an in-progress rebuild keeps running"""
+        self._stop.set()
@@ -0,0 +1,196 @@
+"""
+Compact Knowledge Base Store for Rwanda Tourism QA
+Memory-mapped binary knowledge base: UTF-8 blobs + offsets, decoded only when a passage is read.
+Each conversion writes a complete generation directory; the knowledge base path is a symlink
+switched to the new generation in one atomic rename, so readers never mix files of two generations
+
+Convert the CSV dataset once:
+    python -m app.utils.kb_store Data/visitRwanda_qa.csv Data/visitRwanda_kb
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from app.utils.shared_index import PackedStrings, pack_strings
+
+KB_FORMAT = "visitrwanda-kb"
+KB_VERSION = 1
+# Generations kept besides the live one, for readers still opening the previous generation
+KEEP_GENERATIONS = 1
+# Younger generations are never pruned: another process may still be writing or publishing one
+GENERATION_GRACE_SECONDS = 300
+
+
+def _write_file(path: Path, write: Callable):
+    with open(path, "wb") as f:
+        write(f)
+
+
+def _write_blob(directory: Path, stem: str, strings: List[str]):
+    blob, offsets = pack_strings(strings)
+    _write_file(directory / f"{stem}.bin", lambda f: f.write(blob.tobytes()))
+    _write_file(directory / f"{stem}.offsets.npy", lambda f: np.save(f, offsets))
+
+
+def _generation_prefix(output_dir: Path) -> str:
+    return f".{output_dir.name}.gen-"
+
+
+def _publish_generation(generation: Path, output_dir: Path):
+    """Make `output_dir` point at the fully written `generation` with a single atomic rename"""
+    if not os.path.lexists(output_dir):
+        try:
+            os.replace(generation, output_dir)  # first build: a plain directory, e.g. inside a bundle
+            return
+        except OSError:
+            if not output_dir.exists():
+                raise
+            # Another process built it at the same moment from the same CSV; keep theirs
+            shutil.rmtree(generation, ignore_errors=True)
+            return
+    if output_dir.is_dir() and not output_dir.is_symlink():
+        # A plain directory from an earlier build cannot be swapped atomically; move it aside once
+        os.replace(output_dir, output_dir.with_name(f"{_generation_prefix(output_dir)}legacy-{uuid.uuid4().hex[:8]}"))
+    link = output_dir.with_name(f".{output_dir.name}.link-{uuid.uuid4().hex}")
+    os.symlink(generation.name, link)
+    os.replace(link, output_dir)
+
+
+def _prune_generations(output_dir: Path):
+    """Delete old generations; the live one, the newest KEEP_GENERATIONS others and recent ones stay"""
+    live = output_dir.resolve()
+    generations = []
+    for path in output_dir.parent.glob(_generation_prefix(output_dir) + "*"):
+        try:
+            if path.resolve() != live:
+                generations.append((path.stat().st_mtime, path))
+        except OSError:
+            continue  # pruned by a concurrent conversion
+    generations.sort(reverse=True)
+    cutoff = time.time() - GENERATION_GRACE_SECONDS
+    for mtime, old in generations[KEEP_GENERATIONS:]:
+        if mtime < cutoff:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def _map_blob(directory: Path, stem: str) -> PackedStrings:
+    offsets = np.load(directory / f"{stem}.offsets.npy", mmap_mode="r")
+    blob_path = directory / f"{stem}.bin"
+    if blob_path.stat().st_size == 0:
+        blob = np.zeros(0, dtype=np.uint8)
+    else:
+        blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+    return PackedStrings(blob, offsets)
+
+
+class CompactKnowledgeBase(Sequence):
+    """Read-only, memory-mapped list of passages with per-passage category and question"""
+
+    def __init__(self, path):
+        # Resolve the generation symlink once so every file below comes from the same generation
+        self.path = Path(path).resolve()
+        with open(self.path / "manifest.json", "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != KB_FORMAT or self.manifest.get("version") != KB_VERSION:
+            raise ValueError(f"{self.path} is not a {KB_FORMAT} v{KB_VERSION} knowledge base")
+
+        self._passages = _map_blob(self.path, "passages")
+        self._questions = _map_blob(self.path, "questions")
+        self._category_codes = np.load(self.path / "categories.npy", mmap_mode="r")
+        self.category_names: List[str] = self.manifest["categories"]
+
+    def __len__(self) -> int:
+        return len(self._passages)
+
+    def __getitem__(self, index):
+        return self._passages[index]
+
+    def category(self, index: int) -> str:
+        """Category label of passage `index`"""
+        return self.category_names[int(self._category_codes[index])]
+
+    def question(self, index: int) -> str:
+        """First dataset question whose answer is passage `index`"""
+        return self._questions[index]
+
+    def questions(self) -> List[str]:
+        """First dataset question for every passage, in passage order"""
+        return list(self._questions)
+
+    def categories(self) -> List[str]:
+        """Category label for every passage, in passage order"""
+        return [self.category_names[int(code)] for code in self._category_codes]
+
+
+def convert_csv(csv_path, output_dir, text_column: str = "answer") -> Dict:
+    """Write the compact format from a dataset CSV, keeping unique non-empty answers in file order
+
+    Concurrent conversions each write their own generation directory; the last switch wins
+    """
+    output_dir = Path(output_dir)
+    output_dir.parent.mkdir(parents=True, exist_ok=True)
+    generation = Path(tempfile.mkdtemp(prefix=_generation_prefix(output_dir), dir=output_dir.parent))
+
+    passages, questions, category_codes = [], [], []
+    category_names: List[str] = []
+    seen = set()
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            text = (row.get(text_column) or "").strip()
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            category = (row.get("category") or "").strip()
+            if category not in category_names:
+                category_names.append(category)
+            passages.append(text)
+            questions.append((row.get("question") or "").strip())
+            category_codes.append(category_names.index(category))
+
+    _write_blob(generation, "passages", passages)
+    _write_blob(generation, "questions", questions)
+    codes = np.asarray(category_codes, dtype=np.uint16)
+    _write_file(generation / "categories.npy", lambda f: np.save(f, codes))
+
+    manifest = {
+        "format": KB_FORMAT,
+        "version": KB_VERSION,
+        "count": len(passages),
+        "categories": category_names,
+        "source": os.path.basename(str(csv_path)),
+        "text_column": text_column,
+    }
+    _write_file(generation / "manifest.json", lambda f: f.write(json.dumps(manifest, indent=2).encode("utf-8")))
+    os.chmod(generation, 0o755)  # mkdtemp creates it private
+    try:
+        _publish_generation(generation, output_dir)
+    except OSError:
+        shutil.rmtree(generation, ignore_errors=True)
+        raise
+    _prune_generations(output_dir)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a Visit Rwanda QA CSV into the compact knowledge base format")
+    parser.add_argument("csv_path", help="Dataset CSV with category, question and answer columns")
+    parser.add_argument("output_dir", help="Directory to write the compact knowledge base into")
+    parser.add_argument("--text-column", default="answer", help="Column whose unique values become passages")
+    args = parser.parse_args()
+
+    manifest = convert_csv(args.csv_path, args.output_dir, args.text_column)
+    print(f" Wrote {manifest['count']} passages ({len(manifest['categories'])} categories) to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
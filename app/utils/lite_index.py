@@ -0,0 +1,152 @@
+"""
+Lightweight Answer Index for Rwanda Tourism QA
+BM25 over the dataset's question and answer columns that returns the best stored answer.
+Only needs numpy and rank_bm25, so lite replicas never import torch, transformers or
+sentence-transformers
+"""
+
+import csv
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from app.utils.shared_index import PackedStrings, pack_strings
+from app.utils.spelling import SymSpellIndex, build_spelling_index
+from app.utils.text_analyzer import TextAnalyzer, get_default_analyzer
+
+
+class LiteAnswerIndex:
+    """Curated-answer lookup: match the question against stored questions and answers"""
+
+    def __init__(self, questions: Sequence[str], answers: Sequence[str], question_weight: float = 0.6,
+                 analyzer: Optional[TextAnalyzer] = None):
+        if len(questions) != len(answers):
+            raise ValueError("questions and answers must have the same length")
+        self.analyzer = analyzer or get_default_analyzer()
+        self.stop_words = self.analyzer.stop_words
+        self.questions = list(questions)
+        self.answers = list(answers)
+        self.question_weight = question_weight
+
+        question_tokens = self.analyzer.analyze_batch(self.questions)
+        answer_tokens = self.analyzer.analyze_batch(self.answers)
+        # BM25Okapi divides by the average document length, so skip a column with no text
+        self.question_bm25 = BM25Okapi(question_tokens) if any(question_tokens) else None
+        self.answer_bm25 = BM25Okapi(answer_tokens) if any(answer_tokens) else None
+        self.row_terms = [frozenset(q) | frozenset(a) for q, a in zip(question_tokens, answer_tokens)]
+
+        idf: Dict[str, float] = {}
+        for bm25 in (self.question_bm25, self.answer_bm25):
+            if bm25 is not None:
+                for term, value in bm25.idf.items():
+                    idf[term] = max(idf.get(term, 0.0), value)
+        self.idf = idf
+        self.max_idf = max(idf.values()) if idf else 1.0
+
+        # Same attributes the warmup and readiness code look for on ContextRetrievalSystem
+        self.contexts = list(dict.fromkeys(self.answers))
+        self.bm25 = self.answer_bm25
+        self.context_embeddings = None
+        self.shards = {}
+        self.gazetteer = None
+        self.spelling: Optional[SymSpellIndex] = None
+
+    @classmethod
+    def from_csv(cls, csv_path, question_weight: float = 0.6) -> "LiteAnswerIndex":
+        """Every row with a non-empty answer, so paraphrased questions all point at their answer"""
+        questions, answers = [], []
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                answer = (row.get("answer") or "").strip()
+                if answer:
+                    questions.append((row.get("question") or "").strip())
+                    answers.append(answer)
+        return cls(questions, answers, question_weight)
+
+    @classmethod
+    def from_knowledge_base(cls, knowledge_base: Sequence[str], question_weight: float = 0.6) -> "LiteAnswerIndex":
+        """One row per passage; questions come from a compact knowledge base when it has them"""
+        if hasattr(knowledge_base, "question"):
+            questions = [knowledge_base.question(i) for i in range(len(knowledge_base))]
+        else:
+            questions = [""] * len(knowledge_base)
+        return cls(questions, list(knowledge_base), question_weight)
+
+    def build_spelling(self, extra_words: Iterable[str] = ()):
+        """Spelling index over the stored questions' and answers' vocabulary plus `extra_words`"""
+        words = [word for text in [*self.questions, *self.answers] for word in self.analyzer.words(text)]
+        words.extend(extra_words)
+        self.spelling = build_spelling_index(words)
+
+    def pack(self) -> bool:
+        """Replace the question, answer and context lists with UTF-8 blobs plus offsets; False if already packed"""
+        if isinstance(self.answers, PackedStrings):
+            return False
+        self.questions = PackedStrings(*pack_strings(self.questions))
+        self.answers = PackedStrings(*pack_strings(self.answers))
+        self.contexts = PackedStrings(*pack_strings(self.contexts))
+        return True
+
+    def _correct(self, query: str) -> Tuple[str, List[Tuple[str, str]]]:
+        if self.spelling is None:
+            return query, []
+        return self.spelling.correct_text(query, skip=self.stop_words, expand=True)
+
+    def _tokenize_text(self, text: str) -> Tuple[str, ...]:
+        """Query terms from the analyzer shared with the full retriever"""
+        return self.analyzer.analyze(text)
+
+    def _scores(self, query_tokens: List[str]) -> np.ndarray:
+        scores = np.zeros(len(self.answers))
+        if self.question_bm25 is not None:
+            scores += self.question_weight * self.question_bm25.get_scores(query_tokens)
+        if self.answer_bm25 is not None:
+            scores += (1 - self.question_weight) * self.answer_bm25.get_scores(query_tokens)
+        return scores
+
+    def search(self, query: str, top_k: int = 1) -> List[Tuple[int, float]]:
+        """Best rows as (row, score), one row per distinct answer"""
+        return self._rank(self._correct(query)[0], top_k)
+
+    def _rank(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        scores = self._scores(self._tokenize_text(query))
+        results, seen = [], set()
+        for row in np.argsort(scores)[::-1]:
+            if scores[row] <= 0 or len(results) >= top_k:
+                break
+            if self.answers[row] not in seen:
+                seen.add(self.answers[row])
+                results.append((int(row), float(scores[row])))
+        return results
+
+    def lexical_confidence(self, query: str, row: int, ignore: Iterable[str] = ()) -> float:
+        """IDF-weighted share of the query's terms that appear in the row's question or answer"""
+        # Ignored words go through the analyzer too, so they match stemmed query terms
+        ignored = {term for word in ignore for term in self.analyzer.analyze(word)}
+        terms = set(self._tokenize_text(query)) - ignored
+        if not terms:
+            return 0.0
+        # Terms the dataset never uses count as fully informative misses
+        weights = {term: self.idf.get(term, self.max_idf) for term in terms}
+        matched = sum(weight for term, weight in weights.items() if term in self.row_terms[row])
+        return matched / sum(weights.values())
+
+    def answer(self, query: str) -> Optional[Dict]:
+        """Top stored answer with its lexical confidence, or None when nothing matches"""
+        query, corrections = self._correct(query)
+        results = self._rank(query, top_k=1)
+        if not results:
+            return None
+        row, score = results[0]
+        return {
+            "answer": self.answers[row],
+            # Misspelled originals stay in the expanded query but should not count as misses
+            "confidence": self.lexical_confidence(query, row, [wrong.lower() for wrong, _ in corrections]),
+            "matched_question": self.questions[row],
+            "score": score,
+        }
+
+    def retrieve_contexts(self, query: str, top_k: int = 3, method: str = None, **kwargs) -> List[str]:
+        """ContextRetrievalSystem-compatible: best distinct answers for the query"""
+        return [self.answers[row] for row, _ in self.search(query, top_k)]
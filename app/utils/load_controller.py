@@ -0,0 +1,82 @@
+"""
+Load-Adaptive Degradation Controller for Rwanda Tourism QA
+Steps requests down to cheaper answer paths as in-flight load and latency rise
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+import numpy as np
+
+from app.config.settings import LOAD_CONFIG
+
+# Ordered from most to least expensive answer path
+TIERS = [
+    "full",            # keyword gate -> hybrid retrieval -> QA model
+    "lexical_only",    # drop semantic retrieval, BM25 only
+    "reduced_top_k",   # BM25 only with fewer passages fed to the QA model
+    "retrieval_only",  # return the best retrieved passage, skip the QA model
+    "cache_only",      # only answer from previously computed answers
+]
+
+
+class LoadController:
+    """Watch in-flight requests and recent latency, pick the tier for each request"""
+
+    def __init__(self, config: Dict = None):
+        self.config = config or LOAD_CONFIG
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latencies = deque(maxlen=self.config["latency_window"])
+        self.tier_counts = Counter()
+
+    def _tier_from_thresholds(self, value: float, thresholds) -> int:
+        """Number of thresholds `value` has reached, i.e. how many tiers to step down"""
+        return sum(1 for threshold in thresholds if value >= threshold)
+
+    def current_tier(self) -> int:
+        """Tier index a request admitted right now would be served at"""
+        if not self.config.get("enabled", True):
+            return 0
+        with self._lock:
+            in_flight = self._in_flight
+            latencies = list(self._latencies)
+
+        tier = self._tier_from_thresholds(in_flight, self.config["in_flight_thresholds"])
+        if len(latencies) >= self.config["min_latency_samples"]:
+            recent_ms = float(np.percentile(latencies, self.config["latency_percentile"]))
+            tier = max(tier, self._tier_from_thresholds(recent_ms, self.config["latency_thresholds_ms"]))
+        return min(tier, len(TIERS) - 1)
+
+    @contextmanager
+    def track(self) -> Iterator[str]:
+        """Admit a request, yield its tier name, and record its latency on exit"""
+        tier = TIERS[self.current_tier()]
+        with self._lock:
+            self._in_flight += 1
+            self.tier_counts[tier] += 1
+        started = time.perf_counter()
+        try:
+            yield tier
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._in_flight -= 1
+                self._latencies.append(elapsed_ms)
+
+    def get_stats(self) -> Dict:
+        """Snapshot of load signals and how many requests each tier served"""
+        with self._lock:
+            latencies = list(self._latencies)
+            in_flight = self._in_flight
+            counts = dict(self.tier_counts)
+        return {
+            "in_flight": in_flight,
+            "current_tier": TIERS[self.current_tier()],
+            "recent_p50_ms": float(np.percentile(latencies, 50)) if latencies else 0.0,
+            "recent_p90_ms": float(np.percentile(latencies, 90)) if latencies else 0.0,
+            "tier_counts": counts,
+        }
@@ -0,0 +1,132 @@
+"""
+Memory Accounting for Rwanda Tourism QA
+Per-component resident size estimates (models, embeddings, BM25, knowledge base, caches) and
+process RSS, used by the chatbot's memory report and memory budget
+"""
+
+import ctypes
+import mmap
+import os
+import resource
+import sys
+import types
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Walking into these would account for the interpreter, not the component
+_SKIP_TYPES = (types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType, types.CodeType, types.FrameType)
+
+
+def process_rss_bytes() -> int:
+    """Current resident set size (falls back to peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def release_free_memory():
+    """Ask glibc to hand freed heap pages back to the OS so RSS reflects what was dropped"""
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _is_tensor(obj) -> bool:
+    return hasattr(obj, "untyped_storage") and hasattr(obj, "element_size")
+
+
+def _is_module(obj) -> bool:
+    return hasattr(obj, "parameters") and hasattr(obj, "buffers") and callable(obj.parameters)
+
+
+def _array_is_mapped(array: np.ndarray) -> bool:
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap, memoryview)):
+            return True
+        base = getattr(base, "base", None)
+    return False
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> Tuple[int, int]:
+    """(heap bytes, mapped bytes) reachable from `obj`; objects in `seen` are not counted again
+
+    Memory-mapped and shared-memory arrays are reported as mapped: they are backed by files or
+    segments the kernel can evict or share between workers
+    """
+    seen = set() if seen is None else seen
+    heap = mapped = 0
+    stack = deque([obj])
+    while stack:
+        item = stack.pop()
+        if item is None or id(item) in seen or isinstance(item, _SKIP_TYPES):
+            continue
+        seen.add(id(item))
+
+        if isinstance(item, np.ndarray):
+            if _array_is_mapped(item):
+                mapped += item.nbytes
+            elif item.base is None:
+                heap += item.nbytes
+            else:
+                stack.append(item.base)  # a view: count the owner once
+        elif _is_tensor(item):
+            storage_key = ("storage", item.untyped_storage().data_ptr())
+            if storage_key not in seen:
+                seen.add(storage_key)
+                heap += item.untyped_storage().nbytes()
+        elif _is_module(item):
+            stack.extend(item.parameters())
+            stack.extend(item.buffers())
+        elif isinstance(item, (str, bytes, bytearray, int, float, bool)):
+            heap += sys.getsizeof(item)
+        elif isinstance(item, dict):
+            heap += sys.getsizeof(item)
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            heap += sys.getsizeof(item)
+            stack.extend(item)
+        elif isinstance(item, (mmap.mmap, memoryview)):
+            mapped += len(item)
+        else:
+            heap += sys.getsizeof(item)
+            if hasattr(item, "__dict__"):
+                stack.extend(vars(item).values())
+    return heap, mapped
+
+
+def component_report(components: Dict[str, object]) -> Dict:
+    """Size every component in order; something shared is charged to the first component reaching it"""
+    seen: set = set()
+    sizes = {}
+    for name, obj in components.items():
+        if obj is None:
+            continue
+        heap, mapped = deep_sizeof(obj, seen)
+        sizes[name] = {"heap_bytes": heap, "mapped_bytes": mapped}
+    rss = process_rss_bytes()
+    accounted = sum(size["heap_bytes"] for size in sizes.values())
+    return {
+        "rss_bytes": rss,
+        "components": sizes,
+        "accounted_heap_bytes": accounted,
+        # Interpreter, imported libraries, allocator slack and whatever the kernel keeps mapped
+        "unaccounted_bytes": max(rss - accounted, 0),
+    }
+
+
+def format_report(report: Dict) -> str:
+    lines = [f" RSS {report['rss_bytes'] / 1e6:.1f} MB"]
+    for name, size in sorted(report["components"].items(), key=lambda kv: -kv[1]["heap_bytes"]):
+        mapped = f" (+{size['mapped_bytes'] / 1e6:.1f} MB mapped)" if size["mapped_bytes"] else ""
+        lines.append(f"   {name:<20}{size['heap_bytes'] / 1e6:>9.2f} MB{mapped}")
+    lines.append(f"   {'unaccounted':<20}{report['unaccounted_bytes'] / 1e6:>9.2f} MB")
+    return "\n".join(lines)
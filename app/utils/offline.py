@@ -0,0 +1,236 @@
+"""
+Offline Artifact Bundle for Rwanda Tourism QA
+Resolves models, NLTK data, knowledge base and prebuilt index from a bundle built by
+`python -m app.tools.build_bundle`, and fails fast in strict offline mode
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config.settings import GENERATIVE_CONFIG, MODEL_CONFIG, OFFLINE_CONFIG
+
+BUNDLE_FORMAT = "visitrwanda-bundle"
+BUNDLE_VERSION = 1
+
+# Relative locations inside a bundle
+QA_MODEL_DIR = "qa_model"
+EMBEDDING_MODEL_DIR = "embedding_model"
+NLTK_DATA_DIR = "nltk_data"
+KNOWLEDGE_BASE_DIR = "knowledge_base"
+INDEX_DIR = "index"
+# Optional: only bundles built for the generative reader carry it
+GENERATIVE_MODEL_DIR = "generative_model"
+REQUIRED_DIRS = [QA_MODEL_DIR, EMBEDDING_MODEL_DIR, NLTK_DATA_DIR, KNOWLEDGE_BASE_DIR, INDEX_DIR]
+# Written once the checksums have been verified; later starts skip hashing while it still matches
+VERIFIED_MARKER = ".verified"
+
+# NLTK resources shipped in bundles, as (nltk.data path, download name); retrieval tokenizes
+# with app.utils.text_analyzer and no longer loads them
+NLTK_RESOURCES = [
+    ("corpora/stopwords", "stopwords"),
+    ("tokenizers/punkt", "punkt"),
+    ("tokenizers/punkt_tab", "punkt_tab"),
+]
+
+
+class BundleError(RuntimeError):
+    """The offline bundle is missing, incomplete or corrupted"""
+
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _files_fingerprint(root: Path, files: Dict) -> str:
+    """Hash of (path, size, mtime) for every manifest file: changes if any file is rewritten"""
+    digest = hashlib.sha256()
+    for rel_path in sorted(files):
+        try:
+            stat = (root / rel_path).stat()
+        except OSError:
+            return ""
+        digest.update(f"{rel_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ArtifactBundle:
+    """A verified bundle directory"""
+
+    def __init__(self, root, verify_checksums: bool = True, force: bool = False):
+        self.root = Path(root)
+        manifest_path = self.root / "manifest.json"
+        if not manifest_path.exists():
+            raise BundleError(f"no manifest.json in bundle {self.root}")
+        self.manifest_sha256 = sha256_file(manifest_path)
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != BUNDLE_FORMAT or self.manifest.get("version") != BUNDLE_VERSION:
+            raise BundleError(f"{self.root} is not a {BUNDLE_FORMAT} v{BUNDLE_VERSION} bundle")
+        self.verify(verify_checksums, force)
+
+    def _marker(self) -> Dict:
+        return {
+            "manifest_sha256": self.manifest_sha256,
+            "files": _files_fingerprint(self.root, self.manifest.get("files", {})),
+        }
+
+    def is_verified(self) -> bool:
+        """True if the checksums were verified before and no manifest file changed since"""
+        try:
+            with open(self.root / VERIFIED_MARKER, "r", encoding="utf-8") as f:
+                return json.load(f) == self._marker()
+        except (OSError, ValueError):
+            return False
+
+    def mark_verified(self) -> bool:
+        """Record that every checksum matched; False on a read-only bundle (it is then hashed each start)"""
+        try:
+            with open(self.root / VERIFIED_MARKER, "w", encoding="utf-8") as f:
+                json.dump(self._marker(), f)
+            return True
+        except OSError:
+            return False
+
+    def verify(self, checksums: bool = True, force: bool = False):
+        """Every required directory and manifest file must be present (and match, if `checksums`)
+
+        Hashing a multi-GB bundle takes seconds, so once it passes a marker records it and later
+        calls only check presence and sizes; `force` hashes again regardless
+        """
+        hashed = checksums and (force or not self.is_verified())
+        problems: List[str] = []
+        for name in REQUIRED_DIRS:
+            if not (self.root / name).is_dir():
+                problems.append(f"missing directory {name}/")
+        for rel_path, entry in self.manifest.get("files", {}).items():
+            path = self.root / rel_path
+            if not path.exists():
+                problems.append(f"missing file {rel_path}")
+            elif path.stat().st_size != entry["size"]:
+                problems.append(f"size mismatch {rel_path}")
+            elif hashed and sha256_file(path) != entry["sha256"]:
+                problems.append(f"checksum mismatch {rel_path}")
+        if problems:
+            raise BundleError(f"bundle {self.root} failed verification: " + "; ".join(problems[:10]))
+        if hashed:
+            self.mark_verified()
+
+    def path(self, name: str) -> Path:
+        return self.root / name
+
+
+_active_bundle: Optional[ArtifactBundle] = None
+_activated = False
+_activate_lock = threading.Lock()
+
+
+def is_strict() -> bool:
+    return OFFLINE_CONFIG["strict"]
+
+
+def activate_bundle() -> Optional[ArtifactBundle]:
+    """Verify the configured bundle once and point HF/NLTK at it; None when no bundle is configured"""
+    global _active_bundle, _activated
+    with _activate_lock:
+        if _activated:
+            return _active_bundle
+        bundle_dir = OFFLINE_CONFIG["bundle_dir"]
+        if not bundle_dir:
+            if is_strict():
+                raise BundleError("strict offline mode needs VISITRWANDA_BUNDLE_DIR to point at a bundle")
+            _activated = True
+            return None
+
+        bundle = ArtifactBundle(bundle_dir, OFFLINE_CONFIG["verify_checksums"])
+        nltk_dir = str(bundle.path(NLTK_DATA_DIR))
+        os.environ["NLTK_DATA"] = nltk_dir
+        try:
+            import nltk
+            if nltk_dir not in nltk.data.path:
+                nltk.data.path.insert(0, nltk_dir)
+        except ImportError:
+            pass
+        if is_strict():
+            # Any accidental hub lookup now raises instead of reaching for the network
+            os.environ["HF_HUB_OFFLINE"] = "1"
+            os.environ["TRANSFORMERS_OFFLINE"] = "1"
+        print(f" Using offline artifact bundle: {bundle.root}")
+        _active_bundle = bundle
+        _activated = True
+        return bundle
+
+
+def ensure_nltk_data():
+    """Make sure tokenizer/stopword data is available; only downloads when not in strict offline mode"""
+    import nltk
+
+    activate_bundle()
+    missing = []
+    for resource, name in NLTK_RESOURCES:
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(name)
+    if not missing:
+        return
+    if is_strict():
+        raise BundleError(f"NLTK data missing from offline bundle: {', '.join(missing)}")
+    for name in missing:
+        nltk.download(name, quiet=True)
+
+
+def _bundle_path(name: str) -> Optional[Path]:
+    bundle = activate_bundle()
+    return bundle.path(name) if bundle else None
+
+
+def resolve_qa_model_path() -> str:
+    """QA checkpoint directory: the bundle's copy when active, else MODEL_CONFIG"""
+    path = _bundle_path(QA_MODEL_DIR)
+    return str(path) if path else str(MODEL_CONFIG["model_path"])
+
+
+def resolve_generative_model_path() -> str:
+    """Fine-tuned flan-t5 directory: the bundle's copy when it has one, else GENERATIVE_CONFIG"""
+    path = _bundle_path(GENERATIVE_MODEL_DIR)
+    if path and path.exists():
+        return str(path)
+    if is_strict():
+        # Checked before the reader loads, so the process stops with this instead of a hub lookup error
+        raise BundleError(
+            f"reader=generative needs {GENERATIVE_MODEL_DIR}/ in the offline bundle; rebuild it with "
+            f"`python -m app.tools.build_bundle --generative-model {GENERATIVE_CONFIG['model_path']}` "
+            f"or set VISITRWANDA_READER=extractive"
+        )
+    return str(GENERATIVE_CONFIG["model_path"])
+
+
+def resolve_embedding_model() -> str:
+    """Sentence-transformer name or local directory for semantic retrieval"""
+    path = _bundle_path(EMBEDDING_MODEL_DIR)
+    return str(path) if path else MODEL_CONFIG["embedding_model"]
+
+
+def bundled_knowledge_base_dir() -> Optional[Path]:
+    return _bundle_path(KNOWLEDGE_BASE_DIR)
+
+
+def bundled_index_dir() -> Optional[Path]:
+    return _bundle_path(INDEX_DIR)
+
+
+def build_manifest(root: Path, components: Dict) -> Dict:
+    """Checksums of every file under `root`, written last by the bundle builder"""
+    files = {}
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and path.name != "manifest.json":
+            files[path.relative_to(root).as_posix()] = {"sha256": sha256_file(path), "size": path.stat().st_size}
+    return {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "components": components, "files": files}
@@ -0,0 +1,598 @@
+"""
+Stage Pipeline for Rwanda Tourism QA
+Declarative cache -> gate -> retriever -> fusion -> reader pipelines built from PIPELINE_CONFIG.
+Loaded components (QA model, retrieval index, question handler) live in a shared registry, so
+several configured pipelines can run side by side in one process without loading anything twice.
+RwandaTourismChatbot.answer_question runs one such pipeline per load tier
+"""
+
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+from app.config.settings import PIPELINE_CONFIG
+from app.utils.async_runner import RequestDeadline, overloaded_response
+
+# A stage sets state["response"] to end the request early (cache hit, non-tourism question)
+RESPONSE = "response"
+
+
+class ComponentRegistry:
+    """Loaded components by name plus a memo of stage outputs, shared by every pipeline using it"""
+
+    def __init__(self, memo_size: Optional[int] = None):
+        self._components: Dict[str, object] = {}
+        self._lock = threading.RLock()
+        self.memo_size = PIPELINE_CONFIG["memo_size"] if memo_size is None else memo_size
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        # Bumped whenever a component is replaced, so memoized outputs of the old one are ignored
+        self.version = 0
+
+    def get(self, name: str, factory: Optional[Callable[[], object]] = None):
+        """The registered component, built with `factory` on first use"""
+        with self._lock:
+            if name not in self._components:
+                if factory is None:
+                    raise KeyError(f"no component registered as {name!r}")
+                self._components[name] = factory()
+            return self._components[name]
+
+    def register(self, name: str, component):
+        """Add or replace a component; replacing one invalidates every memoized stage output"""
+        with self._lock:
+            replaced = name in self._components and self._components[name] is not component
+            self._components[name] = component
+            if replaced:
+                self.version += 1
+                with self._memo_lock:
+                    self._memo.clear()
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._components)
+
+    def memo_get(self, key: Hashable):
+        with self._memo_lock:
+            if key not in self._memo:
+                return None
+            self._memo.move_to_end(key)
+            return self._memo[key]
+
+    def clear_memo(self) -> bool:
+        """Drop every memoized stage output; False if there were none"""
+        with self._memo_lock:
+            had_entries = bool(self._memo)
+            self._memo.clear()
+        return had_entries
+
+    def memo_put(self, key: Hashable, value: Dict):
+        if self.memo_size <= 0:
+            return
+        with self._memo_lock:
+            self._memo[key] = value
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+
+class Stage:
+    """One pipeline step: reads the request state and returns the keys it adds"""
+
+    kind = ""
+    memoize = True
+    # Stage name reported by a deadline that expires before this stage; defaults to `kind`
+    deadline_stage: Optional[str] = None
+
+    def __init__(self, registry: ComponentRegistry, **options):
+        self.registry = registry
+        self.options = options
+        # Stages of the same type and options produce the same output, whichever pipeline runs them
+        self.signature = (self.kind, type(self).__name__, json.dumps(options, sort_keys=True, default=str))
+
+    def memo_key(self, state: Dict) -> Optional[Hashable]:
+        """Inputs that determine the output; None disables memoization for this call"""
+        return None
+
+    def run(self, state: Dict) -> Dict:
+        raise NotImplementedError
+
+    def run_batch(self, states: List[Dict]) -> List[Dict]:
+        """Outputs for several requests at once; stages with a batched model call override this"""
+        return [self.run(state) for state in states]
+
+    def finish(self, state: Dict):
+        """Called after the pipeline produced its response"""
+
+
+STAGE_TYPES: Dict[tuple, type] = {}
+
+
+def register_stage(kind: str, type_name: str):
+    """Make a Stage subclass available to pipeline configs as {"stage": kind, "type": type_name}"""
+    def decorator(cls):
+        cls.kind = kind
+        STAGE_TYPES[(kind, type_name)] = cls
+        return cls
+    return decorator
+
+
+def _normalize(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def _component(stage: Stage, state: Dict, name: str, factory: Optional[Callable[[], object]] = None):
+    """`name` from the request's pinned index snapshot (state["index"]) if it has one, else the registry"""
+    index = state.get("index")
+    if index is not None and hasattr(index, name):
+        return getattr(index, name)
+    return stage.registry.get(name, factory)
+
+
+def generative_response(result: Dict, category: Optional[str]) -> Dict:
+    """Response for a generated answer plus its decode metrics (GenerativeReader.generate/stream)"""
+    return {
+        "answer": result["answer"].strip(),
+        "confidence": result["confidence"],
+        "category": category,
+        "reader": "generative",
+        "ttft_ms": result["ttft_ms"],
+        "generation_ms": result["total_ms"],
+        "new_tokens": result["new_tokens"],
+        "stop_reason": result["stop_reason"],
+    }
+
+
+@register_stage("cache", "lru")
+class AnswerCacheStage(Stage):
+    """Whole-response LRU cache; a hit ends the request before the gate"""
+
+    memoize = False
+
+    def __init__(self, registry: ComponentRegistry, size: int = 256):
+        super().__init__(registry, size=size)
+        self.size = size
+        self.cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, state: Dict) -> tuple:
+        return self.registry.version, _normalize(state["question"])
+
+    def run(self, state: Dict) -> Dict:
+        with self._lock:
+            cached = self.cache.get(self._key(state))
+            if cached is None:
+                return {}
+            self.cache.move_to_end(self._key(state))
+        return {RESPONSE: dict(cached, cached=True)}
+
+    def finish(self, state: Dict):
+        response = state.get(RESPONSE)
+        if response is None or response.get("cached") or "error" in response:
+            return
+        with self._lock:
+            self.cache[self._key(state)] = response
+            self.cache.move_to_end(self._key(state))
+            while len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+
+
+@register_stage("cache", "answer")
+class ServingCacheStage(Stage):
+    """The chatbot's exact and semantic answer caches, looked up after the gate (semantic needs its category)
+
+    Uses the registry's "answer_lookup"(question, category, index, semantic) and
+    "answer_store"(question, response, index, semantic) hooks. semantic=False keeps the sentence encoder out of
+    degraded tiers; store=False for tiers whose answers are not worth caching
+    """
+
+    memoize = False
+
+    def __init__(self, registry: ComponentRegistry, semantic: bool = True, store: bool = True):
+        super().__init__(registry, semantic=semantic, store=store)
+        self.semantic = semantic
+        self.store = store
+
+    def run(self, state: Dict) -> Dict:
+        if not state.get("use_cache", True):
+            return {}
+        lookup = self.registry.get("answer_lookup")
+        cached = lookup(state["question"], state.get("category"), state.get("index"), self.semantic)
+        return {RESPONSE: cached} if cached else {}
+
+    def finish(self, state: Dict):
+        response = state.get(RESPONSE)
+        if (not self.store or response is None or response.get("cached") or "error" in response
+                or response.get("category") == "non_tourism"):
+            return
+        self.registry.get("answer_store")(state["question"], response, state.get("index"), self.semantic)
+
+
+@register_stage("gate", "keyword")
+class KeywordGateStage(Stage):
+    """Tourism keyword gate; also classifies the question for shard routing"""
+
+    def memo_key(self, state: Dict) -> Optional[Hashable]:
+        return state["question"]
+
+    def run(self, state: Dict) -> Dict:
+        from app.utils.question_handler import NonTourismQuestionHandler
+
+        handler = self.registry.get("question_handler", NonTourismQuestionHandler)
+        is_tourism, category = handler.is_tourism_related(state["question"])
+        if not is_tourism:
+            return {RESPONSE: {
+                "answer": handler.get_fallback_response(state["question"]),
+                "confidence": 0.0,
+                "category": "non_tourism",
+            }}
+        route, route_confidence = handler.classify(state["question"])
+        return {"category": category, "route": route, "route_confidence": route_confidence}
+
+
+@register_stage("retriever", "index")
+class IndexRetrieverStage(Stage):
+    """Top-k passages from the registered retrieval system; contexts already in the state are kept"""
+
+    deadline_stage = "retrieval"
+
+    def __init__(self, registry: ComponentRegistry, method: Optional[str] = None, top_k: int = 3,
+                 route: bool = True):
+        super().__init__(registry, method=method, top_k=top_k, route=route)
+        self.method = method
+        self.top_k = top_k
+        self.route = route
+
+    def memo_key(self, state: Dict) -> Optional[Hashable]:
+        if "contexts" in state:
+            return None
+        if self.route:
+            return state["question"], state.get("route"), state.get("route_confidence")
+        return state["question"]
+
+    def run(self, state: Dict) -> Dict:
+        if "contexts" in state:
+            return {}
+        retrieval_system = _component(self, state, "retrieval_system")
+        if retrieval_system is None:
+            return {"contexts": list(_component(self, state, "knowledge_base", list)[:self.top_k])}
+        kwargs = {}
+        if self.route and state.get("route") is not None:
+            kwargs = {"category": state["route"], "route_confidence": state.get("route_confidence", 1.0)}
+        contexts = retrieval_system.retrieve_contexts(state["question"], top_k=self.top_k, method=self.method, **kwargs)
+        return {"contexts": list(contexts)}
+
+
+@register_stage("fusion", "concat")
+class ConcatFusionStage(Stage):
+    """Join the retrieved passages into the reader's context, optionally capped in characters"""
+
+    memoize = False
+
+    def __init__(self, registry: ComponentRegistry, separator: str = " ", max_chars: Optional[int] = None):
+        super().__init__(registry, separator=separator, max_chars=max_chars)
+        self.separator = separator
+        self.max_chars = max_chars
+
+    def run(self, state: Dict) -> Dict:
+        context = self.separator.join(state.get("contexts", []))
+        if self.max_chars is not None:
+            context = context[:self.max_chars]
+        return {"context": context}
+
+
+def load_qa_model():
+    """Default extractive reader when nobody registered one: the configured QA model on CPU"""
+    from app.utils.offline import resolve_qa_model_path
+    from app.utils.thread_topology import configure_torch_threads
+
+    configure_torch_threads()
+    from transformers import pipeline
+
+    model_path = resolve_qa_model_path()
+    return pipeline("question-answering", model=model_path, tokenizer=model_path, device=-1)
+
+
+@register_stage("reader", "extractive")
+class ExtractiveReaderStage(Stage):
+    """Span extraction with the shared QA model; options are passed through as call arguments"""
+
+    deadline_stage = "qa"
+
+    def memo_key(self, state: Dict) -> Optional[Hashable]:
+        return state["question"], state.get("context", "")
+
+    def run(self, state: Dict) -> Dict:
+        return self.run_batch([state])[0]
+
+    def run_batch(self, states: List[Dict]) -> List[Dict]:
+        """One QA model call for all `states`; the model batches them internally"""
+        qa_model = self.registry.get("qa_model", load_qa_model)
+        contexts = [state.get("context", "") for state in states]
+        if len(states) == 1:
+            results = [qa_model(question=states[0]["question"], context=contexts[0], **self.options)]
+        else:
+            results = qa_model(question=[state["question"] for state in states], context=contexts,
+                               batch_size=len(states), **self.options)
+        return [
+            {RESPONSE: {
+                "answer": result["answer"].strip(),
+                "confidence": result["score"],
+                "category": state.get("category"),
+                "context_used": len(context),
+            }}
+            for state, context, result in zip(states, contexts, results)
+        ]
+
+
+@register_stage("reader", "generative")
+class GenerativeReaderStage(Stage):
+    """Fine-tuned flan-t5 answering from the question alone; options: max_new_tokens"""
+
+    deadline_stage = "generation"
+
+    def memo_key(self, state: Dict) -> Optional[Hashable]:
+        return state["question"]
+
+    def run(self, state: Dict) -> Dict:
+        from app.utils.generative_reader import GenerativeReader
+
+        reader = self.registry.get("generative_reader", GenerativeReader)
+        result = reader.generate(state["question"], self.options.get("max_new_tokens"), deadline=state.get("deadline"))
+        return {RESPONSE: generative_response(result, state.get("category"))}
+
+
+@register_stage("reader", "lite")
+class LiteReaderStage(Stage):
+    """Best stored answer from a LiteAnswerIndex; weak lexical matches get the gate's fallback message"""
+
+    def __init__(self, registry: ComponentRegistry, min_confidence: float = 0.0):
+        super().__init__(registry, min_confidence=min_confidence)
+        self.min_confidence = min_confidence
+
+    def memo_key(self, state: Dict) -> Optional[Hashable]:
+        return state["question"]
+
+    def run(self, state: Dict) -> Dict:
+        lite_index = _component(self, state, "retrieval_system")
+        match = lite_index.answer(state["question"]) if lite_index is not None else None
+        if match is None or match["confidence"] < self.min_confidence:
+            handler = self.registry.get("question_handler")
+            return {RESPONSE: {
+                "answer": handler.get_fallback_response(state["question"]),
+                "confidence": match["confidence"] if match else 0.0,
+                "category": state.get("category"),
+            }}
+        return {RESPONSE: {
+            "answer": match["answer"],
+            "confidence": match["confidence"],
+            "category": state.get("category"),
+            "matched_question": match["matched_question"],
+        }}
+
+
+@register_stage("reader", "passage")
+class PassageReaderStage(Stage):
+    """No model: answer with the best retrieved passage, or the gate's fallback message if none"""
+
+    memoize = False
+
+    def run(self, state: Dict) -> Dict:
+        contexts = state.get("contexts") or []
+        if contexts:
+            answer = contexts[0]
+        else:
+            answer = self.registry.get("question_handler").get_fallback_response(state["question"])
+        return {RESPONSE: {
+            "answer": answer,
+            "confidence": 0.0,
+            "category": state.get("category"),
+            "context_used": len(" ".join(contexts)),
+        }}
+
+
+@register_stage("reader", "shed")
+class ShedReaderStage(Stage):
+    """Overloaded response: the load controller left no budget for a reader (cache_only tier)"""
+
+    memoize = False
+
+    def run(self, state: Dict) -> Dict:
+        return {RESPONSE: overloaded_response()}
+
+
+class PipelineRun:
+    """One request's progress through a pipeline, so its stages can be run in separate steps (batching)"""
+
+    def __init__(self, question: str, deadline: Optional[RequestDeadline], state: Dict):
+        self.state = dict(state, question=question, deadline=deadline)
+        self.use_memo = self.state.get("use_cache", True)
+        # Outputs computed against a pinned snapshot must not be reused for another one
+        self.index_version = getattr(self.state.get("index"), "version", None)
+        self.next_stage = 0
+        self.timings: Dict[str, float] = {}
+        self.memo_hits: List[str] = []
+        self.executed: List[Stage] = []
+        self.response: Optional[Dict] = None
+
+    @property
+    def done(self) -> bool:
+        return self.response is not None
+
+
+class Pipeline:
+    """Runs its stages in order, timing each and reusing memoized outputs from the shared registry"""
+
+    def __init__(self, name: str, stages: List[Stage], registry: ComponentRegistry):
+        self.name = name
+        self.stages = stages
+        self.registry = registry
+        self._lock = threading.Lock()
+        self.stats = {stage.kind: Counter() for stage in stages}
+        self.requests = 0
+
+    def run(self, question: str, deadline: Optional[RequestDeadline] = None, **state) -> Dict:
+        """Answer `question`; extra keyword arguments seed the state
+
+        e.g. contexts=[...], index=<pinned IndexSnapshot>, or use_cache=False to skip the answer
+        caches and the stage memo (benchmarks measuring the stages themselves)
+        """
+        return self.advance(self.start(question, deadline, **state)).response
+
+    def start(self, question: str, deadline: Optional[RequestDeadline] = None, **state) -> PipelineRun:
+        """A run that has not executed any stage yet; drive it with advance() / advance_batch()"""
+        return PipelineRun(question, deadline, state)
+
+    def advance(self, run: PipelineRun, stop_before: Iterable[str] = (),
+                error_response: Optional[Callable[[Exception], Dict]] = None) -> PipelineRun:
+        """Run stages until one answers, the pipeline ends, or the next stage's kind is in `stop_before`
+
+        Exceptions propagate unless `error_response` is given (see advance_batch)
+        """
+        stop_before = set(stop_before)
+        while not run.done and self.stages[run.next_stage].kind not in stop_before:
+            stage = self.stages[run.next_stage]
+            try:
+                self._check_deadline(stage, run)
+                started = time.perf_counter()
+                memo_key = self._memo_key(stage, run)
+                output = self.registry.memo_get(memo_key) if memo_key is not None else None
+                if output is not None:
+                    run.memo_hits.append(stage.kind)
+                else:
+                    output = stage.run(run.state)
+                    if memo_key is not None:
+                        self.registry.memo_put(memo_key, output)
+            except Exception as e:
+                self._fail(run, e, error_response)
+                break
+            self._apply(stage, run, output, (time.perf_counter() - started) * 1000)
+        return run
+
+    def advance_batch(self, runs: List[PipelineRun],
+                      error_response: Optional[Callable[[Exception], Dict]] = None) -> List[PipelineRun]:
+        """Finish every run, calling each remaining stage once for all runs waiting on it (run_batch)
+
+        If a stage fails for a batch, its runs are retried one at a time. With `error_response`, a run that
+        still fails is answered with error_response(exception) instead of raising, so one bad question
+        does not stop the others
+        """
+        for index, stage in enumerate(self.stages):
+            waiting = [run for run in runs if not run.done and run.next_stage == index]
+            ready = []
+            for run in waiting:
+                try:
+                    self._check_deadline(stage, run)
+                except Exception as e:
+                    self._fail(run, e, error_response)
+                    continue
+                memo_key = self._memo_key(stage, run)
+                output = self.registry.memo_get(memo_key) if memo_key is not None else None
+                if output is not None:
+                    run.memo_hits.append(stage.kind)
+                    self._apply(stage, run, output, 0.0)
+                else:
+                    ready.append((run, memo_key))
+            if not ready:
+                continue
+            started = time.perf_counter()
+            try:
+                outputs = stage.run_batch([run.state for run, _ in ready])
+            except Exception:
+                if len(ready) == 1 and error_response is None:
+                    raise
+                outputs = None
+            if outputs is not None:
+                elapsed = (time.perf_counter() - started) * 1000 / len(ready)
+                for (run, memo_key), output in zip(ready, outputs):
+                    if memo_key is not None:
+                        self.registry.memo_put(memo_key, output)
+                    self._apply(stage, run, output, elapsed)
+                continue
+            for run, memo_key in ready:
+                started = time.perf_counter()
+                try:
+                    output = stage.run(run.state)
+                except Exception as e:
+                    self._fail(run, e, error_response)
+                    continue
+                if memo_key is not None:
+                    self.registry.memo_put(memo_key, output)
+                self._apply(stage, run, output, (time.perf_counter() - started) * 1000)
+        return runs
+
+    def _check_deadline(self, stage: Stage, run: PipelineRun):
+        deadline = run.state.get("deadline")
+        if deadline:
+            deadline.check(stage.deadline_stage or stage.kind)
+
+    def _memo_key(self, stage: Stage, run: PipelineRun) -> Optional[Hashable]:
+        key = stage.memo_key(run.state) if stage.memoize and run.use_memo else None
+        return (stage.signature, self.registry.version, run.index_version, key) if key is not None else None
+
+    def _apply(self, stage: Stage, run: PipelineRun, output: Dict, elapsed_ms: float):
+        run.state.update(output)
+        run.timings[stage.kind] = elapsed_ms
+        run.executed.append(stage)
+        run.next_stage += 1
+        if RESPONSE in run.state or run.next_stage == len(self.stages):
+            self._finish(run)
+
+    def _finish(self, run: PipelineRun):
+        state = run.state
+        response = state.get(RESPONSE) or {"answer": "", "confidence": 0.0, "category": state.get("category")}
+        response = dict(response, pipeline=self.name, stage_ms=run.timings)
+        state[RESPONSE] = response
+        for stage in run.executed:
+            stage.finish(state)
+        self._record(run.timings, run.memo_hits)
+        run.response = response
+
+    def _fail(self, run: PipelineRun, error: Exception, error_response: Optional[Callable[[Exception], Dict]]):
+        if error_response is None:
+            raise error
+        run.response = dict(error_response(error), pipeline=self.name, stage_ms=run.timings)
+        self._record(run.timings, run.memo_hits)
+
+    def _record(self, timings: Dict[str, float], memo_hits: List[str]):
+        with self._lock:
+            self.requests += 1
+            for kind, elapsed in timings.items():
+                self.stats[kind]["calls"] += 1
+                self.stats[kind]["total_ms"] += elapsed
+            for kind in memo_hits:
+                self.stats[kind]["memo_hits"] += 1
+
+    def get_stats(self) -> Dict:
+        """Per-stage call counts, mean latency and memo hit rate"""
+        with self._lock:
+            return {
+                "pipeline": self.name,
+                "requests": self.requests,
+                "stages": {
+                    kind: {
+                        "calls": counts["calls"],
+                        "mean_ms": counts["total_ms"] / counts["calls"] if counts["calls"] else 0.0,
+                        "memo_hit_rate": counts["memo_hits"] / counts["calls"] if counts["calls"] else 0.0,
+                    }
+                    for kind, counts in self.stats.items()
+                },
+            }
+
+
+def build_pipeline(name: str, registry: ComponentRegistry, config: Optional[List[Dict]] = None) -> Pipeline:
+    """Pipeline `name` from PIPELINE_CONFIG (or the given stage list) over `registry`'s components"""
+    if config is None:
+        if name not in PIPELINE_CONFIG["pipelines"]:
+            raise ValueError(f"unknown pipeline: {name}")
+        config = PIPELINE_CONFIG["pipelines"][name]
+    stages = []
+    for spec in config:
+        options = {k: v for k, v in spec.items() if k not in ("stage", "type")}
+        stage_type = STAGE_TYPES.get((spec["stage"], spec["type"]))
+        if stage_type is None:
+            raise ValueError(f"unknown {spec['stage']} stage type: {spec['type']}")
+        stages.append(stage_type(registry, **options))
+    return Pipeline(name, stages, registry)
@@ -0,0 +1,212 @@
+"""
+Request Profiling for Rwanda Tourism QA
+Opt-in sampling (collapsed stacks for flamegraphs) or cProfile capture of single requests,
+plus automatic sampling of requests that run past a latency threshold
+"""
+
+import cProfile
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from app.config.settings import PROFILING_CONFIG
+
+MODES = ("sampling", "cprofile")
+
+# cProfile hooks are process-wide: a second active profiler raises ValueError on Python 3.12+
+_cprofile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds from a helper thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="stack-sampler")
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format: `root;caller;callee count` per line"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileCapture:
+    """What one profiled request produced; `path` is set once the profile is written"""
+
+    def __init__(self, mode: Optional[str], trigger: Optional[str]):
+        self.mode = mode
+        self.trigger = trigger
+        self.path: Optional[Path] = None
+        self.elapsed_ms = 0.0
+
+
+class RequestProfiler:
+    """Profiles requests on demand (env var or per-request flag) and when they turn out slow"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or PROFILING_CONFIG
+        self.mode = config["mode"] or None
+        if self.mode is not None and self.mode not in MODES:
+            raise ValueError(f"unknown profiling mode: {self.mode}")
+        self.slow_request_ms = config["slow_request_ms"]
+        self.interval = config["sample_interval_ms"] / 1000
+        self.output_dir = Path(config["output_dir"])
+        self.max_profiles = config["max_profiles"]
+        self.max_storage_bytes = int(config["max_storage_mb"] * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self.stats = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None or self.slow_request_ms > 0
+
+    @contextmanager
+    def profile(self, label: str, force: bool = False) -> Iterator[ProfileCapture]:
+        """Profile the enclosed block; without a mode or `force`, only sample it if it gets slow
+
+        cprofile mode writes .pstats files (for pstats / snakeviz), not collapsed stacks: cProfile
+        only records caller-callee pairs. Only one request is under cProfile at a time; concurrent
+        requests are sampled instead, which does give flamegraph-ready collapsed stacks
+        """
+        mode = self.mode or ("sampling" if force else None)
+        capture = ProfileCapture(mode, "requested" if mode else None)
+        started = time.perf_counter()
+        thread_id = threading.get_ident()
+        sampler: Optional[StackSampler] = None
+        profiler: Optional[cProfile.Profile] = None
+        watchdog: Optional[threading.Timer] = None
+        slow_sampler: List[StackSampler] = []
+        slow_lock = threading.Lock()
+        finished = []
+
+        if mode == "cprofile":
+            if _cprofile_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Another profiling tool (a debugger, an outer cProfile) holds the hook
+                    _cprofile_lock.release()
+                    profiler = None
+            if profiler is None:
+                mode = capture.mode = "sampling"
+                with self._lock:
+                    self.stats["cprofile_busy"] += 1
+        if mode == "sampling":
+            sampler = StackSampler(thread_id, self.interval).start()
+        elif mode is None and self.slow_request_ms > 0:
+            # Fast requests only pay for arming and cancelling a timer
+            def start_slow_sampling():
+                with slow_lock:
+                    if not finished:
+                        slow_sampler.append(StackSampler(thread_id, self.interval).start())
+            watchdog = threading.Timer(self.slow_request_ms / 1000, start_slow_sampling)
+            watchdog.daemon = True
+            watchdog.start()
+
+        try:
+            yield capture
+        finally:
+            capture.elapsed_ms = (time.perf_counter() - started) * 1000
+            if profiler is not None:
+                profiler.disable()
+                _cprofile_lock.release()
+                capture.path = self._write(label, capture, "pstats", profiler.dump_stats)
+            if watchdog is not None:
+                watchdog.cancel()
+                with slow_lock:
+                    finished.append(True)  # a timer firing right now must not start a sampler
+                if slow_sampler:
+                    sampler = slow_sampler[0]
+                    capture.mode, capture.trigger = "sampling", "slow_request"
+            if sampler is not None:
+                sampler.stop()
+                if sampler.samples:
+                    text = sampler.collapsed()
+                    capture.path = self._write(label, capture, "collapsed",
+                                               lambda path: Path(path).write_text(text, encoding="utf-8"))
+
+    def _write(self, label: str, capture: ProfileCapture, suffix: str, write) -> Optional[Path]:
+        """Write one profile, then delete the oldest ones until the count and storage caps hold"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        safe_label = re.sub(r"[^A-Za-z0-9_-]+", "_", label)[:40]
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._sequence):04d}_{safe_label}_{capture.elapsed_ms:.0f}ms.{suffix}"
+        path = self.output_dir / name
+        with self._lock:
+            write(str(path))
+            self.stats[capture.trigger] += 1
+            try:
+                self._enforce_caps()
+            except OSError as e:
+                # Cleanup is best effort and must never fail the request that was profiled
+                print(f" Profile cleanup in {self.output_dir} failed: {e}")
+        print(f" Profile ({capture.trigger}, {capture.elapsed_ms:.0f} ms) written to {path}")
+        return path if path.exists() else None
+
+    def _enforce_caps(self):
+        # Workers sharing output_dir delete each other's oldest profiles; a file can vanish at any point
+        profiles = []
+        for path in self.output_dir.iterdir():
+            if path.suffix in (".collapsed", ".pstats"):
+                try:
+                    profiles.append((path.stat(), path))
+                except OSError:
+                    continue
+        profiles.sort(key=lambda entry: entry[0].st_mtime)
+        total = sum(stat.st_size for stat, _ in profiles)
+        while profiles and (len(profiles) > self.max_profiles or total > self.max_storage_bytes):
+            stat, oldest = profiles.pop(0)
+            total -= stat.st_size
+            try:
+                oldest.unlink()
+            except OSError:
+                continue
+            self.stats["deleted"] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "slow_request_ms": self.slow_request_ms,
+                "requested": self.stats["requested"],
+                "slow_request": self.stats["slow_request"],
+                "deleted": self.stats["deleted"],
+                "cprofile_busy": self.stats["cprofile_busy"],
+            }
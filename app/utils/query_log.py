@@ -0,0 +1,181 @@
+"""
+Query Log for Rwanda Tourism QA
+Append-only JSON-lines log of answered questions, written by a background thread with size-based
+rotation, plus the frequency scan used to prewarm the answer cache after a restart
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.config.settings import QUERY_LOG_CONFIG
+
+_STOP = object()
+
+
+def normalize_question(question: str) -> str:
+    """Same normalization as the chatbot's answer cache key"""
+    return " ".join(question.lower().split())
+
+
+class QueryLog:
+    """Requests only enqueue; one writer thread appends, rotates and reopens after external rotation"""
+
+    def __init__(self, path, max_bytes: int = 10 * 1024 * 1024, backups: int = 5, queue_size: int = 10000):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._lock = threading.Lock()
+        self.stats = Counter()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="query-log")
+        self._thread.start()
+
+    def record(self, question: str, category: Optional[str], latency_ms: float, path: str, **extra):
+        """Queue one entry; never blocks, drops the entry (and counts it) when the writer is behind"""
+        entry = {
+            "ts": round(time.time(), 3),
+            "question": question,
+            "normalized": normalize_question(question),
+            "category": category,
+            "latency_ms": round(latency_ms, 2),
+            "path": path,
+            **extra,
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+
+    def close(self, timeout: float = 5.0):
+        """Write everything queued so far, then stop the writer"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                break
+            lines = [entry]
+            # Drain whatever else is waiting so a burst costs one write
+            while len(lines) < 500:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    self._queue.put(_STOP)
+                    break
+                lines.append(entry)
+            try:
+                self._write("".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines))
+                with self._lock:
+                    self.stats["written"] += len(lines)
+            except OSError as e:
+                with self._lock:
+                    self.stats["write_errors"] += 1
+                print(f" Query log write failed: {e}")
+        if self._file is not None:
+            self._file.close()
+
+    def _write(self, text: str):
+        if self._file is not None and self._rotated_externally():
+            self._file.close()
+            self._file = None
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(text)
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotated_externally(self) -> bool:
+        """logrotate (or an operator) moved or deleted the file we hold open"""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except OSError:
+            return True
+
+    def _rotate(self):
+        """query_log.jsonl -> .1 -> .2 ... ; the oldest backup is dropped"""
+        self._file.close()
+        self._file = None
+        for i in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{i}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        with self._lock:
+            self.stats["rotations"] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "written": self.stats["written"],
+                "dropped": self.stats["dropped"],
+                "rotations": self.stats["rotations"],
+                "write_errors": self.stats["write_errors"],
+                "queued": self._queue.qsize(),
+            }
+
+
+def log_files(path) -> List[Path]:
+    """The live log and its rotated backups, newest first"""
+    path = Path(path)
+    files = [path] if path.exists() else []
+    i = 1
+    while path.with_name(f"{path.name}.{i}").exists():
+        files.append(path.with_name(f"{path.name}.{i}"))
+        i += 1
+    return files
+
+
+def read_entries(path) -> Iterator[Dict]:
+    """Every parseable entry across the live log and its backups; a torn last line is skipped"""
+    for file in log_files(path):
+        with open(file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def top_questions(path, n: int, min_count: int = 2,
+                  include: Optional[Callable[[Dict], bool]] = None) -> List[Tuple[str, int]]:
+    """The `n` most frequent normalized questions as (most common original wording, count)"""
+    counts: Counter = Counter()
+    wordings: Dict[str, Counter] = {}
+    for entry in read_entries(path):
+        if include is not None and not include(entry):
+            continue
+        key = entry.get("normalized") or normalize_question(entry.get("question", ""))
+        if not key:
+            continue
+        counts[key] += 1
+        wordings.setdefault(key, Counter())[entry.get("question", key)] += 1
+    return [
+        (wordings[key].most_common(1)[0][0], count)
+        for key, count in counts.most_common(n) if count >= min_count
+    ]
+
+
+def open_query_log(config: Optional[Dict] = None) -> Optional[QueryLog]:
+    """QueryLog from QUERY_LOG_CONFIG, or None when logging is disabled"""
+    config = config or QUERY_LOG_CONFIG
+    if not config["enabled"]:
+        return None
+    return QueryLog(config["path"], int(config["max_mb"] * 1024 * 1024), config["backups"], config["queue_size"])
@@ -4,6 +4,8 @@ Filters out questions not related to Rwanda tourism
 """
 
 from typing import Tuple
+from app.config.settings import SPELLING_CONFIG
+from app.utils.spelling import build_spelling_index
 
 
 class NonTourismQuestionHandler:
@@ -27,17 +29,48 @@ class NonTourismQuestionHandler:
                 'trip', 'holiday', 'guide', 'tour'
             ]
         }
+        self.spelling = None
+        if SPELLING_CONFIG["enabled"]:
+            self.spelling = build_spelling_index(
+                keyword for keywords in self.tourism_keywords.values() for keyword in keywords
+            )
 
     def is_tourism_related(self, question: str) -> Tuple[bool, str]:
-        """Check if question is tourism-related"""
-        question_lower = question.lower()
+        """Check if question is tourism-related, retrying with misspelled keywords corrected"""
+        category = self._match_category(question.lower())
+        if category is None and self.spelling is not None:
+            corrected, corrections = self.spelling.correct_text(question)
+            if corrections:
+                category = self._match_category(corrected.lower())
+        if category is not None:
+            return True, category
+
+        return False, "non_tourism"
 
+    def _match_category(self, question_lower: str):
         # Check each category
         for category, keywords in self.tourism_keywords.items():
             if any(keyword in question_lower for keyword in keywords):
-                return True, category
+                return category
+        return None
 
-        return False, "non_tourism"
+    def classify(self, question: str) -> Tuple[str, float]:
+        """Best-matching category and the share of keyword hits it got (1.0 = unambiguous)"""
+        question_lower = question.lower()
+        if self.spelling is not None and self._match_category(question_lower) is None:
+            # Already counted by the gate; don't count the same correction twice
+            question_lower = self.spelling.correct_text(question_lower, record=False)[0]
+        hits = {
+            category: sum(keyword in question_lower for keyword in keywords)
+            for category, keywords in self.tourism_keywords.items()
+        }
+        # Generic words like 'rwanda' or 'visit' say nothing about which topic is meant
+        topical = {category: count for category, count in hits.items() if category != 'general_tourism'}
+        total = sum(topical.values())
+        if total == 0:
+            return ("general_tourism", 0.0) if hits['general_tourism'] else ("non_tourism", 0.0)
+        best = max(topical, key=topical.get)
+        return best, topical[best] / total
 
     def get_fallback_response(self, question: str) -> str:
         """Generate fallback response for non-tourism questions"""
@@ -48,4 +81,5 @@ class NonTourismQuestionHandler:
             "🏛️ **Cultural Heritage**: Museums, traditional dances, monuments\n"
             "🎯 **Tourism Planning**: Best times to visit, permits, activities\n\n"
             "Please ask me about Rwanda's amazing tourism attractions!"
-        )
\ No newline at end of file
+        )
+
@@ -0,0 +1,142 @@
+"""
+Warmup and Readiness for Rwanda Tourism QA
+Runs representative questions through every stage and serves liveness/readiness over HTTP
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+class ReadinessTracker:
+    """Per-component readiness and warmup timings, shared with the health endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.components: Dict[str, Dict] = {}
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+
+    def mark(self, component: str, ready: bool, warmup_ms: Optional[List[float]] = None,
+             error: Optional[str] = None):
+        with self._lock:
+            self.components[component] = {
+                "ready": ready,
+                "warmup_ms": [round(ms, 1) for ms in warmup_ms] if warmup_ms else [],
+                "error": error,
+            }
+            if self.is_ready_locked() and self.ready_at is None:
+                self.ready_at = time.time()
+
+    def is_ready_locked(self) -> bool:
+        return bool(self.components) and all(c["ready"] for c in self.components.values())
+
+    def is_ready(self) -> bool:
+        """True once every registered component has warmed up successfully"""
+        with self._lock:
+            return self.is_ready_locked()
+
+    def report(self) -> Dict:
+        """JSON-serializable snapshot for the readiness endpoint"""
+        with self._lock:
+            return {
+                "ready": self.is_ready_locked(),
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "seconds_to_ready": round(self.ready_at - self.started_at, 1) if self.ready_at else None,
+                "components": {name: dict(state) for name, state in self.components.items()},
+            }
+
+
+def _timed(fn: Callable, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def warmup_chatbot(chatbot, tracker: ReadinessTracker, questions: List[str]) -> Dict:
+    """Exercise gate, BM25, semantic search, QA and the full path; first call pays lazy init costs"""
+    timings: Dict[str, List[float]] = {
+        "question_gate": [], "retrieval_bm25": [], "retrieval_semantic": [], "qa_model": [], "end_to_end": []
+    }
+    errors: Dict[str, str] = {}
+    retrieval = chatbot.retrieval_system
+    generative_reader = getattr(chatbot, "generative_reader", None)
+
+    def run_stage(stage: str, fn: Callable, *args, **kwargs):
+        try:
+            result, ms = _timed(fn, *args, **kwargs)
+            timings[stage].append(ms)
+            return result
+        except Exception as e:
+            errors[stage] = str(e)
+            return None
+
+    for question in questions:
+        run_stage("question_gate", chatbot.non_tourism_handler.is_tourism_related, question)
+        contexts = []
+        if retrieval is not None and retrieval.bm25 is not None:
+            contexts = run_stage("retrieval_bm25", retrieval.retrieve_contexts, question, 3, "bm25") or []
+        if retrieval is not None and retrieval.context_embeddings is not None:
+            contexts = run_stage("retrieval_semantic", retrieval.retrieve_contexts, question, 3, "semantic") or contexts
+        if generative_reader is not None:
+            run_stage("qa_model", generative_reader.generate, question, 16)
+        elif contexts and chatbot.qa_pipeline is not None:
+            run_stage("qa_model", chatbot.qa_pipeline, question=question, context=" ".join(contexts))
+        # Warmup questions are synthetic; keep them out of the query log and prewarm counts
+        response = run_stage("end_to_end", chatbot.answer_question, question, log=False)
+        if response and response.get("error"):
+            # answer_question reports failures in the response instead of raising
+            errors["end_to_end"] = response["error"]
+
+    tracker.mark("knowledge_base", len(chatbot.knowledge_base) > 0,
+                 error=None if len(chatbot.knowledge_base) else "knowledge base is empty")
+    for stage, stage_timings in timings.items():
+        skipped = not stage_timings and stage not in errors
+        if skipped and stage.startswith("retrieval_"):
+            continue  # this retrieval method is not part of the configured index
+        if skipped and stage == "qa_model" and chatbot.qa_pipeline is None and generative_reader is None:
+            continue  # lite mode answers without a reader model
+        tracker.mark(stage, bool(stage_timings) and stage not in errors, stage_timings,
+                     errors.get(stage) or ("never ran" if skipped else None))
+    return tracker.report()
+
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    tracker: ReadinessTracker = None
+    extra: Callable[[], Dict] = None
+
+    def _send(self, status: int, body: Dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path in ("/healthz", "/livez"):
+            self._send(200, {"status": "alive"})
+        elif self.path == "/readyz":
+            report = self.tracker.report()
+            if self.extra:
+                report.update(self.extra())
+            self._send(200 if report["ready"] else 503, report)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        # Load balancers probe every few seconds; keep them out of the app log
+        pass
+
+
+def start_health_server(tracker: ReadinessTracker, host: str, port: int,
+                        extra: Callable[[], Dict] = None) -> ThreadingHTTPServer:
+    """Serve /healthz (liveness) and /readyz (readiness + warmup timings) on a daemon thread"""
+    handler = type("HealthHandler", (_HealthHandler,), {"tracker": tracker, "extra": staticmethod(extra) if extra else None})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True, name="health-server")
+    thread.start()
+    print(f" Health endpoint listening on http://{host}:{port} (/healthz, /readyz)")
+    return server
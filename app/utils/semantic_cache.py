@@ -0,0 +1,162 @@
+"""
+Semantic Response Cache for Rwanda Tourism QA
+Answers keyed by question embedding: a new question reuses the answer of the most similar
+question already answered ("gorilla permit price" / "how much to see gorillas"), instead of
+only exact repeats. Bounded, LRU or LFU evicted, and emptied when a newer knowledge base arrives
+"""
+
+import threading
+from collections import Counter
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+
+class SemanticCache:
+    """Fixed-capacity matrix of normalized question embeddings; lookup is one matrix-vector product"""
+
+    def __init__(self, embed: Callable[[str], np.ndarray], threshold: float, max_entries: int = 2048,
+                 policy: str = "lru"):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"unknown eviction policy: {policy}")
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.policy = policy
+        self.version = None
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None  # allocated on the first insert, once the dimension is known
+        self._entries = [None] * max_entries       # (question, category, entities, response) per slot
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._uses = np.zeros(max_entries, dtype=np.int64)
+        self._size = 0
+        self._clock = 0
+        self.stats = Counter()
+
+    def _vector(self, question: str) -> Optional[np.ndarray]:
+        vector = np.asarray(self.embed(question), dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def _check_version(self, version: int) -> bool:
+        """Empty the cache when a newer knowledge base arrives; False for an older one. Caller holds the lock
+
+        A request still running on the previous snapshot must not wipe answers from the new one,
+        and its own answers must not be stored or served next to them
+        """
+        if self.version is not None and version < self.version:
+            self.stats["stale_requests"] += 1
+            return False
+        if version != self.version:
+            if self._size:
+                self.stats["invalidations"] += 1
+            self._entries = [None] * self.max_entries
+            self._size = 0
+            self.version = version
+        return True
+
+    def lookup(self, question: str, version: int, category: Optional[str] = None,
+               entities: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """The answer to the most similar cached question, if at least `threshold` similar
+
+        With `entities`, only questions naming exactly the same gazetteer entities qualify:
+        "gorilla permit price in Volcanoes" and "... in Nyungwe" embed close but differ in answer
+        """
+        vector = self._vector(question)
+        entities = tuple(entities) if entities is not None else None
+        with self._lock:
+            if not self._check_version(version):
+                return None
+            self.stats["lookups"] += 1
+            if vector is None or not self._size or len(vector) != self._matrix.shape[1]:
+                return None
+            # Only reuse answers given for the same gate category and the same named places
+            similarities = self._similarities(vector, category, entities)
+            slot = int(similarities.argmax())
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                return None
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            self._uses[slot] += 1
+            self.stats["hits"] += 1
+            matched_question, _, _, response = self._entries[slot]
+        return dict(response, cached=True, cache="semantic", matched_question=matched_question,
+                    similarity=similarity)
+
+    def store(self, question: str, response: Dict, version: int, category: Optional[str] = None,
+              entities: Optional[Sequence[str]] = None):
+        """Remember `response`; a near-identical cached question is replaced rather than duplicated"""
+        vector = self._vector(question)
+        if vector is None:
+            return
+        entities = tuple(entities) if entities is not None else None
+        with self._lock:
+            if not self._check_version(version):
+                return
+            if self._matrix is None or self._matrix.shape[1] != len(vector):
+                self._matrix = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                self._size = 0
+            slot = None
+            if self._size:
+                # Same isolation as lookup: a Nyungwe answer never overwrites the Volcanoes one
+                similarities = self._similarities(vector, category, entities)
+                best = int(similarities.argmax())
+                if similarities[best] >= 0.999:
+                    slot = best
+            if slot is None and self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+                self._uses[slot] = 0
+            elif slot is None:
+                slot = self._victim()
+                self._uses[slot] = 0
+                self.stats["evictions"] += 1
+            self._clock += 1
+            self._matrix[slot] = vector
+            self._entries[slot] = (question, category, entities, response)
+            self._last_used[slot] = self._clock
+
+    def _similarities(self, vector: np.ndarray, category: Optional[str],
+                      entities: Optional[tuple]) -> np.ndarray:
+        """Cosine similarity to every entry; -1 for entries of another category or entity set"""
+        similarities = self._matrix[:self._size] @ vector
+        if category is None and entities is None:
+            return similarities
+        same = np.array([
+            (category is None or entry[1] == category) and (entities is None or entry[2] == entities)
+            for entry in self._entries[:self._size]
+        ])
+        return np.where(same, similarities, -1.0)
+
+    def _victim(self) -> int:
+        """Least recently used slot, or least used (oldest first among ties) for LFU"""
+        if self.policy == "lru":
+            return int(self._last_used.argmin())
+        return int(np.lexsort((self._last_used, self._uses))[0])
+
+    def clear(self) -> bool:
+        with self._lock:
+            had_entries = bool(self._size)
+            self._entries = [None] * self.max_entries
+            self._size = 0
+        return had_entries
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["lookups"]
+            return {
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "policy": self.policy,
+                "threshold": self.threshold,
+                "lookups": lookups,
+                "hits": self.stats["hits"],
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                "evictions": self.stats["evictions"],
+                "invalidations": self.stats["invalidations"],
+                "stale_requests": self.stats["stale_requests"],
+            }
@@ -0,0 +1,308 @@
+"""
+Shared-Memory Retrieval Index for Rwanda Tourism QA
+Publishes the embedding matrix and BM25 arrays once so worker processes can attach without copying
+"""
+
+import atexit
+import bisect
+import hashlib
+import json
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+_MAGIC_READY = 0x5257414E44410001  # written last, once every array is in place
+_PREAMBLE = 16                      # uint64 ready flag + uint64 header length
+_ALIGN = 64
+
+
+class CompactBM25:
+    """BM25Okapi-compatible scorer over flat posting arrays instead of per-document dicts
+
+    Without a `vocab` dict, terms are looked up by binary search in the sorted packed vocabulary and
+    the length normalization is read from the arrays, so a worker attaching a shared or memory-mapped
+    index builds no per-process copy of either
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], params: Dict, vocab: Optional[Dict[str, int]] = None):
+        self.term_ptr = arrays["bm25_term_ptr"]
+        self.post_docs = arrays["bm25_post_docs"]
+        self.post_freqs = arrays["bm25_post_freqs"]
+        self.idf_values = arrays["bm25_idf"]
+        self.doc_len = arrays["bm25_doc_len"]
+        self.k1 = params["k1"]
+        self.b = params["b"]
+        self.avgdl = params["avgdl"]
+        self.corpus_size = len(self.doc_len)
+        self.vocab = vocab
+        self._vocab_blob = arrays["bm25_vocab_blob"]
+        self._vocab_offsets = arrays["bm25_vocab_offsets"]
+        self._terms = PackedStrings(self._vocab_blob, self._vocab_offsets)
+        self._norm = arrays.get("bm25_norm")
+        if self._norm is None:
+            # Indexes saved before the normalization was stored
+            self._norm = self.k1 * (1 - self.b + self.b * self.doc_len / self.avgdl)
+
+    @classmethod
+    def from_bm25(cls, bm25) -> "CompactBM25":
+        """Flatten a built `rank_bm25.BM25Okapi` into posting arrays"""
+        vocab = {term: i for i, term in enumerate(sorted(bm25.idf))}
+        postings = [[] for _ in vocab]
+        for doc_id, freqs in enumerate(bm25.doc_freqs):
+            for term, freq in freqs.items():
+                postings[vocab[term]].append((doc_id, freq))
+
+        term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        term_ptr[1:] = np.cumsum([len(p) for p in postings])
+        flat = [pair for plist in postings for pair in plist]
+        arrays = {
+            "bm25_term_ptr": term_ptr,
+            "bm25_post_docs": np.array([d for d, _ in flat], dtype=np.int32),
+            "bm25_post_freqs": np.array([f for _, f in flat], dtype=np.float32),
+            "bm25_idf": np.array([bm25.idf[t] for t in vocab], dtype=np.float64),
+            "bm25_doc_len": np.asarray(bm25.doc_len, dtype=np.float64),
+        }
+        arrays["bm25_vocab_blob"], arrays["bm25_vocab_offsets"] = pack_strings(list(vocab))
+        arrays["bm25_norm"] = bm25.k1 * (1 - bm25.b + bm25.b * arrays["bm25_doc_len"] / bm25.avgdl)
+        return cls(arrays, {"k1": bm25.k1, "b": bm25.b, "avgdl": bm25.avgdl}, vocab=vocab)
+
+    @property
+    def params(self) -> Dict:
+        return {"k1": self.k1, "b": self.b, "avgdl": float(self.avgdl)}
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays needed to rebuild this scorer elsewhere"""
+        # Term ids follow sorted order either way, so the packed vocabulary is reused as is
+        return {
+            "bm25_term_ptr": self.term_ptr,
+            "bm25_post_docs": self.post_docs,
+            "bm25_post_freqs": self.post_freqs,
+            "bm25_idf": self.idf_values,
+            "bm25_doc_len": self.doc_len,
+            "bm25_vocab_blob": self._vocab_blob,
+            "bm25_vocab_offsets": self._vocab_offsets,
+            "bm25_norm": self._norm,
+        }
+
+    def _term_id(self, term: str) -> Optional[int]:
+        if self.vocab is not None:
+            return self.vocab.get(term)
+        i = bisect.bisect_left(self._terms, term)
+        return i if i < len(self._terms) and self._terms[i] == term else None
+
+    def get_scores(self, query: List[str]) -> np.ndarray:
+        """Same scores as BM25Okapi.get_scores, touching only documents that contain a query term"""
+        scores = np.zeros(self.corpus_size)
+        for term in query:
+            term_id = self._term_id(term)
+            if term_id is None:
+                continue
+            start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+            docs = self.post_docs[start:end]
+            freqs = self.post_freqs[start:end]
+            scores[docs] += self.idf_values[term_id] * (freqs * (self.k1 + 1) / (freqs + self._norm[docs]))
+        return scores
+
+    def get_batch_scores(self, query: List[str], doc_ids) -> np.ndarray:
+        """Scores for `doc_ids` only, like BM25Okapi.get_batch_scores"""
+        # Postings already restrict the work to matching documents
+        return self.get_scores(query)[np.asarray(doc_ids)]
+
+
+class PackedStrings(Sequence):
+    """Read-only string list backed by a UTF-8 blob, decoded one item at a time"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        return bytes(self._blob[self._offsets[index]:self._offsets[index + 1]]).decode("utf-8")
+
+
+def pack_strings(strings: List[str]):
+    """Pack strings into a UTF-8 blob plus an (n + 1) offsets array"""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    """Decode every string packed by `pack_strings`"""
+    raw = bytes(blob)
+    return [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def content_digest(contexts: Sequence[str], *parts: str) -> str:
+    """SHA-256 over the passages and whatever else shapes the index (method, analyzer signature)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8") + b"\0")
+    for context in contexts:
+        digest.update(context.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+class StaleSharedIndex(ValueError):
+    """The segment was published from different passages than the attaching worker loaded"""
+
+
+_untracked_attach_lock = threading.Lock()
+
+
+def _open_segment(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without registering it with the resource tracker
+
+    Only the publisher registers a segment, and it unregisters it exactly once in unlink(). An attach
+    that registered and then unregistered would drop the publisher's entry when both share a tracker
+    (the same process after a reload, or forked workers), and the tracker raises KeyError at exit
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no `track` flag: skip the registration SharedMemory.__init__ makes
+        with _untracked_attach_lock:
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                return shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+
+class SharedRetrievalIndex:
+    """One named shared-memory segment holding passages, BM25 arrays and embeddings"""
+
+    def __init__(self, segment: shared_memory.SharedMemory, header: Dict, owner: bool):
+        self.segment = segment
+        self.name = segment.name
+        self.header = header
+        self.owner = owner
+        self.arrays = {}
+        for array_name, spec in header["arrays"].items():
+            view = np.ndarray(
+                tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]),
+                buffer=segment.buf, offset=spec["offset"]
+            )
+            view.flags.writeable = False
+            self.arrays[array_name] = view
+        self._closed = False
+        if owner:
+            atexit.register(self.unlink)
+
+    @classmethod
+    def publish(cls, name: str, contexts: List[str], bm25=None, embeddings=None,
+                content_hash: Optional[str] = None) -> "SharedRetrievalIndex":
+        """Create the segment and copy the index in; raises FileExistsError if another process won"""
+        arrays = {}
+        arrays["passages_blob"], arrays["passages_offsets"] = pack_strings(list(contexts))
+        params = {}
+        if bm25 is not None:
+            compact = bm25 if isinstance(bm25, CompactBM25) else CompactBM25.from_bm25(bm25)
+            arrays.update(compact.arrays())
+            params = compact.params
+        if embeddings is not None:
+            arrays["embeddings"] = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        layout, cursor = {}, 0
+        for array_name, array in arrays.items():
+            cursor = -(-cursor // _ALIGN) * _ALIGN
+            layout[array_name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": cursor}
+            cursor += array.nbytes
+        header = {"arrays": layout, "bm25_params": params, "content_hash": content_hash}
+        # Leave room for the offsets growing once they become absolute
+        reserved = len(json.dumps(header)) + 32 * len(layout) + _ALIGN
+        data_start = -(-(_PREAMBLE + reserved) // _ALIGN) * _ALIGN
+        for spec in layout.values():
+            spec["offset"] += data_start
+        header_bytes = json.dumps(header).encode("utf-8").ljust(data_start - _PREAMBLE)
+
+        segment = shared_memory.SharedMemory(name=name, create=True, size=max(data_start + cursor, 1))
+        try:
+            segment.buf[_PREAMBLE:data_start] = header_bytes
+            for array_name, array in arrays.items():
+                spec = layout[array_name]
+                target = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf, offset=spec["offset"])
+                target[...] = array
+                del target
+            preamble = np.ndarray((2,), dtype=np.uint64, buffer=segment.buf)
+            preamble[1] = data_start - _PREAMBLE
+            preamble[0] = _MAGIC_READY
+            del preamble
+        except Exception:
+            segment.close()
+            segment.unlink()
+            raise
+        print(f" Published shared retrieval index '{name}' ({segment.size / 1e6:.1f} MB)")
+        return cls(segment, header, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, wait_seconds: float = 30.0,
+               content_hash: Optional[str] = None) -> "SharedRetrievalIndex":
+        """Attach read-only to a published segment, waiting for an in-progress publish to finish
+
+        With `content_hash`, raises StaleSharedIndex unless the segment was published from the same content
+        """
+        segment = _open_segment(name)
+        preamble = np.ndarray((2,), dtype=np.uint64, buffer=segment.buf)
+        waited_until = time.monotonic() + wait_seconds
+        while int(preamble[0]) != _MAGIC_READY:
+            if time.monotonic() > waited_until:
+                segment.close()
+                raise TimeoutError(f"shared index '{name}' was never marked ready")
+            time.sleep(0.05)
+        header_len = int(preamble[1])
+        header = json.loads(bytes(segment.buf[_PREAMBLE:_PREAMBLE + header_len]).decode("utf-8"))
+        del preamble
+        if content_hash is not None and header.get("content_hash") != content_hash:
+            segment.close()
+            raise StaleSharedIndex(f"shared index '{name}' holds different knowledge base content")
+        return cls(segment, header, owner=False)
+
+    @property
+    def contexts(self) -> PackedStrings:
+        return PackedStrings(self.arrays["passages_blob"], self.arrays["passages_offsets"])
+
+    @property
+    def bm25(self) -> Optional[CompactBM25]:
+        if "bm25_term_ptr" not in self.arrays:
+            return None
+        return CompactBM25(self.arrays, self.header["bm25_params"])
+
+    @property
+    def embeddings(self) -> Optional[np.ndarray]:
+        return self.arrays.get("embeddings")
+
+    def close(self):
+        """Detach this process; numpy views into the segment must not be used afterwards"""
+        if self._closed:
+            return
+        self.arrays = {}
+        try:
+            self.segment.close()
+        except BufferError:
+            # Views handed out to retrieval objects are still alive; the OS frees the mapping at exit
+            pass
+        self._closed = True
+
+    def unlink(self):
+        """Owner only: remove the segment name so no new worker can attach"""
+        self.close()
+        if self.owner:
+            try:
+                self.segment.unlink()
+            except FileNotFoundError:
+                pass
+            self.owner = False
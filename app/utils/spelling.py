@@ -0,0 +1,153 @@
+"""
+Spelling Correction for Rwanda Tourism QA
+Symmetric-delete (SymSpell-style) index over keywords and corpus vocabulary: every dictionary word's
+deletions are precomputed, so correcting a query token is a handful of hash lookups
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config.settings import SPELLING_CONFIG
+
+_WORD_RE = re.compile(r"[A-Za-z]+")
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """`word` plus every string reachable from it by up to `max_distance` single-character deletions"""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance (adjacent transpositions count once), capped at max_distance + 1"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class SymSpellIndex:
+    """Precomputed deletions -> dictionary words, with an edit budget that grows with word length"""
+
+    def __init__(self, max_edit_distance: int = 2, prefix_length: int = 7,
+                 min_word_length: int = 5, long_word_length: int = 8):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.min_word_length = min_word_length
+        self.long_word_length = long_word_length
+        self.counts: Counter = Counter()
+        self.deletes: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def add_words(self, words: Iterable[str], count: int = 1):
+        """Add dictionary words; counts break ties between equally close corrections"""
+        for word in words:
+            word = word.lower()
+            if not word.isalpha():
+                continue
+            if word not in self.counts and len(word) >= self.min_word_length:
+                for variant in _deletes(word[:self.prefix_length], self.max_edit_distance):
+                    self.deletes.setdefault(variant, set()).add(word)
+            self.counts[word] += count
+
+    def budget(self, word: str) -> int:
+        """Edits allowed for `word`: none for short words, where almost any edit lands on another word"""
+        if len(word) < self.min_word_length:
+            return 0
+        if len(word) < self.long_word_length:
+            return min(1, self.max_edit_distance)
+        return self.max_edit_distance
+
+    def lookup(self, word: str) -> Optional[str]:
+        """Closest dictionary word within the budget (the word itself if known), or None"""
+        word = word.lower()
+        if word in self.counts:
+            return word
+        max_distance = self.budget(word)
+        if max_distance == 0:
+            return None
+
+        best, best_key = None, None
+        prefix = word[:self.prefix_length]
+        for variant in _deletes(prefix, max_distance):
+            for candidate in self.deletes.get(variant, ()):
+                if len(candidate) < self.min_word_length:
+                    continue  # "part" must not become "art"
+                distance = edit_distance(word, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                key = (distance, -self.counts[candidate], candidate)
+                if best_key is None or key < best_key:
+                    best, best_key = candidate, key
+        return best
+
+    def correct_text(self, text: str, skip: Iterable[str] = (), expand: bool = False,
+                     record: bool = True) -> Tuple[str, List[Tuple[str, str]]]:
+        """Replace misspelled words in `text`, returning the new text and the (wrong, right) pairs
+
+        With `expand` the correction is inserted after the original word instead of replacing it,
+        so a real word missing from the dictionary ("expensive" -> "extensive") is never lost
+        """
+        skip = set(skip)
+        corrections: List[Tuple[str, str]] = []
+
+        def replace(match):
+            word = match.group(0)
+            lower = word.lower()
+            if lower in self.counts or lower in skip or self.budget(lower) == 0:
+                return word
+            suggestion = self.lookup(lower)
+            if suggestion is None:
+                return word
+            corrections.append((word, suggestion))
+            return f"{word} {suggestion}" if expand else suggestion
+
+        corrected = _WORD_RE.sub(replace, text)
+        if not record:
+            return corrected, corrections
+        with self._lock:
+            self.stats["queries"] += 1
+            if corrections:
+                self.stats["corrected_queries"] += 1
+                self.stats["corrected_tokens"] += len(corrections)
+        return corrected, corrections
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            queries = self.stats["queries"]
+            return {
+                "dictionary_words": len(self.counts),
+                "delete_entries": len(self.deletes),
+                "queries": queries,
+                "corrected_queries": self.stats["corrected_queries"],
+                "corrected_tokens": self.stats["corrected_tokens"],
+                "correction_rate": self.stats["corrected_queries"] / queries if queries else 0.0,
+            }
+
+
+def build_spelling_index(words: Iterable[str]) -> SymSpellIndex:
+    """Index configured from SPELLING_CONFIG; repeated words count as more frequent"""
+    index = SymSpellIndex(
+        SPELLING_CONFIG["max_edit_distance"], SPELLING_CONFIG["prefix_length"],
+        SPELLING_CONFIG["min_word_length"], SPELLING_CONFIG["long_word_length"]
+    )
+    index.add_words(words)
+    return index
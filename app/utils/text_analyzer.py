@@ -0,0 +1,105 @@
+"""
+Text Analyzer for Rwanda Tourism QA
+One tokenizer for every lexical component (BM25, lite index, spelling vocabulary): a precompiled
+regex, a frozen stopword set, optional light stemming and a memo for repeated query strings
+"""
+
+import re
+import threading
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+from app.config.settings import ANALYZER_CONFIG
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# NLTK's English stopword list, frozen here because importing nltk pulls in scipy, sklearn and pandas
+STOP_WORDS = frozenset("""
+i me my myself we our ours ourselves you you're you've you'll you'd your yours yourself yourselves
+he him his himself she she's her hers herself it it's its itself they them their theirs themselves
+what which who whom this that that'll these those am is are was were be been being have has had
+having do does did doing a an the and but if or because as until while of at by for with about
+against between into through during before after above below to from up down in out on off over
+under again further then once here there when where why how all any both each few more most other
+some such no nor not only own same so than too very s t can will just don don't should should've
+now d ll m o re ve y ain aren aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn
+hasn't haven haven't isn isn't ma mightn mightn't mustn mustn't needn needn't shan shan't shouldn
+shouldn't wasn wasn't weren weren't won won't wouldn wouldn't
+""".split())
+
+
+def light_stem(token: str) -> str:
+    """Harman's S-stemmer: folds plurals ("gorillas", "activities") and nothing else"""
+    if len(token) > 4 and token.endswith("ies") and not token.endswith(("eies", "aies")):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("es") and not token.endswith(("aes", "ees", "oes")):
+        return token[:-1]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("us", "ss")):
+        return token[:-1]
+    return token
+
+
+class TextAnalyzer:
+    """Lowercase alphanumeric tokens without stopwords or short tokens, optionally stemmed"""
+
+    def __init__(self, stop_words: Iterable[str] = STOP_WORDS, min_token_length: int = 3,
+                 stem: bool = False, cache_size: int = 4096):
+        self.stop_words = frozenset(stop_words)
+        self.min_token_length = min_token_length
+        self.stem = stem
+        self.cache_size = cache_size
+        # Indexes built with one analyzer cannot be queried with another; saved indexes record this
+        self.signature = f"regex-v1:min{min_token_length}:stem{int(stem)}:stop{len(self.stop_words)}"
+        self._memo = lru_cache(maxsize=cache_size)(self._analyze) if cache_size > 0 else self._analyze
+
+    def words(self, text: str) -> List[str]:
+        """Surface words after stopword and length filtering, never stemmed (spelling dictionaries)"""
+        stop_words, min_length = self.stop_words, self.min_token_length
+        return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) >= min_length and t not in stop_words]
+
+    def tokenize(self, text: str) -> List[str]:
+        """Index terms for one text"""
+        words = self.words(text)
+        return [light_stem(w) for w in words] if self.stem else words
+
+    def _analyze(self, text: str) -> Tuple[str, ...]:
+        return tuple(self.tokenize(text))
+
+    def analyze(self, text: str) -> Tuple[str, ...]:
+        """Query-side terms, memoized: hybrid search and its shards tokenize the same query repeatedly"""
+        return self._memo(text)
+
+    def analyze_batch(self, texts: Iterable[str]) -> List[List[str]]:
+        """Corpus-side terms; not memoized, so building an index does not evict live queries"""
+        stop_words, min_length, stem = self.stop_words, self.min_token_length, self.stem
+        findall = _TOKEN_RE.findall
+        batch = []
+        for text in texts:
+            words = [t for t in findall(text.lower()) if len(t) >= min_length and t not in stop_words]
+            batch.append([light_stem(w) for w in words] if stem else words)
+        return batch
+
+    def cache_info(self) -> Optional[dict]:
+        if not hasattr(self._memo, "cache_info"):
+            return None
+        info = self._memo.cache_info()
+        lookups = info.hits + info.misses
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize,
+                "hit_rate": info.hits / lookups if lookups else 0.0}
+
+
+_default_analyzer: Optional[TextAnalyzer] = None
+_default_lock = threading.Lock()
+
+
+def get_default_analyzer() -> TextAnalyzer:
+    """The process-wide analyzer configured by ANALYZER_CONFIG, shared by every lexical index"""
+    global _default_analyzer
+    with _default_lock:
+        if _default_analyzer is None:
+            _default_analyzer = TextAnalyzer(
+                min_token_length=ANALYZER_CONFIG["min_token_length"],
+                stem=ANALYZER_CONFIG["stem"],
+                cache_size=ANALYZER_CONFIG["cache_size"],
+            )
+        return _default_analyzer
@@ -0,0 +1,163 @@
+"""
+CPU Thread Topology for Rwanda Tourism QA
+Sizes torch's intra-op and inter-op thread pools (and optionally pins CPUs) for each worker, so
+several workers on one node share the cores instead of each spawning one thread per core
+"""
+
+import json
+import math
+import os
+import platform
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from app.config.settings import ASYNC_CONFIG, THREAD_CONFIG
+
+# Read by OpenMP / MKL when torch first loads; torch.set_num_threads covers the rest
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+_applied: Optional["ThreadPlan"] = None
+_apply_lock = threading.Lock()
+
+
+class ThreadPlan(NamedTuple):
+    """Thread settings for one worker process"""
+    intra_op_threads: int
+    inter_op_threads: int
+    cpus: List[int]      # CPUs this worker may run on
+    pin: bool            # restrict the process to `cpus`
+    source: str          # "config", "tuned" or "auto"
+
+
+def cpu_quota() -> Optional[float]:
+    """CPUs allowed by the container's cgroup quota, None when unlimited or unknown"""
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()[:2]  # cgroup v2
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())  # cgroup v1
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> List[int]:
+    """CPU ids this process may use, trimmed to the cgroup quota (os.cpu_count() ignores both)"""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    quota = cpu_quota()
+    if quota is not None:
+        cpus = cpus[:max(1, math.ceil(quota))]
+    return cpus
+
+
+def host_fingerprint() -> str:
+    """CPU model and usable core count: a tuning result only transfers to the same instance type"""
+    model = platform.processor() or platform.machine()
+    try:
+        for line in Path("/proc/cpuinfo").read_text().splitlines():
+            if line.startswith("model name"):
+                model = line.split(":", 1)[1].strip()
+                break
+    except OSError:
+        pass
+    return f"{model}|{len(available_cpus())}cpu"
+
+
+def worker_cpus(cpus: List[int], workers: int, worker_index: int) -> List[int]:
+    """This worker's contiguous slice of `cpus`; workers share CPUs round-robin when there are too few"""
+    workers = max(1, workers)
+    if workers >= len(cpus):
+        return [cpus[worker_index % len(cpus)]]
+    per_worker = len(cpus) // workers
+    start = (worker_index % workers) * per_worker
+    return cpus[start:start + per_worker]
+
+
+def load_tuning(path=None, workers: Optional[int] = None) -> Optional[Dict]:
+    """The recorded auto-tune result if it was measured on this host with the same worker count"""
+    path = Path(path or THREAD_CONFIG["tuning_path"])
+    workers = THREAD_CONFIG["workers"] if workers is None else workers
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            tuning = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if tuning.get("host") != host_fingerprint() or tuning.get("workers") != workers:
+        return None
+    return tuning
+
+
+def plan_threads(config: Optional[Dict] = None) -> ThreadPlan:
+    """Explicit settings win, then a matching auto-tune result, then an even split of this worker's CPUs"""
+    config = config or THREAD_CONFIG
+    cpus = worker_cpus(available_cpus(), config["workers"], config["worker_index"])
+    inter_op = config["inter_op_threads"]
+    if config["intra_op_threads"] != "auto":
+        intra_op, source = int(config["intra_op_threads"]), "config"
+    else:
+        tuning = load_tuning(config["tuning_path"], config["workers"])
+        if tuning is not None:
+            intra_op, inter_op, source = tuning["intra_op_threads"], tuning["inter_op_threads"], "tuned"
+        else:
+            # Each concurrently answered request runs its own intra-op team
+            intra_op, source = max(1, len(cpus) // max(1, ASYNC_CONFIG["max_workers"])), "auto"
+    return ThreadPlan(max(1, intra_op), max(1, inter_op), cpus, config["pin_cpus"], source)
+
+
+def set_thread_env(intra_op_threads: int):
+    """OpenMP/MKL pool sizes; only effective before torch is imported"""
+    for name in _THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(intra_op_threads))
+
+
+def apply_thread_plan(plan: ThreadPlan) -> Dict:
+    """Pin the process if asked and size torch's pools; returns what actually took effect"""
+    if plan.pin and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, plan.cpus)
+    set_thread_env(plan.intra_op_threads)
+
+    import torch
+
+    torch.set_num_threads(plan.intra_op_threads)
+    try:
+        torch.set_num_interop_threads(plan.inter_op_threads)
+    except RuntimeError:
+        # Allowed once per process, before any inter-op work; an earlier call already decided it
+        pass
+    return {
+        "intra_op_threads": torch.get_num_threads(),
+        "inter_op_threads": torch.get_num_interop_threads(),
+        "cpus": plan.cpus if plan.pin else available_cpus(),
+        "pinned": plan.pin,
+        "source": plan.source,
+    }
+
+
+def configure_torch_threads(config: Optional[Dict] = None) -> Optional[ThreadPlan]:
+    """Apply the configured plan once per process; call before loading any torch model"""
+    global _applied
+    config = config or THREAD_CONFIG
+    if not config["enabled"]:
+        return None
+    with _apply_lock:
+        if _applied is None:
+            _applied = plan_threads(config)
+            effective = apply_thread_plan(_applied)
+            print(f" Torch threads: intra-op {effective['intra_op_threads']}, inter-op "
+                  f"{effective['inter_op_threads']} ({_applied.source}, {len(_applied.cpus)} CPUs"
+                  f"{', pinned' if _applied.pin else ''})")
+        return _applied
+
+
+def get_thread_stats() -> Dict:
+    """The applied plan for readiness details"""
+    if _applied is None:
+        return {"configured": False}
+    return {"configured": True, **_applied._asdict(), "cpus": len(_applied.cpus)}
@@ -28,6 +28,11 @@ def preload_all_models():
     """Pre-download and cache all models to avoid delays during user interaction"""
     print("🔄 Pre-loading models and data (one-time setup)...")
     
+    if os.getenv("VISITRWANDA_OFFLINE", "0") == "1":
+        # Strict offline mode: everything comes from the prebuilt bundle, nothing to download
+        print("  📦 Offline mode: using the prebuilt artifact bundle")
+        return True
+    
     try:
         # Download NLTK data
         import nltk
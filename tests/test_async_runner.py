@@ -0,0 +1,122 @@
+"""AsyncAnswerRunner deadlines, cancellation and overload shedding"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils.async_runner import AsyncAnswerRunner, DeadlineExceeded, RequestDeadline
+
+
+def slow_answer(release: threading.Event, stages: list):
+    """Blocks until `release`, then checks the deadline before its next stage like the chatbot does"""
+    def answer(question, deadline):
+        release.wait(5)
+        try:
+            deadline.check("qa")
+        except DeadlineExceeded as e:
+            stages.append(e.stage)
+            raise
+        return {"answer": question}
+    return answer
+
+
+def test_deadline_check_raises_once_expired():
+    deadline = RequestDeadline(0.01)
+    deadline.check("retrieval")
+    time.sleep(0.02)
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        deadline.check("qa")
+    assert excinfo.value.stage == "qa"
+    assert deadline.remaining() == 0.0
+
+
+def test_completed_request_returns_the_answer():
+    runner = AsyncAnswerRunner(max_workers=1, max_pending=2)
+    result = asyncio.run(runner.run(lambda q, deadline: {"answer": q}, "gorillas", timeout=1))
+    assert result == {"answer": "gorillas"}
+    assert runner.stats["completed"] == 1
+    runner.shutdown()
+
+
+def test_timeout_returns_structured_response_and_stops_the_worker():
+    runner = AsyncAnswerRunner(max_workers=1, max_pending=2)
+    release, stages = threading.Event(), []
+    result = asyncio.run(runner.run(slow_answer(release, stages), "gorillas", timeout=0.05))
+    assert result["timed_out"] and result["error"] == "deadline_exceeded"
+    assert runner.stats["timed_out"] == 1
+
+    # The worker is still running; it notices the cancelled deadline at its next stage
+    release.set()
+    for _ in range(100):
+        if stages:
+            break
+        time.sleep(0.01)
+    assert stages == ["qa"]
+    runner.shutdown()
+
+
+def test_cancelled_caller_cancels_the_deadline():
+    runner = AsyncAnswerRunner(max_workers=1, max_pending=2)
+    release, stages = threading.Event(), []
+
+    async def caller():
+        task = asyncio.ensure_future(runner.run(slow_answer(release, stages), "gorillas", timeout=5))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(caller())
+    assert runner.stats["cancelled"] == 1
+    release.set()
+    for _ in range(100):
+        if stages:
+            break
+        time.sleep(0.01)
+    assert stages == ["qa"]
+    runner.shutdown()
+
+
+def test_queued_request_whose_deadline_passed_is_skipped():
+    runner = AsyncAnswerRunner(max_workers=1, max_pending=4)
+    release, calls = threading.Event(), []
+
+    def blocking(question, deadline):
+        calls.append(question)
+        release.wait(5)
+        return {"answer": question}
+
+    async def scenario():
+        first = asyncio.ensure_future(runner.run(blocking, "first", timeout=5))
+        await asyncio.sleep(0.02)
+        # Queued behind `first` on the only worker, and times out before it starts
+        second = await runner.run(blocking, "second", timeout=0.05)
+        release.set()
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == {"answer": "first"}
+    assert second["timed_out"]
+    runner.shutdown()
+    assert calls == ["first"]
+
+
+def test_requests_over_max_pending_are_rejected():
+    runner = AsyncAnswerRunner(max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(runner.run(lambda q, deadline: release.wait(5) and {"answer": q},
+                                                 "first", timeout=5))
+        await asyncio.sleep(0.02)
+        second = await runner.run(lambda q, deadline: {"answer": q}, "second", timeout=5)
+        release.set()
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == {"answer": "first"}
+    assert second["category"] == "overloaded"
+    assert runner.stats["rejected"] == 1
+    runner.shutdown()
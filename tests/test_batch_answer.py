@@ -0,0 +1,132 @@
+"""BatchAnswerer end to end over a small lite pipeline, including resume after an interrupted run"""
+
+import json
+
+import pytest
+
+from app.tools.batch_answer import BatchAnswerer, read_checkpoint
+from app.utils.lite_index import LiteAnswerIndex
+from app.utils.pipeline import ComponentRegistry, build_pipeline
+from app.utils.question_handler import NonTourismQuestionHandler
+
+QUESTIONS = [
+    "How much is a gorilla trekking permit?",
+    "Where can I see chimpanzees in Rwanda?",
+    "Which museums are in Huye?",
+    "What is the capital of France?",
+    "How much does a gorilla permit cost?",
+    "Where is Nyungwe National Park?",
+    "Tell me about Rwandan museums",
+]
+ANSWERS = [
+    "Gorilla trekking permits in Volcanoes National Park cost $1,500 per person.",
+    "Chimpanzee tracking takes place in Nyungwe National Park.",
+    "The Ethnographic Museum in Huye holds Rwanda's largest collection.",
+]
+
+
+class LiteBatchChatbot:
+    """The two methods BatchAnswerer uses, backed by a real lite pipeline"""
+
+    def __init__(self, answer_index=None):
+        registry = ComponentRegistry()
+        registry.register("question_handler", NonTourismQuestionHandler())
+        registry.register("retrieval_system", answer_index or LiteAnswerIndex(
+            ["How much is a gorilla permit?", "Where can I track chimpanzees?", "What museums are in Huye?"],
+            ANSWERS,
+        ))
+        self.pipeline = build_pipeline("batch", registry, [
+            {"stage": "gate", "type": "keyword"},
+            {"stage": "reader", "type": "lite"},
+        ])
+
+    def batch_pipeline(self, top_k=None):
+        return self.pipeline
+
+    def start_batch(self, question, top_k=None):
+        return self.pipeline.start(question)
+
+
+@pytest.fixture
+def questions_file(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text("".join(json.dumps({"id": i, "question": q}) + "\n" for i, q in enumerate(QUESTIONS)))
+    return path
+
+
+def read_output(path):
+    """Output records without their per-stage timings, which differ between runs"""
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    for record in records:
+        record.pop("stage_ms", None)
+    return records
+
+
+def test_answers_every_question_in_order(questions_file, tmp_path):
+    output = tmp_path / "answers.jsonl"
+    report = BatchAnswerer(LiteBatchChatbot(), batch_size=3, checkpoint_every=2).run(questions_file, output)
+
+    records = read_output(output)
+    assert [r["id"] for r in records] == list(range(len(QUESTIONS)))
+    assert records[0]["answer"] == ANSWERS[0]
+    assert records[3]["category"] == "non_tourism"
+    assert report["written"] == len(QUESTIONS)
+    assert read_checkpoint(f"{output}.checkpoint")["complete"]
+
+
+def test_resume_continues_after_the_checkpoint(questions_file, tmp_path):
+    expected_output = tmp_path / "expected.jsonl"
+    BatchAnswerer(LiteBatchChatbot(), batch_size=3).run(questions_file, expected_output)
+    expected = read_output(expected_output)
+
+    # An interrupted run: three records checkpointed, a fourth written after it and a torn fifth
+    output = tmp_path / "answers.jsonl"
+    lines = expected_output.read_text(encoding="utf-8").splitlines(keepends=True)
+    checkpointed = "".join(lines[:3])
+    output.write_text(checkpointed + lines[3] + lines[4][:20], encoding="utf-8")
+    with open(f"{output}.checkpoint", "w", encoding="utf-8") as f:
+        json.dump({"input": str(questions_file.resolve()), "records": 3,
+                   "output_bytes": len(checkpointed.encode("utf-8")), "complete": False}, f)
+
+    report = BatchAnswerer(LiteBatchChatbot(), batch_size=3).run(questions_file, output, resume=True)
+
+    assert report["written"] == len(QUESTIONS) - 3
+    assert report["total_records"] == len(QUESTIONS)
+    assert read_output(output) == expected
+    assert read_checkpoint(f"{output}.checkpoint")["complete"]
+
+
+def test_resume_without_checkpoint_starts_over(questions_file, tmp_path):
+    output = tmp_path / "answers.jsonl"
+    output.write_text("left over from another run\n")
+    report = BatchAnswerer(LiteBatchChatbot(), batch_size=3).run(questions_file, output, resume=True)
+    assert report["written"] == len(QUESTIONS)
+    assert [r["id"] for r in read_output(output)] == list(range(len(QUESTIONS)))
+
+
+def test_resume_refuses_another_inputs_checkpoint(questions_file, tmp_path):
+    output = tmp_path / "answers.jsonl"
+    output.write_text("")
+    with open(f"{output}.checkpoint", "w", encoding="utf-8") as f:
+        json.dump({"input": str(tmp_path / "other.jsonl"), "records": 1, "output_bytes": 0}, f)
+    with pytest.raises(ValueError):
+        BatchAnswerer(LiteBatchChatbot(), batch_size=3).run(questions_file, output, resume=True)
+
+
+def test_failing_question_becomes_an_error_record(questions_file, tmp_path):
+    class FlakyIndex(LiteAnswerIndex):
+        def answer(self, query):
+            if "Huye" in query:
+                raise RuntimeError("reader failed")
+            return super().answer(query)
+
+    chatbot = LiteBatchChatbot(FlakyIndex(["How much is a gorilla permit?", "Where can I track chimpanzees?",
+                                           "What museums are in Huye?"], ANSWERS))
+    output = tmp_path / "answers.jsonl"
+    report = BatchAnswerer(chatbot, batch_size=3).run(questions_file, output)
+
+    records = read_output(output)
+    assert len(records) == len(QUESTIONS)
+    assert records[2]["error"] == "reader failed"
+    assert "error" not in records[0]
+    assert report["outcomes"]["errors"] == 1
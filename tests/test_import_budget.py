@@ -0,0 +1,13 @@
+"""Core entry points stay within their import-time budgets and never import heavy libraries"""
+
+from app.tools.import_budget import check
+
+
+def test_import_budget():
+    report = check()
+    failures = {
+        module: {"import_ms": result["import_ms"], "budget_ms": result["budget_ms"],
+                 "forbidden_loaded": result["forbidden_loaded"]}
+        for module, result in report["entry_points"].items() if not result["ok"]
+    }
+    assert report["ok"], failures
@@ -0,0 +1,64 @@
+"""LoadController tier selection from in-flight requests and recent latency"""
+
+from app.config.settings import LOAD_CONFIG
+from app.utils.load_controller import TIERS, LoadController
+
+
+def make_controller(**overrides):
+    return LoadController(dict(LOAD_CONFIG, **overrides))
+
+
+def test_idle_controller_serves_full_tier():
+    controller = make_controller()
+    with controller.track() as tier:
+        assert tier == "full"
+    assert controller.tier_counts == {"full": 1}
+
+
+def test_in_flight_requests_step_down_one_tier_per_threshold():
+    controller = make_controller(in_flight_thresholds=[1, 2, 3, 4])
+    with controller.track() as first, controller.track() as second, controller.track() as third:
+        with controller.track() as fourth, controller.track() as fifth, controller.track() as sixth:
+            assert [first, second, third, fourth, fifth, sixth] == TIERS + ["cache_only"]
+    # Every request has finished, so the next one is back at the top
+    assert controller.current_tier() == 0
+
+
+def test_high_recent_latency_steps_down_until_it_recovers():
+    controller = make_controller(latency_window=4, min_latency_samples=4,
+                                 latency_thresholds_ms=[100, 200, 300, 400])
+    controller._latencies.extend([250, 250, 250])
+    assert TIERS[controller.current_tier()] == "full"  # too few samples to trust
+    controller._latencies.append(250)
+    assert TIERS[controller.current_tier()] == "reduced_top_k"
+
+    # Fast requests push the slow ones out of the window
+    controller._latencies.extend([10, 10, 10, 10])
+    assert TIERS[controller.current_tier()] == "full"
+
+
+def test_worse_of_latency_and_in_flight_wins():
+    controller = make_controller(in_flight_thresholds=[1, 10, 20, 30], min_latency_samples=1,
+                                 latency_thresholds_ms=[100, 200, 300, 400])
+    controller._latencies.append(350)
+    with controller.track() as tier:
+        assert tier == "retrieval_only"
+        assert controller.current_tier() == TIERS.index("retrieval_only")
+
+
+def test_disabled_controller_always_serves_full():
+    controller = make_controller(enabled=False, in_flight_thresholds=[0, 0, 0, 0])
+    with controller.track() as tier:
+        assert tier == "full"
+
+
+def test_track_records_latency_even_when_the_request_raises():
+    controller = make_controller()
+    try:
+        with controller.track():
+            raise RuntimeError("qa failed")
+    except RuntimeError:
+        pass
+    stats = controller.get_stats()
+    assert stats["in_flight"] == 0
+    assert len(controller._latencies) == 1
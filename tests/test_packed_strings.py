@@ -0,0 +1,59 @@
+"""PackedStrings round-trips and LiteAnswerIndex.pack leaves answers unchanged"""
+
+from app.utils.lite_index import LiteAnswerIndex
+from app.utils.shared_index import PackedStrings, pack_strings, unpack_strings
+
+STRINGS = ["Volcanoes National Park", "", "Umuganda happens monthly", "Café in Kigali – ☕", "Nyungwe"]
+
+QUESTIONS = [
+    "How much is a gorilla trekking permit?",
+    "What is the price of gorilla permits?",
+    "Where can I see chimpanzees in Rwanda?",
+    "Which museums are in Huye?",
+]
+ANSWERS = [
+    "Gorilla trekking permits in Volcanoes National Park cost $1,500 per person.",
+    "Gorilla trekking permits in Volcanoes National Park cost $1,500 per person.",
+    "Chimpanzee tracking takes place in Nyungwe National Park.",
+    "The Ethnographic Museum in Huye holds Rwanda's largest collection.",
+]
+
+
+def test_packed_strings_round_trip():
+    blob, offsets = pack_strings(STRINGS)
+    packed = PackedStrings(blob, offsets)
+    assert len(packed) == len(STRINGS)
+    assert list(packed) == STRINGS
+    assert unpack_strings(blob, offsets) == STRINGS
+
+
+def test_packed_strings_indexing():
+    packed = PackedStrings(*pack_strings(STRINGS))
+    assert packed[3] == "Café in Kigali – ☕"
+    assert packed[-1] == "Nyungwe"
+    assert packed[1:4] == STRINGS[1:4]
+    assert packed[::-2] == STRINGS[::-2]
+    assert "Nyungwe" in packed
+    assert packed.index("Umuganda happens monthly") == 2
+
+
+def test_empty_list_packs():
+    packed = PackedStrings(*pack_strings([]))
+    assert len(packed) == 0
+    assert list(packed) == []
+
+
+def test_lite_index_pack_keeps_answers():
+    index = LiteAnswerIndex(QUESTIONS, ANSWERS)
+    before = [index.answer(q) for q in QUESTIONS + ["chimps nyungwe"]]
+    contexts = list(index.contexts)
+
+    assert index.pack()
+    assert isinstance(index.answers, PackedStrings)
+    assert isinstance(index.questions, PackedStrings)
+    assert list(index.contexts) == contexts
+    assert [index.answer(q) for q in QUESTIONS + ["chimps nyungwe"]] == before
+    assert index.retrieve_contexts("gorilla permit", top_k=3)[0] == ANSWERS[0]
+
+    # Packing twice is a no-op
+    assert not index.pack()
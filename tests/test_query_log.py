@@ -0,0 +1,66 @@
+"""QueryLog size-based rotation and reopening after external rotation"""
+
+import json
+import time
+
+from app.utils.query_log import QueryLog, log_files, read_entries
+
+
+def record_and_wait(log: QueryLog, question: str):
+    """One write per entry, so rotation points do not depend on how the writer batches"""
+    written = log.get_stats()["written"]
+    log.record(question, "national_parks", 12.5, "extractive")
+    for _ in range(500):
+        if log.get_stats()["written"] > written:
+            return
+        time.sleep(0.002)
+    raise AssertionError("query log writer did not write the entry")
+
+
+def test_rotation_keeps_at_most_backups_files(tmp_path):
+    path = tmp_path / "query_log.jsonl"
+    # Each entry is ~170 bytes: a file rotates after its third, and the 31st starts a fresh live file
+    log = QueryLog(path, max_bytes=400, backups=2)
+    questions = [f"How much is gorilla trekking permit number {i}?" for i in range(31)]
+    for question in questions:
+        record_and_wait(log, question)
+    log.close()
+
+    stats = log.get_stats()
+    assert stats["rotations"] >= 3
+    assert stats["write_errors"] == 0
+    files = log_files(path)
+    assert [f.name for f in files] == ["query_log.jsonl", "query_log.jsonl.1", "query_log.jsonl.2"]
+    assert not path.with_name("query_log.jsonl.3").exists()
+    for rotated in files[1:]:
+        assert 400 <= rotated.stat().st_size < 800
+
+    # Only the oldest entries were dropped; the newest are all still there, newest file first
+    kept = [entry["question"] for entry in read_entries(path)]
+    newest_first = [json.loads(line)["question"] for f in files for line in f.read_text().splitlines()]
+    assert kept == newest_first
+    assert sorted(kept, key=questions.index) == questions[-len(kept):]
+
+
+def test_zero_backups_truncates_instead_of_keeping_history(tmp_path):
+    path = tmp_path / "query_log.jsonl"
+    log = QueryLog(path, max_bytes=200, backups=0)
+    for i in range(10):
+        record_and_wait(log, f"Where can I see chimpanzees {i}?")
+    log.close()
+
+    assert log.get_stats()["rotations"] >= 1
+    assert log_files(path) in ([], [path])
+
+
+def test_reopens_after_external_rotation(tmp_path):
+    path = tmp_path / "query_log.jsonl"
+    log = QueryLog(path, max_bytes=1 << 20, backups=2)
+    record_and_wait(log, "before logrotate")
+    path.rename(tmp_path / "query_log.jsonl.moved")
+    record_and_wait(log, "after logrotate")
+    log.close()
+
+    assert [entry["question"] for entry in read_entries(path)] == ["after logrotate"]
+    moved = (tmp_path / "query_log.jsonl.moved").read_text().splitlines()
+    assert [json.loads(line)["question"] for line in moved] == ["before logrotate"]